@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark Connessioni Database
+
+Misura la latenza per chiamata dei metodi set_* di GestionaleCacciaDB
+confrontando:
+  - PRIMA: una nuova sqlite3.connect + PRAGMA per ogni chiamata
+  - DOPO:  connessioni riusate dal pool (PRAGMA applicate una sola volta)
+
+Lavora su un database temporaneo, il database reale non viene toccato.
+
+Uso:
+    python benchmark_connessioni.py [numero_fogli]
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from database import GestionaleCacciaDB
+
+
+class GestionaleCacciaDBSenzaPool(GestionaleCacciaDB):
+    """Comportamento storico: una connessione nuova per ogni chiamata"""
+
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+
+def prepara_fogli(db, quantita: int) -> list:
+    """Crea i fogli di prova e ritorna i loro id"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO fogli_caccia (numero_foglio, anno, stato) VALUES (?, 2025, 'DISPONIBILE')",
+        [(f"BENCH{i:06d}",) for i in range(quantita)]
+    )
+    conn.commit()
+    cursor.execute("SELECT id FROM fogli_caccia ORDER BY id")
+    ids = [row['id'] for row in cursor.fetchall()]
+    conn.close()
+    return ids
+
+
+def misura(db, ids: list) -> dict:
+    """Latenza media (ms) per chiamata di ciascun metodo set_*"""
+    operazioni = {
+        'set_stampato': lambda fid: db.set_stampato(fid, True),
+        'set_consegnato': lambda fid: db.set_consegnato(fid, True),
+        'set_restituito': lambda fid: db.set_restituito(fid, True),
+        'set_data_consegna': lambda fid: db.set_data_consegna(fid, '2025-09-01'),
+        'set_data_rilascio': lambda fid: db.set_data_rilascio(fid, '2025-09-02'),
+        'set_data_restituzione': lambda fid: db.set_data_restituzione(fid, '2025-12-31'),
+    }
+
+    risultati = {}
+    for nome, operazione in operazioni.items():
+        start = time.perf_counter()
+        for foglio_id in ids:
+            operazione(foglio_id)
+        elapsed = time.perf_counter() - start
+        risultati[nome] = elapsed * 1000 / len(ids)
+    return risultati
+
+
+def esegui(classe_db, quantita: int) -> dict:
+    temp_dir = tempfile.mkdtemp(prefix="bench_caccia_")
+    try:
+        db = classe_db(os.path.join(temp_dir, "bench.db"))
+        ids = prepara_fogli(db, quantita)
+        risultati = misura(db, ids)
+        db.close()
+        return risultati
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    quantita = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print("=" * 70)
+    print(f"BENCHMARK CONNESSIONI - {quantita} chiamate per metodo")
+    print("=" * 70)
+
+    prima = esegui(GestionaleCacciaDBSenzaPool, quantita)
+    dopo = esegui(GestionaleCacciaDB, quantita)
+
+    print()
+    print(f"{'Metodo':<24}{'Prima (ms)':>12}{'Dopo (ms)':>12}{'Speedup':>10}")
+    print("-" * 58)
+    for nome in prima:
+        speedup = prima[nome] / dopo[nome] if dopo[nome] else 0
+        print(f"{nome:<24}{prima[nome]:>12.3f}{dopo[nome]:>12.3f}{speedup:>9.2f}x")
+    print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
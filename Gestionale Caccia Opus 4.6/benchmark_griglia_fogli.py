@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark Griglia Fogli
+
+Misura la preparazione dei dati del data_editor di Gestione Fogli con
+un anno di N fogli:
+  - PRIMA: tutto l'anno (get_fogli_anno) e griglia costruita con iterrows
+           e fmt_date_it cella per cella
+  - DOPO:  solo la finestra visibile (query_fogli, Config.FOGLI_PER_PAGINA
+           righe) e griglia vettoriale (griglia_fogli)
+Riporta anche la griglia vettoriale sull'anno intero, per confronto a
+parità di righe.
+
+Lavora su un database temporaneo, il database reale non viene toccato.
+
+Uso:
+    python benchmark_griglia_fogli.py [numero_fogli]
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import time
+import datetime as dt
+
+import pandas as pd
+
+from constants import Config
+from database import GestionaleCacciaDB
+from griglia_fogli import griglia_fogli
+
+RIPETIZIONI = 3
+
+
+def fmt_date_it(value) -> str:
+    """Copia di pages/fogli_caccia.fmt_date_it (la pagina importa Streamlit)"""
+    if value is None or value == '' or value == 'N/A':
+        return ''
+    try:
+        if hasattr(value, 'strftime'):
+            return value.strftime('%d/%m/%Y')
+        if isinstance(value, str):
+            try:
+                return dt.datetime.strptime(value, '%Y-%m-%d').date().strftime('%d/%m/%Y')
+            except ValueError:
+                try:
+                    return dt.datetime.strptime(value, '%Y/%m/%d').date().strftime('%d/%m/%Y')
+                except ValueError:
+                    return value
+        return ''
+    except Exception:
+        return ''
+
+
+def griglia_iterrows(fogli: list) -> pd.DataFrame:
+    """Costruzione storica della griglia: una riga alla volta"""
+    df_edit = pd.DataFrame(fogli)
+    edit_data = []
+    for idx, row in df_edit.iterrows():
+        cognome_nome = f"{row.get('cognome', '') or ''} {row.get('nome', '') or ''}".strip()
+        if not cognome_nome:
+            cognome_nome = str(row.get('rilasciato_a', '') or '')
+        cellulare = str(row.get('cellulare', '') or '')
+        telefono = str(row.get('telefono', '') or '')
+        edit_data.append({
+            'Cognome Nome': cognome_nome,
+            'N. Foglio': str(row.get('numero_foglio', 'N/A')),
+            'Restituito in data': fmt_date_it(row.get('data_restituzione', '')) or '',
+            'Stampato': bool(row.get('stampato', 0)),
+            'Consegnato': fmt_date_it(row.get('data_consegna', '')) or '',
+            'Contatto telefonico': cellulare if cellulare else telefono,
+        })
+    return pd.DataFrame(edit_data)
+
+
+def prepara_fogli(db, quantita: int):
+    """Cacciatori e fogli di prova per l'anno 2025"""
+    random.seed(42)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cacciatori = max(1, quantita // 2)
+    cursor.executemany(
+        "INSERT INTO cacciatori (nome, cognome, codice_fiscale, numero_tessera, cellulare) VALUES (?, ?, ?, ?, ?)",
+        [(f"NOME{i}", f"COGNOME{random.randint(0, 9999):04d}", f"CF{i:014d}", f"T{i}",
+          f"3{i:09d}" if i % 2 else None) for i in range(cacciatori)]
+    )
+    inizio = dt.date(2025, 1, 1)
+    cursor.executemany(
+        "INSERT INTO fogli_caccia (numero_foglio, anno, stato, cacciatore_id, data_consegna, "
+        "data_restituzione, stampato) VALUES (?, 2025, 'Consegnato', ?, ?, ?, ?)",
+        [(f"BENCH{i:06d}", random.randint(1, cacciatori),
+          (inizio + dt.timedelta(days=random.randint(0, 300))).isoformat(),
+          (inizio + dt.timedelta(days=random.randint(0, 300))).isoformat() if i % 3 == 0 else None,
+          i % 2) for i in range(quantita)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def misura(funzione) -> float:
+    """Tempo minimo (ms) su RIPETIZIONI esecuzioni"""
+    tempi = []
+    for _ in range(RIPETIZIONI):
+        start = time.perf_counter()
+        funzione()
+        tempi.append(time.perf_counter() - start)
+    return min(tempi) * 1000
+
+
+def main():
+    quantita = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print("=" * 70)
+    print(f"BENCHMARK GRIGLIA FOGLI - {quantita} fogli, finestra di {Config.FOGLI_PER_PAGINA} righe")
+    print("=" * 70)
+
+    temp_dir = tempfile.mkdtemp(prefix="bench_griglia_")
+    try:
+        db = GestionaleCacciaDB(os.path.join(temp_dir, "bench.db"))
+        prepara_fogli(db, quantita)
+
+        fogli_anno = db.get_fogli_anno(2025)
+        finestra = db.query_fogli(2025)['fogli']
+
+        righe = [
+            ("PRIMA  anno intero, iterrows", quantita,
+             misura(lambda: griglia_iterrows(db.get_fogli_anno(2025)))),
+            ("       solo griglia iterrows", quantita, misura(lambda: griglia_iterrows(fogli_anno))),
+            ("       solo griglia vettoriale", quantita, misura(lambda: griglia_fogli(fogli_anno))),
+            ("DOPO   finestra, vettoriale", len(finestra),
+             misura(lambda: griglia_fogli(db.query_fogli(2025)['fogli']))),
+            ("       solo griglia finestra", len(finestra), misura(lambda: griglia_fogli(finestra))),
+        ]
+
+        print()
+        print(f"{'Percorso':<34}{'Righe':>10}{'Tempo (ms)':>14}")
+        print("-" * 58)
+        for nome, n_righe, ms in righe:
+            print(f"{nome:<34}{n_righe:>10}{ms:>14.1f}")
+        print()
+        print(f"Speedup render: {righe[0][2] / righe[3][2]:.1f}x")
+        db.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark Lettura Excel
+
+Confronta, sullo stesso corpus sintetico di benchmark_parsing.py, le due
+modalità di accesso ai workbook usate da ExcelParser e dall'estrazione
+header dell'import massivo:
+  - PRIMA: load_workbook completo + sheet[row] / sheet['A1'] (ExcelParser)
+           e ws.cell(row, col) su foglio read_only (header import)
+  - DOPO:  leggi_griglia (iter_rows read_only limitato, letto una volta)
+  - XML:    estrattore unico con lettore XML diretto (xlsx_reader) invece
+            di openpyxl
+
+Per ogni modalità riporta file/s e picco di memoria per file (tracemalloc).
+
+Uso:
+    python benchmark_lettura_excel.py [numero_file] [cartella_corpus]
+"""
+
+import sys
+import shutil
+import logging
+import tempfile
+import time
+import tracemalloc
+
+from openpyxl import load_workbook
+
+from benchmark_parsing import genera_corpus
+import excel_parser
+from excel_parser import ExcelParser, estrai_dati_foglio, leggi_griglia
+
+KEYWORDS_HEADER = ["sig.", "porto d'arma", "porto d arma", "autorizzazione"]
+
+
+def header_prima(file_path: str) -> str:
+    """Accesso storico: ws.cell() su foglio read_only (riscansione per chiamata)"""
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    ws = wb.active
+    for row in range(1, 7):
+        for col in range(1, 81):
+            value = ws.cell(row=row, column=col).value
+            if value and isinstance(value, str) and len(value) > 50:
+                if any(kw in value.lower() for kw in KEYWORDS_HEADER):
+                    wb.close()
+                    return value.strip()
+    wb.close()
+    return ""
+
+
+def parser_prima(file_path: str) -> int:
+    """Accesso storico di ExcelParser: modello completo + sheet[row] e sheet['A{n}']"""
+    wb = load_workbook(file_path, data_only=True)
+    sheet = wb.active
+    letti = 0
+    for row_idx in range(1, 21):
+        for cell in sheet[row_idx]:
+            letti += cell.value is not None
+    for row_idx in range(1, 61):
+        letti += sheet[f'A{row_idx}'].value is not None
+    wb.close()
+    return letti
+
+
+def parser_dopo(file_path: str) -> int:
+    griglia = leggi_griglia(file_path, ExcelParser.GRID_MAX_ROW, ExcelParser.GRID_MAX_COL)
+    return sum(value is not None for row in griglia for value in row)
+
+
+def estrattore(usa_xml: bool):
+    """Estrattore unico con il lettore scelto"""
+    def estrai(file_path: str):
+        excel_parser.USA_LETTORE_XML = usa_xml
+        try:
+            return estrai_dati_foglio(file_path, 2025)
+        finally:
+            excel_parser.USA_LETTORE_XML = True
+    return estrai
+
+
+def misura(funzione, paths: list) -> tuple:
+    """Ritorna (file/s, picco memoria medio KB, picco memoria massimo KB)"""
+    picchi = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for path in paths:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        funzione(path)
+        picchi.append(tracemalloc.get_traced_memory()[1] - base)
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return len(paths) / elapsed, sum(picchi) / len(picchi) / 1024, max(picchi) / 1024
+
+
+def main():
+    quantita = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cartella = sys.argv[2] if len(sys.argv) > 2 else None
+    temporanea = cartella is None
+    if temporanea:
+        cartella = tempfile.mkdtemp(prefix="bench_lettura_")
+
+    # I parser loggano ogni file: non misurare l'I/O dei log
+    logging.disable(logging.CRITICAL)
+
+    try:
+        print("=" * 70)
+        print(f"BENCHMARK LETTURA EXCEL - {quantita} file")
+        print("=" * 70)
+
+        paths = genera_corpus(cartella, quantita)
+
+        casi = [
+            ("Header import - prima", header_prima),
+            ("Header import - dopo", lambda path: ExcelParser()._cerca_header(
+                leggi_griglia(path, ExcelParser.HEADER_MAX_ROW, ExcelParser.GRID_MAX_COL))),
+            ("ExcelParser lettura - prima", parser_prima),
+            ("ExcelParser lettura - dopo", parser_dopo),
+            ("Estrattore unico - openpyxl", estrattore(False)),
+            ("Estrattore unico - XML", estrattore(True)),
+        ]
+
+        print()
+        print(f"{'Caso':<30}{'File/s':>10}{'Picco medio KB':>16}{'Picco max KB':>14}")
+        print("-" * 70)
+        for nome, funzione in casi:
+            file_s, picco_medio, picco_max = misura(funzione, paths)
+            print(f"{nome:<30}{file_s:>10.1f}{picco_medio:>16.0f}{picco_max:>14.0f}")
+        print()
+
+        print(f"{'Template':<16}{'File':>8}{'ms medi':>10}{'Layout noti':>13}")
+        print("-" * 47)
+        for template, voce in ExcelParser.statistiche_template().items():
+            print(f"{template:<16}{voce['file']:>8}{voce['ms_medi']:>10.2f}{voce['layout_noti']:>13}")
+        print()
+    finally:
+        if temporanea:
+            shutil.rmtree(cartella, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
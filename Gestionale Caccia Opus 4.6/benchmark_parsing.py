@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark Parsing Import
+
+Genera un corpus sintetico di file Excel (modello RAS con header testuale)
+e misura il throughput dello stage di parsing dell'import massivo con
+1/2/4/8 processi.
+
+Uso:
+    python benchmark_parsing.py [numero_file] [cartella_corpus]
+
+Se cartella_corpus esiste già con file .xlsx viene riusata.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+from openpyxl import Workbook
+
+from import_parse import parse_files
+
+COGNOMI = ['ROSSI', 'BANDINO', 'CORONA', 'SERRA', 'PIRAS', 'MELIS', 'MURGIA', 'FLORIS']
+NOMI = ['Giuseppe', 'Mario', 'Antonio', 'Salvatore', 'Giovanni', 'Francesco']
+STATI = ['Stampato', 'Consegnato', 'Da rinnovare']
+
+
+def genera_corpus(cartella: str, quantita: int) -> list:
+    """Crea `quantita` file Excel simili ai fogli caccia reali"""
+    os.makedirs(cartella, exist_ok=True)
+    paths = []
+    for i in range(quantita):
+        cognome = COGNOMI[i % len(COGNOMI)]
+        nome = NOMI[i % len(NOMI)]
+        file_name = f"{cognome.title()} {nome}{i}({STATI[i % len(STATI)]}).xlsx"
+        path = os.path.join(cartella, file_name)
+        paths.append(path)
+        if os.path.exists(path):
+            continue
+
+        wb = Workbook()
+        ws = wb.active
+        ws['A1'] = "REGIONE AUTONOMA DELLA SARDEGNA - Assessorato della Difesa dell'Ambiente"
+        ws['A3'] = (f"Si rilascia al Sig. {cognome} {nome} in possesso del porto d'arma "
+                    f"n° AB{100000 + i} del 01/09/2025 autorizzazione regionale n° {5000 + i} "
+                    f"per la stagione venatoria 2025-26")
+        # Griglia delle giornate di caccia (contenuto tipico del foglio A3)
+        for row in range(8, 68):
+            for col in range(1, 13):
+                ws.cell(row=row, column=col, value=f"{row}-{col}" if col % 3 else None)
+        wb.save(path)
+    return paths
+
+
+def main():
+    quantita = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cartella = sys.argv[2] if len(sys.argv) > 2 else None
+    temporanea = cartella is None
+    if temporanea:
+        cartella = tempfile.mkdtemp(prefix="bench_parsing_")
+
+    try:
+        print("=" * 70)
+        print(f"BENCHMARK PARSING - {quantita} file (CPU disponibili: {os.cpu_count()})")
+        print("=" * 70)
+
+        start = time.perf_counter()
+        paths = genera_corpus(cartella, quantita)
+        print(f"Corpus pronto in {time.perf_counter() - start:.1f}s: {cartella}")
+        print()
+
+        print(f"{'Processi':>9}{'Tempo (s)':>12}{'File/s':>10}{'Speedup':>10}")
+        print("-" * 41)
+        base = None
+        for workers in (1, 2, 4, 8):
+            start = time.perf_counter()
+            risultati = parse_files(paths, 2025, workers=workers)
+            elapsed = time.perf_counter() - start
+            errori = sum(1 for r in risultati if r['errore'])
+            base = base or elapsed
+            print(f"{workers:>9}{elapsed:>12.2f}{len(paths) / elapsed:>10.1f}{base / elapsed:>9.2f}x"
+                  + (f"  ({errori} errori)" if errori else ""))
+        print()
+    finally:
+        if temporanea:
+            shutil.rmtree(cartella, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
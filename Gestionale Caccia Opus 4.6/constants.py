@@ -108,7 +108,35 @@ class Config:
     # Limiti
     MAX_FILE_SIZE_MB = 50
     MAX_BATCH_SIZE = 100
+    RICERCA_MAX_RISULTATI = 50        # Risultati della ricerca cacciatori (i più pertinenti)
+    FOGLI_PER_PAGINA = 200            # Righe per pagina nell'elenco fogli caccia
+    CACCIATORI_PER_PAGINA = 100       # Righe per pagina nell'anagrafe
+    DOCUMENTI_PER_PAGINA = 20         # Documenti per pagina nell'archivio
+    LOG_PER_PAGINA = 100              # Voci per pagina nel report attività
+    LOG_EXPORT_MAX = 500              # Voci più recenti nell'export CSV del report attività
     DB_TIMEOUT_SECONDS = 30.0
+    DB_POOL_SIZE = 5
+    
+    # Log attività asincrono
+    AUDIT_QUEUE_SIZE = 1000
+    AUDIT_BATCH_SIZE = 100
+    AUDIT_FLUSH_SECONDS = 1.0
+    
+    # Import massivo
+    IMPORT_PARSE_WORKERS = 4
+    IMPORT_CHECKPOINT_FILE = 200      # File analizzati per checkpoint del job di import
+    IMPORT_POLL_SECONDS = 1.0         # Intervallo di aggiornamento della pagina durante un job
+    PARSE_CACHE_MAX_VOCI = 20000      # Risultati di parsing in cache (oltre: via i meno usati di recente)
+    WATCH_POLL_SECONDS = 5.0          # Cartella sorvegliata: intervallo tra due scansioni
+    WATCH_DEBOUNCE_SECONDS = 3.0      # File fermo da almeno tanto (e invariato tra due scansioni)
+    WATCH_BATCH_FILE = 25             # File nuovi per job di import automatico
+    MATCH_SOGLIA = 0.85               # Punteggio minimo per abbinare un cacciatore esistente
+    MATCH_MARGINE_AMBIGUO = 0.05      # Candidati entro questo margine dal migliore = ambiguo
+    
+    # Telemetria import (JSONL, un record per file, rotazione per dimensione)
+    TELEMETRIA_FILE = "import_telemetria.jsonl"
+    TELEMETRIA_MAX_MB = 5
+    TELEMETRIA_BACKUP = 3
     
     # Versione
     VERSION = "1.1.0"
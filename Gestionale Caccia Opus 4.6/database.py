@@ -1,10 +1,303 @@
 import sqlite3
 import datetime as dt
 from typing import Optional, List, Dict
+from contextlib import contextmanager
 import os
+import atexit
+import queue
+import threading
+import time
+import weakref
+
+from constants import Config
+
+
+class PooledConnection:
+    """
+    Connessione prestata dal pool.
+    Si usa esattamente come una sqlite3.Connection: close() non chiude
+    la connessione fisica ma la restituisce al pool per il riuso.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', raw: sqlite3.Connection):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_raw', raw)
+
+    def _get_raw(self) -> sqlite3.Connection:
+        raw = object.__getattribute__(self, '_raw')
+        if raw is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return raw
+
+    def __getattr__(self, name):
+        return getattr(self._get_raw(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get_raw(), name, value)
+
+    def close(self):
+        """Restituisce la connessione al pool (idempotente)"""
+        raw = object.__getattribute__(self, '_raw')
+        if raw is None:
+            return
+        object.__setattr__(self, '_raw', None)
+        self._pool.release(raw)
+
+    def __enter__(self):
+        # Stessa semantica di sqlite3.Connection: commit/rollback, nessuna chiusura
+        self._get_raw().__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._get_raw().__exit__(exc_type, exc_value, traceback)
+
+    def __del__(self):
+        # Connessione dimenticata aperta: rimettila comunque nel pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool thread-safe di connessioni SQLite pre-configurate.
+
+    Le PRAGMA (WAL, busy_timeout) vengono applicate una sola volta alla
+    creazione della connessione. Il pool conserva al massimo `max_size`
+    connessioni inattive; se tutte sono in uso ne apre una temporanea,
+    che viene chiusa al rilascio (nessun blocco in caso di uso annidato,
+    es. log_attivita chiamato con una connessione già aperta).
+    """
+
+    def __init__(self, db_path: str, max_size: int = Config.DB_POOL_SIZE,
+                 timeout: float = Config.DB_TIMEOUT_SECONDS):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'create': 0, 'riuso': 0, 'scartate': 0}
+
+    def _create(self) -> sqlite3.Connection:
+        # check_same_thread=False: Streamlit esegue ogni rerun su un thread diverso,
+        # il pool garantisce che una connessione sia usata da un solo thread alla volta
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+
+        # TASK 2: Blindare database contro lock
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+
+        with self._lock:
+            self.stats['create'] += 1
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Preleva una connessione dal pool (o ne crea una nuova)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Pool di connessioni chiuso")
+        try:
+            raw = self._idle.get_nowait()
+            with self._lock:
+                self.stats['riuso'] += 1
+        except queue.Empty:
+            raw = self._create()
+        return PooledConnection(self, raw)
+
+    def release(self, raw: sqlite3.Connection):
+        """Rimette la connessione nel pool, annullando eventuali transazioni pendenti"""
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+            raw.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            # Connessione non più utilizzabile: scartala
+            self._discard(raw)
+            return
+
+        if self._closed:
+            self._discard(raw)
+            return
+
+        try:
+            self._idle.put_nowait(raw)
+        except queue.Full:
+            self._discard(raw)
+
+    def _discard(self, raw: sqlite3.Connection):
+        with self._lock:
+            self.stats['scartate'] += 1
+        try:
+            raw.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager: presta una connessione e la restituisce all'uscita"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Chiude tutte le connessioni inattive e disabilita il pool"""
+        self._closed = True
+        while True:
+            try:
+                raw = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                raw.close()
+            except sqlite3.Error:
+                pass
+
+
+class AuditLogWriter:
+    """
+    Scrittore asincrono del log attività.
+
+    Le voci vengono accodate in un buffer limitato e scritte da un thread in
+    background con executemany, in un'unica transazione per batch. Se il
+    buffer è pieno il chiamante esegue il flush in modo sincrono (backpressure),
+    così nessuna voce viene scartata. Un batch la cui scrittura fallisce (es.
+    database bloccato) resta in sospeso e viene riscritto per primo al flush
+    successivo. flush() viene chiamato anche allo shutdown.
+
+    Uno scrittore per database (acquisisci/rilascia), condiviso da tutte le
+    istanze di GestionaleCacciaDB sullo stesso file: Streamlit ne crea una per
+    sessione, ma i thread di scrittura e gli hook atexit restano uno solo.
+    """
+
+    INSERT_SQL = """
+        INSERT INTO log_attivita (utente, azione, tabella, record_id, dettagli, data_ora)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
+    _condivisi: Dict[str, 'AuditLogWriter'] = {}
+    _utenti: Dict[str, int] = {}
+    _lock_condivisi = threading.Lock()
+
+    @classmethod
+    def acquisisci(cls, db_path: str) -> 'AuditLogWriter':
+        """Scrittore condiviso del database (creato al primo utilizzo)"""
+        chiave = os.path.abspath(db_path)
+        with cls._lock_condivisi:
+            writer = cls._condivisi.get(chiave)
+            if writer is None:
+                # Pool proprio: non dipende dal pool dell'istanza che lo ha creato,
+                # che può essere chiusa mentre altre sessioni lo usano ancora
+                writer = cls(ConnectionPool(chiave, max_size=1))
+                cls._condivisi[chiave] = writer
+                cls._utenti[chiave] = 0
+            cls._utenti[chiave] += 1
+            return writer
+
+    @classmethod
+    def rilascia(cls, db_path: str):
+        """Rilascia lo scrittore condiviso: l'ultimo utente lo chiude"""
+        chiave = os.path.abspath(db_path)
+        with cls._lock_condivisi:
+            cls._utenti[chiave] -= 1
+            if cls._utenti[chiave] > 0:
+                return
+            writer = cls._condivisi.pop(chiave)
+            del cls._utenti[chiave]
+        writer.close()
+        writer._pool.close_all()
+
+    def __init__(self, pool: ConnectionPool, max_size: int = Config.AUDIT_QUEUE_SIZE,
+                 batch_size: int = Config.AUDIT_BATCH_SIZE,
+                 flush_interval: float = Config.AUDIT_FLUSH_SECONDS):
+        self._pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._in_sospeso: List[tuple] = []  # Voci di batch falliti, da riscrivere (sotto _flush_lock)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self.stats = {'accodate': 0, 'scritte': 0, 'batch': 0, 'errori': 0}
+
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, entry: tuple):
+        """Accoda una voce (utente, azione, tabella, record_id, dettagli, data_ora)"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Buffer pieno: svuotalo nel thread chiamante e riprova
+            self.flush()
+            self._queue.put(entry)
+        self.stats['accodate'] += 1
+
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Scrive tutte le voci in coda. Ritorna il numero di voci scritte."""
+        with self._flush_lock:
+            scritte = 0
+            while True:
+                batch = self._in_sospeso[:self.batch_size]
+                del self._in_sospeso[:self.batch_size]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return scritte
+
+                try:
+                    self._write_batch(batch)
+                except Exception:
+                    # Non bloccare le operazioni principali, ma senza perdere voci:
+                    # il batch torna in testa e si riprova al prossimo flush
+                    self._in_sospeso[:0] = batch
+                    self.stats['errori'] += 1
+                    return scritte
+
+                scritte += len(batch)
+                self.stats['scritte'] += len(batch)
+                self.stats['batch'] += 1
+
+    def _write_batch(self, batch: List[tuple]):
+        # Connessione dedicata (mai la transazione del thread chiamante)
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(self.INSERT_SQL, batch)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def close(self):
+        """Ferma il thread di scrittura e svuota il buffer (idempotente)"""
+        if not self._stop.is_set():
+            self._stop.set()
+            self._wakeup.set()
+            self._thread.join(timeout=self.flush_interval + 5)
+            atexit.unregister(self.close)
+        self.flush()
+
 
 class GestionaleCacciaDB:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = Config.DB_POOL_SIZE,
+                 audit_async: bool = True):
         if db_path is None:
             # Usa percorso assoluto nella directory dello script principale
             # Questo assicura che il database sia sempre nello stesso posto
@@ -14,19 +307,91 @@ class GestionaleCacciaDB:
             self.db_path = db_path
         
         print(f"[DEBUG] Database path: {self.db_path}")  # Per debug
+        self._pool = ConnectionPool(self.db_path, max_size=pool_size)
+        self._tx_local = threading.local()  # Transazione attiva per thread
         self.init_database()
+        
+        # Log attività scritto in background a batch (None = scrittura sincrona).
+        # Lo scrittore è condiviso per database e viene rilasciato da close() o,
+        # se close() non viene mai chiamato (sessione Streamlit), quando l'istanza
+        # viene raccolta dal garbage collector
+        self._audit = AuditLogWriter.acquisisci(self.db_path) if audit_async else None
+        self._rilascia_audit = (weakref.finalize(self, AuditLogWriter.rilascia, self.db_path)
+                                if audit_async else None)
     
     
     def get_connection(self):
-        """Crea connessione al database con timeout aumentato e WAL mode"""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        conn.row_factory = sqlite3.Row
-        
-        # TASK 2: Blindare database contro lock
-        conn.execute('PRAGMA journal_mode=WAL')
-        conn.execute('PRAGMA busy_timeout=5000')
+        """
+        Preleva dal pool una connessione già configurata (WAL, busy_timeout).
+        conn.close() la restituisce al pool invece di chiuderla.
+        """
+        return self._pool.acquire()
+    
+    @contextmanager
+    def connection(self):
+        """Context manager per una connessione del pool: with db.connection() as conn: ..."""
+        with self._pool.connection() as conn:
+            yield conn
+    
+    def close(self):
+        """Scrive il log in sospeso e chiude tutte le connessioni del pool (da chiamare allo shutdown)"""
+        if self._audit:
+            self._audit.flush()
+            self._rilascia_audit()
+        self._pool.close_all()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Unit-of-work: tutte le scritture eseguite nel blocco finiscono in
+        un'unica transazione SQLite (un solo commit), con rollback completo
+        in caso di eccezione.
+
+            with db.transaction():
+                db.set_stampato(foglio_id, True)
+                db.set_data_consegna(foglio_id, '2025-09-01')
+
+        I metodi di scrittura chiamati nel blocco riusano la stessa connessione.
+        Una transazione annidata (anche implicita, da un singolo metodo) diventa
+        un SAVEPOINT: se fallisce annulla solo le proprie modifiche.
+        """
+        stato = self._tx_local
+        conn = getattr(stato, 'conn', None)
+        
+        if conn is not None:
+            # Transazione già attiva nel thread: savepoint annidato
+            stato.depth += 1
+            savepoint = f"sp_{stato.depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+            finally:
+                stato.depth -= 1
+            return
         
-        return conn
+        conn = self.get_connection()
+        stato.conn = conn
+        stato.depth = 0
+        try:
+            # IMMEDIATE: prende subito il lock di scrittura (niente upgrade a metà transazione)
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            stato.conn = None
+            conn.close()
     
     def init_database(self):
         """Inizializza il database con le tabelle necessarie"""
@@ -169,6 +534,94 @@ class GestionaleCacciaDB:
             ON restituzioni_allegati(numero_foglio)
         """)
         
+        # Manifest import da cartella: un record per file già elaborato
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_manifest (
+                file_path TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                anno INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                esito TEXT NOT NULL,
+                messaggio TEXT,
+                dati TEXT,
+                numero_foglio TEXT,
+                foglio_id INTEGER,
+                aggiornato_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (foglio_id) REFERENCES fogli_caccia(id)
+            )
+        """)
+        
+        # Indice per riconoscere i file rinominati (stesso contenuto)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_import_manifest_hash 
+            ON import_manifest(content_hash)
+        """)
+        
+        # Journal dei job di import: un job per esecuzione, un item per file
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                anno INTEGER NOT NULL,
+                cartella TEXT,
+                origine TEXT NOT NULL DEFAULT 'manuale',
+                stato TEXT NOT NULL DEFAULT 'in_corso',
+                workers INTEGER,
+                chunk_size INTEGER,
+                rinominati TEXT,
+                durata_parsing REAL DEFAULT 0,
+                durata_scrittura REAL DEFAULT 0,
+                righe INTEGER DEFAULT 0,
+                messaggio TEXT,
+                creato_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                aggiornato_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completato_il TIMESTAMP
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_job_items (
+                job_id INTEGER NOT NULL,
+                file_path TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                size INTEGER,
+                mtime REAL,
+                content_hash TEXT,
+                stato TEXT NOT NULL DEFAULT 'in_attesa',
+                messaggio TEXT,
+                risultato TEXT,
+                aggiornato_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, file_path),
+                FOREIGN KEY (job_id) REFERENCES import_jobs(id) ON DELETE CASCADE
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_import_job_items_stato 
+            ON import_job_items(job_id, stato)
+        """)
+        
+        # Cache dei risultati di parsing: stesso contenuto e versione del parser
+        # (anno e nome file entrano nell'estrazione) = stesso risultato
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                content_hash TEXT NOT NULL,
+                versione_parser INTEGER NOT NULL,
+                anno INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                risultato TEXT NOT NULL,
+                creato_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ultimo_uso REAL NOT NULL,
+                PRIMARY KEY (content_hash, versione_parser, anno, file_name)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_parse_cache_uso 
+            ON parse_cache(ultimo_uso)
+        """)
+        
         
         
         # ========== MIGRATION SAFE: Colonna consegnato ==========
@@ -204,6 +657,8 @@ class GestionaleCacciaDB:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_cacciatori_tessera ON cacciatori(numero_tessera)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_cacciatori_attivo ON cacciatori(attivo)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_cacciatori_cognome ON cacciatori(cognome)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cacciatori_elenco ON cacciatori(cognome, nome)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cacciatori_attivi_elenco ON cacciatori(attivo, cognome, nome)")
         
         # Indici fogli_caccia
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_fogli_anno ON fogli_caccia(anno)")
@@ -213,6 +668,8 @@ class GestionaleCacciaDB:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_fogli_consegnato ON fogli_caccia(consegnato)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_fogli_restituito ON fogli_caccia(restituito)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_fogli_stampato ON fogli_caccia(stampato)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_fogli_anno_stato ON fogli_caccia(anno, stato)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_fogli_anno_rilascio ON fogli_caccia(anno, data_rilascio)")
         
         # Indici libretti_regionali
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_libretti_anno ON libretti_regionali(anno)")
@@ -224,50 +681,160 @@ class GestionaleCacciaDB:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_autorizzazioni_anno ON autorizzazioni_ras(anno)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_autorizzazioni_cacciatore ON autorizzazioni_ras(cacciatore_id)")
         
+        # Indici documenti
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_documenti_inserimento ON documenti(data_inserimento)")
+        
         # Indici log_attivita
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_log_data ON log_attivita(data_ora)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_log_tabella ON log_attivita(tabella)")
         
+        # Indice full-text per la ricerca cacciatori
+        self._fts_cacciatori = self._init_ricerca_cacciatori(cursor)
+        
+        # Contatori delle statistiche mantenuti dai trigger
+        self._init_statistiche(cursor)
+        
         conn.commit()
         conn.close()
     
+    # ========== RICERCA FULL-TEXT CACCIATORI ==========
+    
+    # Colonne indicizzate (anagrafica e contatti) e loro peso nella pertinenza
+    COLONNE_FTS_CACCIATORI = ('cognome', 'nome', 'numero_tessera', 'codice_fiscale',
+                              'comune', 'telefono', 'cellulare', 'email')
+    PESI_FTS_CACCIATORI = (10.0, 6.0, 8.0, 8.0, 2.0, 1.0, 1.0, 1.0)
+    
+    def _init_ricerca_cacciatori(self, cursor) -> Optional[str]:
+        """
+        Tabella FTS5 cacciatori_fts (contenuto esterno: la tabella cacciatori)
+        con i soli cacciatori attivi, tenuta allineata da trigger su insert,
+        update (anche soft delete: attivo = 0) e delete.
+        
+        Tokenizer trigram (ricerca per sottostringa, come LIKE '%...%') se
+        disponibile (SQLite >= 3.34), altrimenti unicode61 (ricerca per prefisso).
+        
+        Returns:
+            'trigram', 'unicode61' o None se FTS5 non è disponibile (ricerca con LIKE)
+        """
+        cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'cacciatori_fts'")
+        row = cursor.fetchone()
+        if row:
+            return 'trigram' if 'trigram' in row['sql'] else 'unicode61'
+        
+        colonne = ', '.join(self.COLONNE_FTS_CACCIATORI)
+        tokenizer = None
+        for candidato, opzioni in (('trigram', "tokenize='trigram'"),
+                                   ('unicode61', "tokenize='unicode61 remove_diacritics 2'")):
+            try:
+                cursor.execute(f"""
+                    CREATE VIRTUAL TABLE cacciatori_fts USING fts5(
+                        {colonne}, content='cacciatori', content_rowid='id', {opzioni}
+                    )
+                """)
+                tokenizer = candidato
+                break
+            except sqlite3.OperationalError:
+                continue
+        if tokenizer is None:
+            return None
+        
+        nuovi = ', '.join(f"new.{c}" for c in self.COLONNE_FTS_CACCIATORI)
+        vecchi = ', '.join(f"old.{c}" for c in self.COLONNE_FTS_CACCIATORI)
+        cursor.executescript(f"""
+            CREATE TRIGGER cacciatori_fts_ai AFTER INSERT ON cacciatori WHEN new.attivo = 1 BEGIN
+                INSERT INTO cacciatori_fts(rowid, {colonne}) VALUES (new.id, {nuovi});
+            END;
+            
+            CREATE TRIGGER cacciatori_fts_ad AFTER DELETE ON cacciatori WHEN old.attivo = 1 BEGIN
+                INSERT INTO cacciatori_fts(cacciatori_fts, rowid, {colonne}) VALUES ('delete', old.id, {vecchi});
+            END;
+            
+            CREATE TRIGGER cacciatori_fts_au AFTER UPDATE OF {colonne}, attivo ON cacciatori BEGIN
+                INSERT INTO cacciatori_fts(cacciatori_fts, rowid, {colonne})
+                    SELECT 'delete', old.id, {vecchi} WHERE old.attivo = 1;
+                INSERT INTO cacciatori_fts(rowid, {colonne})
+                    SELECT new.id, {nuovi} WHERE new.attivo = 1;
+            END;
+            
+            INSERT INTO cacciatori_fts(rowid, {colonne})
+                SELECT id, {colonne} FROM cacciatori WHERE attivo = 1;
+        """)
+        return tokenizer
+    
+    def _query_fts_cacciatori(self, termine: str) -> Optional[str]:
+        """
+        Espressione MATCH per il termine (tutte le parole devono comparire),
+        None se l'indice non può rispondere: FTS5 non disponibile, oppure
+        trigram con parole sotto i 3 caratteri.
+        """
+        parole = termine.split()
+        if not self._fts_cacciatori or not parole:
+            return None
+        if self._fts_cacciatori == 'trigram':
+            if any(len(parola) < 3 for parola in parole):
+                return None
+            return ' '.join('"' + parola.replace('"', '""') + '"' for parola in parole)
+        return ' '.join('"' + parola.replace('"', '""') + '"*' for parola in parole)
+    
+    # Colonne in cui l'uguaglianza (peso x2) o il prefisso (x1.5) di una parola
+    # decidono l'ordine dei risultati
+    COLONNE_PERTINENZA = ('cognome', 'nome', 'numero_tessera', 'codice_fiscale')
+    
+    def _sql_pertinenza(self, parole: List[str]) -> tuple:
+        """
+        ORDER BY dei risultati full-text, con i parametri: la somma, per ogni
+        parola, del peso della colonna principale che le è uguale (x2) o inizia
+        con essa (x1.5), poi cognome e nome. Calcolato in SQL su tutte le
+        corrispondenze, prima del LIMIT: il cognome esatto non resta mai fuori
+        dietro a centinaia di cognomi che lo contengono.
+        (bm25 di FTS5 costa centinaia di ms sui termini molto comuni.)
+        """
+        pesi = dict(zip(self.COLONNE_FTS_CACCIATORI, self.PESI_FTS_CACCIATORI))
+        termini = []
+        params = []
+        for parola in parole:
+            for colonna in self.COLONNE_PERTINENZA:
+                valore = f"UPPER(c.{colonna})"
+                termini.append(f"CASE WHEN {valore} = ? THEN {pesi[colonna] * 2} "
+                               f"WHEN SUBSTR({valore}, 1, ?) = ? THEN {pesi[colonna] * 1.5} ELSE 0 END")
+                params.extend([parola, len(parola), parola])
+        return f"({' + '.join(termini)}) DESC, c.cognome, c.nome", params
+    
     # ========== GESTIONE CACCIATORI ==========
     
     def aggiungi_cacciatore(self, dati: Dict) -> int:
         """Aggiunge un nuovo cacciatore"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO cacciatori (
-                numero_tessera, cognome, nome, data_nascita, luogo_nascita,
-                codice_fiscale, indirizzo, comune, provincia, cap,
-                telefono, cellulare, email, note
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            dati.get('numero_tessera'),
-            dati.get('cognome'),
-            dati.get('nome'),
-            dati.get('data_nascita'),
-            dati.get('luogo_nascita'),
-            dati.get('codice_fiscale'),
-            dati.get('indirizzo'),
-            dati.get('comune'),
-            dati.get('provincia'),
-            dati.get('cap'),
-            dati.get('telefono'),
-            dati.get('cellulare'),
-            dati.get('email'),
-            dati.get('note')
-        ))
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                INSERT INTO cacciatori (
+                    numero_tessera, cognome, nome, data_nascita, luogo_nascita,
+                    codice_fiscale, indirizzo, comune, provincia, cap,
+                    telefono, cellulare, email, note
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                dati.get('numero_tessera'),
+                dati.get('cognome'),
+                dati.get('nome'),
+                dati.get('data_nascita'),
+                dati.get('luogo_nascita'),
+                dati.get('codice_fiscale'),
+                dati.get('indirizzo'),
+                dati.get('comune'),
+                dati.get('provincia'),
+                dati.get('cap'),
+                dati.get('telefono'),
+                dati.get('cellulare'),
+                dati.get('email'),
+                dati.get('note')
+            ))
         
-        cacciatore_id = cursor.lastrowid
+            cacciatore_id = cursor.lastrowid
         
-        self.log_attivita('SISTEMA', 'INSERT', 'cacciatori', cacciatore_id, 
-                         f"Aggiunto cacciatore: {dati.get('cognome')} {dati.get('nome')}")
+            self.log_attivita('SISTEMA', 'INSERT', 'cacciatori', cacciatore_id, 
+                             f"Aggiunto cacciatore: {dati.get('cognome')} {dati.get('nome')}")
         
-        conn.commit()
-        conn.close()
         return cacciatore_id
     
     def modifica_cacciatore(self, cacciatore_id: int, dati: Dict):
@@ -312,7 +879,7 @@ class GestionaleCacciaDB:
         ))
         
         self.log_attivita('SISTEMA', 'UPDATE', 'cacciatori', cacciatore_id,
-                         f"Modificato cacciatore: {dati.get('cognome')} {dati.get('nome')}")
+                         f"Modificato cacciatore: {dati.get('cognome')} {dati.get('nome')}", conn=conn)
         
         conn.commit()
         conn.close()
@@ -328,7 +895,7 @@ class GestionaleCacciaDB:
         """, (cacciatore_id,))
         
         self.log_attivita('SISTEMA', 'DELETE', 'cacciatori', cacciatore_id,
-                         "Disattivato cacciatore")
+                         "Disattivato cacciatore", conn=conn)
         
         conn.commit()
         conn.close()
@@ -398,7 +965,7 @@ class GestionaleCacciaDB:
         cursor.execute(query, values)
         
         self.log_attivita('SISTEMA', 'UPDATE', 'cacciatori', cacciatore_id,
-                         f"Aggiornato cacciatore (import): {', '.join(dati_parziali.keys())}")
+                         f"Aggiornato cacciatore (import): {', '.join(dati_parziali.keys())}", conn=conn)
         
         conn.commit()
         conn.close()
@@ -430,21 +997,88 @@ class GestionaleCacciaDB:
         
         return [dict(row) for row in rows]
     
-    def cerca_cacciatori(self, termine: str) -> List[Dict]:
-        """Cerca cacciatori per nome, cognome o numero tessera"""
+    def _pagina_keyset(self, select: str, condizioni: List[str], params: List, chiavi: List[str],
+                       cursore: Optional[tuple], limit: int, discendente: bool = False) -> Dict:
+        """
+        Pagina con paginazione keyset: le righe che seguono `cursore` nell'ordine
+        di `chiavi` (l'ultima chiave è l'id, così l'ordine è totale). Senza
+        OFFSET il costo di una pagina non dipende da quante righe la precedono.
+        
+        Returns:
+            Dict con 'righe' e 'cursore' (valori delle chiavi dell'ultima riga, da
+            passare per la pagina seguente; None se non ci sono altre righe)
+        """
+        condizioni = list(condizioni)
+        params = list(params)
+        if cursore is not None:
+            segnaposto = ", ".join("?" * len(chiavi))
+            condizioni.append(f"({', '.join(chiavi)}) {'<' if discendente else '>'} ({segnaposto})")
+            params.extend(cursore)
+        
+        where = f"WHERE {' AND '.join(condizioni)}" if condizioni else ""
+        ordine = ", ".join(f"{chiave} DESC" if discendente else chiave for chiave in chiavi)
+        
         conn = self.get_connection()
         cursor = conn.cursor()
+        # Una riga in più per sapere se esiste la pagina seguente
+        cursor.execute(f"{select} {where} ORDER BY {ordine} LIMIT ?", [*params, limit + 1])
+        righe = [dict(row) for row in cursor.fetchall()]
+        conn.close()
         
-        cursor.execute("""
-            SELECT * FROM cacciatori 
-            WHERE attivo = 1 AND (
-                cognome LIKE ? OR 
-                nome LIKE ? OR 
-                numero_tessera LIKE ? OR
-                codice_fiscale LIKE ?
-            )
-            ORDER BY cognome, nome
-        """, (f"%{termine}%", f"%{termine}%", f"%{termine}%", f"%{termine}%"))
+        prossimo = None
+        if len(righe) > limit:
+            righe = righe[:limit]
+            prossimo = tuple(righe[-1][chiave.split('.')[-1]] for chiave in chiavi)
+        return {'righe': righe, 'cursore': prossimo}
+    
+    def get_cacciatori_pagina(self, solo_attivi: bool = True, cursore: Optional[tuple] = None,
+                              limit: int = Config.CACCIATORI_PER_PAGINA) -> Dict:
+        """
+        Pagina di cacciatori ordinati per cognome e nome (vedi _pagina_keyset).
+        `cursore`: il 'cursore' della pagina precedente, None per la prima.
+        """
+        return self._pagina_keyset(
+            "SELECT * FROM cacciatori", ["attivo = 1"] if solo_attivi else [], [],
+            ['cognome', 'nome', 'id'], cursore, limit
+        )
+    
+    def conta_cacciatori(self, solo_attivi: bool = True) -> int:
+        """Numero di cacciatori (attivi o tutti), dai contatori statistiche"""
+        chiave = ('cacciatori_attivi' if solo_attivi else 'cacciatori_totale', 0)
+        return self._contatori([chiave])[chiave]
+    
+    def cerca_cacciatori(self, termine: str, limit: int = Config.RICERCA_MAX_RISULTATI) -> List[Dict]:
+        """
+        Cerca cacciatori attivi per cognome, nome, numero tessera, codice fiscale
+        e contatti. Con l'indice FTS5 i risultati sono ordinati per pertinenza
+        (vedi _sql_pertinenza); senza indice, o per parole troppo corte, ricerca
+        LIKE ordinata per cognome e nome. Al massimo `limit` risultati.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        match = self._query_fts_cacciatori(termine)
+        if match:
+            ordine, params = self._sql_pertinenza(termine.upper().split())
+            cursor.execute(f"""
+                SELECT c.* FROM cacciatori_fts
+                JOIN cacciatori c ON c.id = cacciatori_fts.rowid
+                WHERE cacciatori_fts MATCH ?
+                ORDER BY {ordine}
+                LIMIT ?
+            """, [match, *params, limit])
+        else:
+            cursor.execute("""
+                SELECT * FROM cacciatori 
+                WHERE attivo = 1 AND (
+                    cognome LIKE ? OR 
+                    nome LIKE ? OR 
+                    numero_tessera LIKE ? OR
+                    codice_fiscale LIKE ?
+                )
+                ORDER BY cognome, nome
+                LIMIT ?
+            """, (f"%{termine}%", f"%{termine}%", f"%{termine}%", f"%{termine}%", limit))
         
         rows = cursor.fetchall()
         conn.close()
@@ -477,7 +1111,7 @@ class GestionaleCacciaDB:
         libretto_id = cursor.lastrowid
         
         self.log_attivita('SISTEMA', 'INSERT', 'libretti_regionali', libretto_id,
-                         f"Aggiunto libretto {dati.get('numero_libretto')} anno {dati.get('anno')}")
+                         f"Aggiunto libretto {dati.get('numero_libretto')} anno {dati.get('anno')}", conn=conn)
         
         conn.commit()
         conn.close()
@@ -521,9 +1155,7 @@ class GestionaleCacciaDB:
     
     def aggiungi_foglio_caccia(self, dati: Dict) -> int:
         """Aggiunge un nuovo foglio caccia"""
-        conn = None
-        try:
-            conn = self.get_connection()
+        with self.transaction() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -549,67 +1181,81 @@ class GestionaleCacciaDB:
             ))
             
             foglio_id = cursor.lastrowid
-            conn.commit()
             
-            # Log dopo il commit per evitare lock
-            try:
-                self.log_attivita('SISTEMA', 'INSERT', 'fogli_caccia', foglio_id,
-                                 f"Aggiunto foglio {dati.get('numero_foglio')}")
-            except:
-                pass  # Non bloccare per errori di log
+            # Log nella stessa transazione (nessun lock aggiuntivo)
+            self.log_attivita('SISTEMA', 'INSERT', 'fogli_caccia', foglio_id,
+                             f"Aggiunto foglio {dati.get('numero_foglio')}")
+        
+        return foglio_id
+    
+    def crea_fogli_range(self, anno: int, numero_iniziale: int, quantita: int,
+                         tipo: str = 'A3') -> Dict[str, int]:
+        """
+        Crea in blocco i fogli numerati da numero_iniziale a numero_iniziale + quantita - 1.
+        I numeri già esistenti vengono saltati (INSERT OR IGNORE).
+        Un'unica transazione e un'unica voce di log riepilogativa.
+        
+        Returns:
+            Dict con 'creati' e 'saltati'
+        """
+        if quantita <= 0:
+            return {'creati': 0, 'saltati': 0}
+        
+        numero_finale = numero_iniziale + quantita - 1
+        
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT OR IGNORE INTO fogli_caccia (numero_foglio, anno, tipo, stato)
+                VALUES (?, ?, ?, 'DISPONIBILE')
+            """, ((str(numero), anno, tipo) for numero in range(numero_iniziale, numero_finale + 1)))
             
-            return foglio_id
+            creati = cursor.rowcount
+            saltati = quantita - creati
             
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            raise e
-        finally:
-            if conn:
-                conn.close()
+            self.log_attivita('SISTEMA', 'INSERT', 'fogli_caccia', 0,
+                             f"Creati {creati} fogli {tipo} anno {anno} "
+                             f"({numero_iniziale}-{numero_finale}), {saltati} già esistenti")
+        
+        return {'creati': creati, 'saltati': saltati}
     
     def modifica_foglio_caccia(self, foglio_id: int, dati: Dict):
         """Modifica un foglio caccia"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE fogli_caccia SET
-                cacciatore_id = ?,
-                data_consegna = ?,
-                consegnato_da = ?,
-                data_rilascio = ?,
-                rilasciato_a = ?,
-                data_restituzione = ?,
-                restituito_da = ?,
-                stato = ?,
-                note = ?,
-                data_modifica = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (
-            dati.get('cacciatore_id'),
-            dati.get('data_consegna'),
-            dati.get('consegnato_da'),
-            dati.get('data_rilascio'),
-            dati.get('rilasciato_a'),
-            dati.get('data_restituzione'),
-            dati.get('restituito_da'),
-            dati.get('stato'),
-            dati.get('note'),
-            foglio_id
-        ))
-        
-        self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
-                         f"Modificato foglio caccia")
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                UPDATE fogli_caccia SET
+                    cacciatore_id = ?,
+                    data_consegna = ?,
+                    consegnato_da = ?,
+                    data_rilascio = ?,
+                    rilasciato_a = ?,
+                    data_restituzione = ?,
+                    restituito_da = ?,
+                    stato = ?,
+                    note = ?,
+                    data_modifica = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (
+                dati.get('cacciatore_id'),
+                dati.get('data_consegna'),
+                dati.get('consegnato_da'),
+                dati.get('data_rilascio'),
+                dati.get('rilasciato_a'),
+                dati.get('data_restituzione'),
+                dati.get('restituito_da'),
+                dati.get('stato'),
+                dati.get('note'),
+                foglio_id
+            ))
+            
+            self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
+                             f"Modificato foglio caccia")
     
     def set_consegnato(self, foglio_id: int, value: bool) -> None:
         """Imposta lo stato consegnato di un foglio (checkbox) e aggiorna il campo stato"""
-        conn = None
-        try:
-            conn = self.get_connection()
+        with self.transaction() as conn:
             cursor = conn.cursor()
             
             # Aggiorna sia il campo consegnato che il campo stato
@@ -638,34 +1284,13 @@ class GestionaleCacciaDB:
                     WHERE id = ?
                 """, (foglio_id,))
             
-            conn.commit()
-            
             # Log opzionale (non bloccante)
-            try:
-                self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
-                                 f"Consegnato: {value}, stato aggiornato")
-            except:
-                pass
-                
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+            self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
+                             f"Consegnato: {value}, stato aggiornato")
     
     def set_data_consegna(self, foglio_id: int, data: str) -> None:
         """Imposta la data di consegna di un foglio e aggiorna consegnato/stato di conseguenza"""
-        conn = None
-        try:
-            conn = self.get_connection()
+        with self.transaction() as conn:
             cursor = conn.cursor()
 
             if data:
@@ -692,33 +1317,12 @@ class GestionaleCacciaDB:
                     WHERE id = ?
                 """, (foglio_id,))
 
-            conn.commit()
-
-            try:
-                self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
-                                 f"Data consegna: {data}")
-            except:
-                pass
-
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+            self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
+                             f"Data consegna: {data}")
 
     def toggle_consegnato(self, foglio_id: int) -> bool:
         """Toggle stato consegnato e ritorna nuovo valore, mantenendo stato coerente"""
-        conn = None
-        try:
-            conn = self.get_connection()
+        with self.transaction() as conn:
             cursor = conn.cursor()
 
             # Leggi valore attuale
@@ -752,36 +1356,15 @@ class GestionaleCacciaDB:
                     WHERE id = ?
                 """, (foglio_id,))
 
-            conn.commit()
-
             # Log (non bloccante)
-            try:
-                self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
-                                 f"Toggle consegnato: {bool(new_value)}, stato aggiornato")
-            except Exception:
-                pass
+            self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
+                             f"Toggle consegnato: {bool(new_value)}, stato aggiornato")
 
-            return bool(new_value)
-            
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+        return bool(new_value)
     
     def set_restituito(self, foglio_id: int, value: bool) -> None:
         """Imposta lo stato restituito di un foglio (checkbox) e aggiorna il campo stato"""
-        conn = None
-        try:
-            conn = self.get_connection()
+        with self.transaction() as conn:
             cursor = conn.cursor()
             
             # Aggiorna sia il campo restituito che il campo stato
@@ -808,118 +1391,51 @@ class GestionaleCacciaDB:
                         END,
                         data_modifica = CURRENT_TIMESTAMP
                     WHERE id = ?
-                """, (foglio_id,))
-            
-            conn.commit()
-            
-            # Log opzionale
-            try:
-                self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
-                                 f"Restituito: {value}, stato aggiornato")
-            except:
-                pass
-                
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+                """, (foglio_id,))
+            
+            # Log opzionale
+            self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
+                             f"Restituito: {value}, stato aggiornato")
     
     def set_stampato(self, foglio_id: int, value: bool) -> None:
         """Imposta lo stato stampato di un foglio (checkbox)"""
-        conn = None
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute("""
+        with self.transaction() as conn:
+            conn.execute("""
                 UPDATE fogli_caccia
                 SET stampato = ?, data_modifica = CURRENT_TIMESTAMP
                 WHERE id = ?
             """, (1 if value else 0, foglio_id))
 
-            conn.commit()
-
-            try:
-                self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
-                                 f"Stampato: {value}")
-            except:
-                pass
-
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+            self.log_attivita('SISTEMA', 'UPDATE', 'fogli_caccia', foglio_id,
+                             f"Stampato: {value}")
 
     def set_data_rilascio(self, foglio_id: int, data: str) -> None:
         """Imposta la data rilascio di un foglio (campo editabile)"""
-        conn = None
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+        with self.transaction() as conn:
+            conn.execute("""
                 UPDATE fogli_caccia 
                 SET data_rilascio = ?, data_modifica = CURRENT_TIMESTAMP
                 WHERE id = ?
             """, (data if data else None, foglio_id))
-            
-            conn.commit()
-            
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
-    
     
     def set_data_restituzione(self, foglio_id: int, value) -> None:
         """Imposta la data restituzione di un foglio (campo editabile).
         Se viene impostata una data, lo stato passa a RESTITUITO.
         Se la data viene rimossa, lo stato torna a RILASCIATO."""
-        conn = None
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            # Convert date object to string if needed, or set to None
-            if value is None:
-                data_str = None
-            elif hasattr(value, 'strftime'):
-                # It's a date object
-                data_str = value.strftime('%Y-%m-%d')
-            else:
-                # It's already a string or None
-                data_str = value if value else None
+        # Convert date object to string if needed, or set to None
+        if value is None:
+            data_str = None
+        elif hasattr(value, 'strftime'):
+            # It's a date object
+            data_str = value.strftime('%Y-%m-%d')
+        else:
+            # It's already a string or None
+            data_str = value if value else None
 
+        with self.transaction() as conn:
             if data_str:
                 # Data impostata -> stato RESTITUITO
-                cursor.execute("""
+                conn.execute("""
                     UPDATE fogli_caccia
                     SET data_restituzione = ?, stato = 'RESTITUITO',
                         data_modifica = CURRENT_TIMESTAMP
@@ -927,61 +1443,25 @@ class GestionaleCacciaDB:
                 """, (data_str, foglio_id))
             else:
                 # Data rimossa -> stato torna a RILASCIATO
-                cursor.execute("""
+                conn.execute("""
                     UPDATE fogli_caccia
                     SET data_restituzione = NULL, stato = 'RILASCIATO',
                         restituito_da = NULL,
                         data_modifica = CURRENT_TIMESTAMP
                     WHERE id = ?
                 """, (foglio_id,))
-
-            conn.commit()
-            
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     def update_contatto_telefonico(self, cacciatore_id: int, value: str) -> None:
         """Aggiorna il contatto telefonico (cellulare) di un cacciatore"""
-        conn = None
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+        cellulare = value.strip() if value else None
 
-            cellulare = value.strip() if value else None
-
-            cursor.execute("""
+        with self.transaction() as conn:
+            conn.execute("""
                 UPDATE cacciatori
                 SET cellulare = ?
                 WHERE id = ?
             """, (cellulare, cacciatore_id))
 
-            conn.commit()
-
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            raise e
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
-
     def aggiorna_restituzione_foglio(self, foglio_id: int, data_restituzione: str,
                                      restituito_da: str = None, note: str = None) -> None:
         """Aggiorna i dati di restituzione di un foglio"""
@@ -1275,27 +1755,86 @@ class GestionaleCacciaDB:
         
         return [dict(row) for row in rows]
     
-    def get_statistiche_fogli(self, anno: int) -> Dict:
-        """Recupera statistiche sui fogli caccia di un anno"""
+    # Ordinamenti di query_fogli (chiave -> ORDER BY)
+    ORDINAMENTI_FOGLI = {
+        'cacciatore': "UPPER(COALESCE(c.cognome, f.rilasciato_a, '')), UPPER(COALESCE(c.nome, '')), f.numero_foglio",
+        'numero_foglio': "f.numero_foglio",
+        'data_rilascio': "f.data_rilascio IS NULL, f.data_rilascio, f.numero_foglio",
+    }
+    
+    def query_fogli(self, anno: int, stato: Optional[str] = None, testo: Optional[str] = None,
+                    con_file: bool = False, data_da: Optional[dt.date] = None,
+                    data_a: Optional[dt.date] = None, order: str = 'cacciatore',
+                    limit: int = Config.FOGLI_PER_PAGINA, offset: int = 0) -> Dict:
+        """
+        Pagina di fogli di un anno con filtri, ricerca e ordinamento eseguiti in SQL.
+        
+        Args:
+            stato: Stato esatto del foglio
+            testo: Ricerca (senza distinzione maiuscole) in numero foglio, cognome,
+                nome e rilasciato_a
+            con_file: Solo fogli con file Excel associato
+            data_da, data_a: Intervallo (estremi inclusi) della data di rilascio
+            order: Chiave di ORDINAMENTI_FOGLI
+            limit, offset: Pagina richiesta
+        
+        Returns:
+            Dict con 'fogli' (righe della pagina, come get_fogli_anno) e
+            'totale' (fogli che soddisfano i filtri)
+        """
+        condizioni = ["f.anno = ?"]
+        params: List = [anno]
+        
+        if stato:
+            condizioni.append("f.stato = ?")
+            params.append(stato)
+        if testo and testo.strip():
+            like = f"%{testo.strip()}%"
+            condizioni.append("(f.numero_foglio LIKE ? OR c.cognome LIKE ? OR c.nome LIKE ? OR f.rilasciato_a LIKE ?)")
+            params.extend([like] * 4)
+        if con_file:
+            condizioni.append("f.file_path IS NOT NULL AND f.file_path != ''")
+        if data_da:
+            condizioni.append("f.data_rilascio >= ?")
+            params.append(data_da.isoformat())
+        if data_a:
+            # Estremo escluso del giorno dopo: vale anche per date con orario
+            condizioni.append("f.data_rilascio < ?")
+            params.append((data_a + dt.timedelta(days=1)).isoformat())
+        
+        where = " AND ".join(condizioni)
+        ordinamento = self.ORDINAMENTI_FOGLI.get(order, self.ORDINAMENTI_FOGLI['cacciatore'])
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as totale,
-                SUM(CASE WHEN UPPER(stato) = 'DISPONIBILE' THEN 1 ELSE 0 END) as disponibili,
-                SUM(CASE WHEN UPPER(stato) = 'CONSEGNATO' THEN 1 ELSE 0 END) as consegnati,
-                SUM(CASE WHEN UPPER(stato) IN ('STAMPATO', 'RILASCIATO') THEN 1 ELSE 0 END) as rilasciati,
-                SUM(CASE WHEN UPPER(stato) LIKE '%RINNOVARE%' THEN 1 ELSE 0 END) as da_rinnovare,
-                SUM(CASE WHEN UPPER(stato) = 'RESTITUITO' THEN 1 ELSE 0 END) as restituiti
-            FROM fogli_caccia
-            WHERE anno = ?
-        """, (anno,))
+        cursor.execute(f"""
+            SELECT COUNT(*) AS totale
+            FROM fogli_caccia f
+            LEFT JOIN cacciatori c ON f.cacciatore_id = c.id
+            WHERE {where}
+        """, params)
+        totale = cursor.fetchone()['totale']
         
-        row = cursor.fetchone()
+        cursor.execute(f"""
+            SELECT f.*, c.cognome, c.nome, c.numero_tessera, c.telefono, c.cellulare
+            FROM fogli_caccia f
+            LEFT JOIN cacciatori c ON f.cacciatore_id = c.id
+            WHERE {where}
+            ORDER BY {ordinamento}
+            LIMIT ? OFFSET ?
+        """, [*params, limit, offset])
+        rows = cursor.fetchall()
         conn.close()
         
-        return dict(row) if row else {}
+        return {'fogli': [dict(row) for row in rows], 'totale': totale}
+    
+    def get_statistiche_fogli(self, anno: int) -> Dict:
+        """Recupera statistiche sui fogli caccia di un anno (dai contatori statistiche)"""
+        campi = ('totale', 'disponibili', 'consegnati', 'rilasciati', 'da_rinnovare',
+                 'restituiti', 'consegnati_flag')
+        valori = self._contatori([(f"fogli_{campo}", anno) for campo in campi])
+        return {campo: valori[(f"fogli_{campo}", anno)] for campo in campi}
 
     def cancella_tutti_fogli_anno(self, anno: int) -> int:
         """Cancella tutti i fogli caccia di un anno specifico e i relativi allegati.
@@ -1324,6 +1863,9 @@ class GestionaleCacciaDB:
             cursor.execute("DELETE FROM fogli_caccia WHERE anno = ?", (anno,))
             fogli_eliminati = cursor.rowcount
 
+            # I file importati per l'anno andranno rielaborati
+            cursor.execute("DELETE FROM import_manifest WHERE anno = ?", (anno,))
+
             conn.commit()
 
             # Log attività
@@ -1367,7 +1909,7 @@ class GestionaleCacciaDB:
         auth_id = cursor.lastrowid
         
         self.log_attivita('SISTEMA', 'INSERT', 'autorizzazioni_ras', auth_id,
-                         f"Aggiunta autorizzazione RAS")
+                         f"Aggiunta autorizzazione RAS", conn=conn)
         
         conn.commit()
         conn.close()
@@ -1432,31 +1974,331 @@ class GestionaleCacciaDB:
         
         return [dict(row) for row in rows]
     
+    def get_documenti_pagina(self, tipo_documento: Optional[str] = None, anno: Optional[int] = None,
+                             cursore: Optional[tuple] = None,
+                             limit: int = Config.DOCUMENTI_PER_PAGINA) -> Dict:
+        """
+        Pagina dell'archivio documenti (con cognome e nome del cacciatore),
+        dal più recente, con filtri opzionali per tipo e anno (vedi _pagina_keyset).
+        """
+        condizioni = []
+        params = []
+        if tipo_documento:
+            condizioni.append("d.tipo_documento = ?")
+            params.append(tipo_documento)
+        if anno:
+            condizioni.append("d.anno = ?")
+            params.append(anno)
+        
+        return self._pagina_keyset(
+            """
+            SELECT d.*, c.cognome, c.nome
+            FROM documenti d
+            LEFT JOIN cacciatori c ON d.cacciatore_id = c.id
+            """, condizioni, params, ['d.data_inserimento', 'd.id'], cursore, limit, discendente=True
+        )
+    
+    # ========== MANIFEST IMPORT ==========
+    
+    def get_import_manifest(self, anno: int) -> Dict[str, Dict]:
+        """Manifest dei file già elaborati per l'anno, indicizzato per file_path"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM import_manifest WHERE anno = ?", (anno,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return {row['file_path']: dict(row) for row in rows}
+    
+    def registra_import_manifest(self, voce: Dict) -> None:
+        """Inserisce o sostituisce la voce di manifest di un file"""
+        with self.transaction() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO import_manifest (
+                    file_path, file_name, anno, size, mtime, content_hash,
+                    esito, messaggio, dati, numero_foglio, foglio_id, aggiornato_il
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (
+                voce['file_path'],
+                voce['file_name'],
+                voce['anno'],
+                voce['size'],
+                voce['mtime'],
+                voce['content_hash'],
+                voce['esito'],
+                voce.get('messaggio'),
+                voce.get('dati'),
+                voce.get('numero_foglio'),
+                voce.get('foglio_id')
+            ))
+    
+    def sposta_import_manifest(self, vecchio_path: str, voce: Dict) -> None:
+        """
+        File rinominato/spostato con contenuto identico: sposta la voce di
+        manifest sul nuovo percorso e aggiorna file_path del foglio importato.
+        """
+        with self.transaction() as conn:
+            if vecchio_path != voce['file_path']:
+                conn.execute("DELETE FROM import_manifest WHERE file_path = ?", (vecchio_path,))
+            self.registra_import_manifest(voce)
+            
+            if voce.get('foglio_id'):
+                conn.execute(
+                    "UPDATE fogli_caccia SET file_path = ? WHERE id = ? AND file_path = ?",
+                    (voce['file_path'], voce['foglio_id'], vecchio_path)
+                )
+    
+    # ========== JOB IMPORT ==========
+    
+    # Stati finali di un item: il file non va più né analizzato né scritto
+    STATI_ITEM_FINALI = ('importato', 'esistente', 'scartato', 'ambiguo', 'errore', 'escluso')
+    
+    def crea_import_job(self, anno: int, cartella: str, files: List[Dict], stato: str = 'in_corso',
+                        workers: int = None, chunk_size: int = None, rinominati: str = None,
+                        origine: str = 'manuale') -> int:
+        """
+        Registra un job di import e i suoi file (stato 'in_attesa').
+        `files`: dict con file_path, file_name, size, mtime, content_hash.
+        `origine`: 'manuale' (pagina di import) o 'sorveglianza' (cartella sorvegliata).
+        """
+        with self.transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO import_jobs (anno, cartella, origine, stato, workers, chunk_size, rinominati)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (anno, cartella, origine, stato, workers, chunk_size, rinominati))
+            job_id = cursor.lastrowid
+            
+            conn.executemany("""
+                INSERT INTO import_job_items (job_id, file_path, file_name, size, mtime, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (job_id, f['file_path'], f['file_name'], f.get('size'), f.get('mtime'), f.get('content_hash'))
+                for f in files
+            ])
+        return job_id
+    
+    def aggiorna_import_job(self, job_id: int, **campi) -> None:
+        """Aggiorna i campi indicati del job (stato, durate, righe, messaggio, ...)"""
+        if not campi:
+            return
+        colonne = ', '.join(f"{nome} = ?" for nome in campi)
+        completato = ", completato_il = CURRENT_TIMESTAMP" if campi.get('stato') == 'completato' else ''
+        with self.transaction() as conn:
+            conn.execute(
+                f"UPDATE import_jobs SET {colonne}, aggiornato_il = CURRENT_TIMESTAMP{completato} WHERE id = ?",
+                (*campi.values(), job_id)
+            )
+    
+    def get_import_job(self, job_id: int) -> Optional[Dict]:
+        """Job con i conteggi per stato degli item (vedi get_import_jobs)"""
+        jobs = self.get_import_jobs(job_id=job_id)
+        return jobs[0] if jobs else None
+    
+    def get_import_jobs(self, limit: int = 50, job_id: int = None) -> List[Dict]:
+        """
+        Job più recenti con totale file e conteggi per stato:
+        processati (stati finali), importati, esistenti, errori, ambigui, analizzati.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        finali = ','.join('?' * len(self.STATI_ITEM_FINALI))
+        filtro = "WHERE j.id = ?" if job_id is not None else ""
+        parametri = list(self.STATI_ITEM_FINALI)
+        if job_id is not None:
+            parametri.append(job_id)
+        parametri.append(limit)
+        
+        cursor.execute(f"""
+            SELECT j.*,
+                   COUNT(i.file_path) AS totale,
+                   COALESCE(SUM(i.stato IN ({finali})), 0) AS processati,
+                   COALESCE(SUM(i.stato = 'importato'), 0) AS importati,
+                   COALESCE(SUM(i.stato = 'esistente'), 0) AS esistenti,
+                   COALESCE(SUM(i.stato = 'errore'), 0) AS errori,
+                   COALESCE(SUM(i.stato = 'ambiguo'), 0) AS ambigui,
+                   COALESCE(SUM(i.risultato IS NOT NULL), 0) AS analizzati
+            FROM import_jobs j
+            LEFT JOIN import_job_items i ON i.job_id = j.id
+            {filtro}
+            GROUP BY j.id
+            ORDER BY j.id DESC
+            LIMIT ?
+        """, parametri)
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [dict(row) for row in rows]
+    
+    def get_import_job_items(self, job_id: int, stati: Optional[List[str]] = None) -> List[Dict]:
+        """Item del job (nell'ordine di inserimento), opzionalmente filtrati per stato"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT * FROM import_job_items WHERE job_id = ?"
+        parametri = [job_id]
+        if stati:
+            query += f" AND stato IN ({','.join('?' * len(stati))})"
+            parametri.extend(stati)
+        cursor.execute(query + " ORDER BY rowid", parametri)
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [dict(row) for row in rows]
+    
+    def salva_risultati_job(self, job_id: int, risultati: List[tuple]) -> None:
+        """Checkpoint del parsing: coppie (file_path, risultato serializzato) -> stato 'analizzato'"""
+        with self.transaction() as conn:
+            conn.executemany("""
+                UPDATE import_job_items
+                SET risultato = ?, stato = 'analizzato', aggiornato_il = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND file_path = ?
+            """, [(risultato, job_id, file_path) for file_path, risultato in risultati])
+    
+    def registra_esito_job_item(self, job_id: int, file_path: str, stato: str,
+                                messaggio: str = None) -> None:
+        """Esito di scrittura di un file (nella stessa transazione del file)"""
+        with self.transaction() as conn:
+            conn.execute("""
+                UPDATE import_job_items
+                SET stato = ?, messaggio = ?, aggiornato_il = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND file_path = ?
+            """, (stato, messaggio, job_id, file_path))
+    
+    def get_log_import_automatico(self, cartella: str, limit: int = 100) -> List[Dict]:
+        """File importati automaticamente dalla cartella sorvegliata, più recenti prima"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT i.aggiornato_il, i.file_name, i.stato, i.messaggio, j.id AS job_id, j.anno
+            FROM import_job_items i
+            JOIN import_jobs j ON j.id = i.job_id
+            WHERE j.origine = 'sorveglianza' AND j.cartella = ?
+            ORDER BY i.aggiornato_il DESC, i.rowid DESC
+            LIMIT ?
+        """, (cartella, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [dict(row) for row in rows]
+    
+    def escludi_job_items(self, job_id: int, file_paths: List[str]) -> None:
+        """File scartati dall'operatore in anteprima: stato 'escluso'"""
+        with self.transaction() as conn:
+            conn.executemany("""
+                UPDATE import_job_items
+                SET stato = 'escluso', aggiornato_il = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND file_path = ?
+            """, [(job_id, file_path) for file_path in file_paths])
+    
+    # ========== CACHE PARSING ==========
+    
+    def get_parse_cache(self, chiavi: List[tuple], versione: int) -> Dict[tuple, str]:
+        """
+        Risultati serializzati in cache per le chiavi (content_hash, anno, file_name)
+        della versione del parser indicata. Aggiorna l'ultimo uso delle voci trovate.
+        """
+        cercate = set(chiavi)
+        hashes = list({chiave[0] for chiave in cercate})
+        trovati = {}
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        for inizio in range(0, len(hashes), 500):
+            blocco = hashes[inizio:inizio + 500]
+            cursor.execute(f"""
+                SELECT content_hash, anno, file_name, risultato FROM parse_cache
+                WHERE versione_parser = ? AND content_hash IN ({','.join('?' * len(blocco))})
+            """, [versione, *blocco])
+            for row in cursor.fetchall():
+                chiave = (row['content_hash'], row['anno'], row['file_name'])
+                if chiave in cercate:
+                    trovati[chiave] = row['risultato']
+        conn.close()
+        
+        if trovati:
+            adesso = time.time()
+            with self.transaction() as conn:
+                conn.executemany("""
+                    UPDATE parse_cache SET ultimo_uso = ?
+                    WHERE content_hash = ? AND versione_parser = ? AND anno = ? AND file_name = ?
+                """, [(adesso, h, versione, anno, nome) for h, anno, nome in trovati])
+        return trovati
+    
+    def salva_parse_cache(self, voci: List[tuple], versione: int,
+                          max_voci: int = Config.PARSE_CACHE_MAX_VOCI) -> int:
+        """
+        Salva in cache le voci (content_hash, anno, file_name, risultato serializzato),
+        elimina le voci di altre versioni del parser e, oltre `max_voci`, le meno
+        usate di recente.
+        
+        Returns:
+            Numero di voci eliminate
+        """
+        adesso = time.time()
+        with self.transaction() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO parse_cache
+                    (content_hash, versione_parser, anno, file_name, risultato, ultimo_uso)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(h, versione, anno, nome, risultato, adesso) for h, anno, nome, risultato in voci])
+            
+            eliminate = conn.execute(
+                "DELETE FROM parse_cache WHERE versione_parser != ?", (versione,)
+            ).rowcount
+            eliminate += conn.execute("""
+                DELETE FROM parse_cache WHERE rowid IN (
+                    SELECT rowid FROM parse_cache ORDER BY ultimo_uso DESC LIMIT -1 OFFSET ?
+                )
+            """, (max_voci,)).rowcount
+        return eliminate
+    
     # ========== LOG ATTIVITÀ ==========
     
     def log_attivita(self, utente: str, azione: str, tabella: str, 
-                     record_id: int, dettagli: str = None):
-        """Registra un'attività nel log"""
-        conn = None
+                     record_id: int, dettagli: str = None, conn=None):
+        """
+        Registra un'attività nel log.
+        
+        - conn passata: la voce è scritta nella transazione del chiamante
+          (stesso commit/rollback dei dati)
+        - transazione attiva (db.transaction()): scritta dentro di essa
+        - altrimenti: accodata allo scrittore asincrono (batch in background)
+        """
+        # Timestamp dell'evento (UTC come CURRENT_TIMESTAMP), non dell'eventuale flush
+        data_ora = dt.datetime.now(dt.timezone.utc).strftime(Config.DATETIME_FORMAT)
+        entry = (utente, azione, tabella, record_id, dettagli, data_ora)
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            if conn is None and getattr(self._tx_local, 'conn', None) is not None:
+                conn = self._tx_local.conn
             
-            cursor.execute("""
-                INSERT INTO log_attivita (utente, azione, tabella, record_id, dettagli)
-                VALUES (?, ?, ?, ?, ?)
-            """, (utente, azione, tabella, record_id, dettagli))
-            
-            conn.commit()
+            if conn is not None:
+                conn.execute(AuditLogWriter.INSERT_SQL, entry)
+            elif self._audit:
+                self._audit.put(entry)
+            else:
+                with self.transaction() as tx_conn:
+                    tx_conn.execute(AuditLogWriter.INSERT_SQL, entry)
         except Exception as e:
             # Log silenzioso - non bloccare operazioni principali
             pass
-        finally:
-            if conn:
-                conn.close()
+    
+    def flush_log_attivita(self):
+        """Forza la scrittura delle voci di log ancora in coda"""
+        if self._audit:
+            self._audit.flush()
     
     def get_log_attivita(self, limit: int = 100) -> List[Dict]:
         """Recupera il log delle attività recenti"""
+        self.flush_log_attivita()
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -1471,31 +2313,175 @@ class GestionaleCacciaDB:
         
         return [dict(row) for row in rows]
     
-    # ========== STATISTICHE ==========
+    def get_log_pagina(self, cursore: Optional[tuple] = None, limit: int = Config.LOG_PER_PAGINA) -> Dict:
+        """Pagina del log attività, dalla più recente (vedi _pagina_keyset)"""
+        self.flush_log_attivita()
+        return self._pagina_keyset("SELECT * FROM log_attivita", [], [], ['data_ora', 'id'],
+                                   cursore, limit, discendente=True)
     
-    def get_statistiche_generali(self) -> Dict:
-        """Recupera statistiche generali del sistema"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        stats = {}
-        
-        # Cacciatori attivi
-        cursor.execute("SELECT COUNT(*) as count FROM cacciatori WHERE attivo = 1")
-        stats['cacciatori_attivi'] = cursor.fetchone()['count']
+    # ========== CONTATORI STATISTICHE ==========
+    
+    # Per tabella: anno del contatore (0 = contatore globale), colonne che lo
+    # modificano e contatori (chiave, contributo della riga). {r} è new/old nei
+    # trigger e il nome della tabella nel conteggio completo.
+    CONTATORI_STATISTICHE = {
+        'fogli_caccia': ('{r}.anno', ('anno', 'stato', 'consegnato'), (
+            ('fogli_totale', '1'),
+            ('fogli_disponibili', "UPPER({r}.stato) = 'DISPONIBILE'"),
+            ('fogli_consegnati', "UPPER({r}.stato) = 'CONSEGNATO'"),
+            ('fogli_rilasciati', "UPPER({r}.stato) IN ('STAMPATO', 'RILASCIATO')"),
+            ('fogli_da_rinnovare', "UPPER({r}.stato) LIKE '%RINNOVARE%'"),
+            ('fogli_restituiti', "UPPER({r}.stato) = 'RESTITUITO'"),
+            ('fogli_consegnati_flag', '{r}.consegnato'),
+        )),
+        'libretti_regionali': ('{r}.anno', ('anno',), (
+            ('libretti', '1'),
+        )),
+        'cacciatori': ('0', ('attivo',), (
+            ('cacciatori_totale', '1'),
+            ('cacciatori_attivi', '{r}.attivo = 1'),
+        )),
+        'autorizzazioni_ras': ('0', ('stato',), (
+            ('autorizzazioni_in_attesa', "{r}.stato = 'IN_ATTESA'"),
+        )),
+    }
+    
+    _UPSERT_CONTATORE = """
+        INSERT INTO statistiche_counters (chiave, anno, valore) {select}
+        ON CONFLICT (chiave, anno) DO UPDATE SET valore = valore + excluded.valore;"""
+    
+    def _sql_trigger_statistiche(self, tabella: str, righe: tuple) -> str:
+        """
+        Corpo del trigger: per ogni contatore somma il contributo di new e/o
+        sottrae quello di old (righe: ('new',), ('old',) o ('old', 'new')).
+        Le variazioni nulle non scrivono nulla.
+        """
+        anno, _, contatori = self.CONTATORI_STATISTICHE[tabella]
+        istruzioni = []
+        for chiave, valore in contatori:
+            if len(righe) == 1:
+                r = righe[0]
+                delta = f"{'-' if r == 'old' else ''}COALESCE({valore.format(r=r)}, 0)"
+                select = f"SELECT '{chiave}', {anno.format(r=r)}, {delta} WHERE {delta} != 0"
+            else:
+                # Update: old e new possono cadere in anni diversi, raggruppati per anno
+                parti = " UNION ALL ".join(
+                    f"SELECT {anno.format(r=r)} AS anno, {'-' if r == 'old' else ''}COALESCE({valore.format(r=r)}, 0) AS delta"
+                    for r in righe
+                )
+                select = (f"SELECT '{chiave}', anno, SUM(delta) FROM ({parti}) WHERE 1 "
+                          f"GROUP BY anno HAVING SUM(delta) != 0")
+            istruzioni.append(self._UPSERT_CONTATORE.format(select=select))
+        return "".join(istruzioni)
+    
+    def _init_statistiche(self, cursor):
+        """
+        Tabella statistiche_counters (chiave, anno) -> valore, tenuta esatta dai
+        trigger su insert, update delle colonne interessate e delete: le
+        statistiche sono letture per chiave primaria invece di conteggi sulle
+        tabelle. Alla creazione è popolata con un conteggio completo.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'statistiche_counters'")
+        if cursor.fetchone():
+            return
         
-        # Libretti anno corrente
-        anno_corrente = dt.datetime.now().year
-        cursor.execute("SELECT COUNT(*) as count FROM libretti_regionali WHERE anno = ?", (anno_corrente,))
-        stats['libretti_anno_corrente'] = cursor.fetchone()['count']
+        cursor.execute("""
+            CREATE TABLE statistiche_counters (
+                chiave TEXT NOT NULL,
+                anno INTEGER NOT NULL,
+                valore INTEGER NOT NULL,
+                PRIMARY KEY (chiave, anno)
+            ) WITHOUT ROWID
+        """)
+        for tabella, (_, colonne, _) in self.CONTATORI_STATISTICHE.items():
+            cursor.execute(f"""
+                CREATE TRIGGER statistiche_{tabella}_ai AFTER INSERT ON {tabella} BEGIN
+                    {self._sql_trigger_statistiche(tabella, ('new',))}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER statistiche_{tabella}_ad AFTER DELETE ON {tabella} BEGIN
+                    {self._sql_trigger_statistiche(tabella, ('old',))}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER statistiche_{tabella}_au AFTER UPDATE OF {', '.join(colonne)} ON {tabella} BEGIN
+                    {self._sql_trigger_statistiche(tabella, ('old', 'new'))}
+                END
+            """)
+        
+        cursor.executemany(
+            "INSERT INTO statistiche_counters (chiave, anno, valore) VALUES (?, ?, ?)",
+            [(chiave, anno, valore) for (chiave, anno), valore in self._conteggi_statistiche(cursor).items()]
+        )
+    
+    def _conteggi_statistiche(self, cursor) -> Dict[tuple, int]:
+        """Conteggio completo dei contatori dalle tabelle: {(chiave, anno): valore}, senza gli zeri"""
+        conteggi = {}
+        for tabella, (anno, _, contatori) in self.CONTATORI_STATISTICHE.items():
+            somme = ", ".join(f"SUM(COALESCE({valore.format(r=tabella)}, 0))" for _, valore in contatori)
+            cursor.execute(f"SELECT {anno.format(r=tabella)} AS anno, {somme} FROM {tabella} GROUP BY 1")
+            for row in cursor.fetchall():
+                for (chiave, _), valore in zip(contatori, tuple(row)[1:]):
+                    if valore:
+                        conteggi[(chiave, row[0])] = valore
+        return conteggi
+    
+    def ricostruisci_statistiche(self, correggi: bool = True) -> Dict:
+        """
+        Verifica i contatori confrontandoli con un conteggio completo e, se
+        `correggi`, li riscrive. Eseguito in transazione (BEGIN IMMEDIATE):
+        nessuna scrittura concorrente tra conteggio e confronto.
         
-        # Fogli caccia anno corrente
-        cursor.execute("SELECT COUNT(*) as count FROM fogli_caccia WHERE anno = ?", (anno_corrente,))
-        stats['fogli_anno_corrente'] = cursor.fetchone()['count']
+        Returns:
+            Dict con 'contatori' (valori ricalcolati) e 'differenze'
+            [(chiave, anno, memorizzato, ricalcolato)], vuota se tutto torna
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            conteggi = self._conteggi_statistiche(cursor)
+            
+            cursor.execute("SELECT chiave, anno, valore FROM statistiche_counters WHERE valore != 0")
+            memorizzati = {(row['chiave'], row['anno']): row['valore'] for row in cursor.fetchall()}
+            
+            differenze = sorted(
+                (chiave, anno, memorizzati.get((chiave, anno), 0), conteggi.get((chiave, anno), 0))
+                for chiave, anno in set(conteggi) | set(memorizzati)
+                if memorizzati.get((chiave, anno), 0) != conteggi.get((chiave, anno), 0)
+            )
+            
+            if correggi:
+                cursor.execute("DELETE FROM statistiche_counters")
+                cursor.executemany(
+                    "INSERT INTO statistiche_counters (chiave, anno, valore) VALUES (?, ?, ?)",
+                    [(chiave, anno, valore) for (chiave, anno), valore in conteggi.items()]
+                )
         
-        # Autorizzazioni in attesa
-        cursor.execute("SELECT COUNT(*) as count FROM autorizzazioni_ras WHERE stato = 'IN_ATTESA'")
-        stats['autorizzazioni_in_attesa'] = cursor.fetchone()['count']
+        return {'contatori': len(conteggi), 'differenze': differenze}
+    
+    def _contatori(self, chiavi: List[tuple]) -> Dict[tuple, int]:
+        """Valori dei contatori richiesti [(chiave, anno)] (0 se assenti)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
+        condizioni = " OR ".join("(chiave = ? AND anno = ?)" for _ in chiavi)
+        cursor.execute(f"SELECT chiave, anno, valore FROM statistiche_counters WHERE {condizioni}",
+                       [valore for coppia in chiavi for valore in coppia])
+        valori = {(row['chiave'], row['anno']): row['valore'] for row in cursor.fetchall()}
         conn.close()
-        return stats
+        
+        return {coppia: valori.get(coppia, 0) for coppia in chiavi}
+    
+    # ========== STATISTICHE ==========
+    
+    def get_statistiche_generali(self) -> Dict:
+        """Recupera statistiche generali del sistema (dai contatori statistiche)"""
+        anno_corrente = dt.datetime.now().year
+        chiavi = {
+            'cacciatori_attivi': ('cacciatori_attivi', 0),
+            'libretti_anno_corrente': ('libretti', anno_corrente),
+            'fogli_anno_corrente': ('fogli_totale', anno_corrente),
+            'autorizzazioni_in_attesa': ('autorizzazioni_in_attesa', 0),
+        }
+        valori = self._contatori(list(chiavi.values()))
+        return {nome: valori[chiave] for nome, chiave in chiavi.items()}
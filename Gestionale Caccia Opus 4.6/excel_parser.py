@@ -3,19 +3,150 @@ Modulo per parsing e validazione dati da file Excel
 Estrae dati anagrafici strutturati dai fogli caccia
 Supporta:
 - Fogli con colonne strutturate (Cognome, Nome, CF, ecc.)
-- Template RAS (dati in testo libero)
+- Template RAS (dati in testo libero, header "Si rilascia al Sig. ...")
+- Fallback su nome file (Cognome Nome(Stato).xlsx)
+
+Motore di estrazione unico (ExcelParser.estrai): ogni workbook viene aperto
+una sola volta e tutti i campi sono estratti in un solo passaggio, insieme
+al tipo di template e alla fonte di ciascun campo. Lo usano l'import
+massivo (import_parse) e lo smoke test.
 """
 
 import openpyxl
 import re
+import hashlib
+import time
 import datetime as dt
-from typing import Dict, List, Optional, Tuple
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
 import logging
 
+from xlsx_reader import LettoreXlsx
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Lettore XML diretto per .xlsx (False: sempre openpyxl, es. per confronto)
+USA_LETTORE_XML = True
+
+# Versione dell'estrazione: incrementarla a ogni modifica che cambia i dati
+# estratti. I risultati in cache di versioni diverse non sono più usati
+# (vedi import_parse, sezione CACHE DEI RISULTATI)
+VERSIONE_PARSER = 1
+
+
+def righe_griglia(ws, max_row: int, max_col: int):
+    """Righe (liste lunghe max_col) del rettangolo max_row x max_col, in streaming"""
+    for row in ws.iter_rows(min_row=1, max_row=max_row, max_col=max_col, values_only=True):
+        valori = list(row[:max_col])
+        valori.extend([None] * (max_col - len(valori)))
+        yield valori
+
+
+def leggi_righe(file_path: Union[str, BinaryIO], max_row: int, max_col: int,
+                consuma: Callable[[Iterator[List]], Any]) -> Tuple[Any, str]:
+    """
+    Passa a consuma() le righe del rettangolo max_row x max_col del foglio
+    attivo, lette in streaming, e ne ritorna il risultato.
+    `file_path` può essere anche un file binario seekable (upload in memoria).
+    
+    Prima prova il lettore XML diretto (xlsx_reader, molto più veloce); se il
+    file non è leggibile così rilegge da capo con openpyxl read_only.
+    
+    Returns:
+        (risultato di consuma, 'xml' oppure 'openpyxl')
+    """
+    if USA_LETTORE_XML:
+        try:
+            with LettoreXlsx(file_path) as lettore:
+                return consuma(lettore.righe(max_row, max_col)), 'xml'
+        except Exception as e:
+            logger.debug(f"Lettore XML non applicabile a {file_path} ({e}), uso openpyxl")
+    
+    if hasattr(file_path, 'seek'):
+        file_path.seek(0)
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        return consuma(righe_griglia(wb.active, max_row, max_col)), 'openpyxl'
+    finally:
+        wb.close()
+
+
+def leggi_griglia(file_path: str, max_row: int, max_col: int) -> List[List]:
+    """
+    Legge in streaming solo il rettangolo max_row x max_col del foglio
+    attivo e ritorna i valori come griglia in memoria.
+    
+    Una sola passata (lettore XML o iter_rows read_only): evita il modello
+    completo delle celle e le riscansioni di ws.cell() in read_only.
+    Le righe sono sempre lunghe max_col e la griglia ha sempre max_row righe.
+    """
+    griglia, _ = leggi_righe(file_path, max_row, max_col, list)
+    
+    while len(griglia) < max_row:
+        griglia.append([None] * max_col)
+    return griglia
+
+
+def genera_numero_tessera_stabile(file_name: str, cognome: str, nome: str, porto_arma: str, anno: int) -> str:
+    """
+    TASK 1: Genera numero_tessera STABILE e UNIVOCO
+    
+    Usa hash del filename come base per garantire stabilità tra run diversi
+    Fallback multipli per garantire che NON sia mai vuoto
+    
+    Args:
+        file_name: Nome file per hash stabile
+        cognome: Cognome cacciatore
+        nome: Nome cacciatore
+        porto_arma: Numero porto d'arma (se disponibile)
+        anno: Anno fogli
+    
+    Returns:
+        str: Numero tessera GARANTITO non vuoto
+    """
+    # PRIORITA' 1: Se abbiamo porto d'arma, usa quello
+    if porto_arma and porto_arma.strip():
+        tessera = f"PA_{porto_arma.strip()}"
+        logger.debug(f"Tessera da porto_arma: {tessera}")
+        return tessera
+    
+    # PRIORITA' 2: Hash stabile del filename (stesso file = stessa tessera)
+    hash_obj = hashlib.md5(file_name.encode('utf-8'))
+    hash_hex = hash_obj.hexdigest()
+    numero_hash = int(hash_hex[:8], 16) % 90000 + 10000
+    tessera = f"AUTO_{anno}_{numero_hash}"
+    logger.debug(f"Tessera da hash file '{file_name}': {tessera}")
+    return tessera
+
+
+def compila_parole_chiave(gruppi: Dict[str, List[str]]) -> Tuple[re.Pattern, Dict[str, frozenset]]:
+    """
+    Compila tutte le parole chiave in un'unica alternativa (la più lunga
+    prima): una sola scansione per cella trova le parole di tutti i gruppi.
+    
+    Returns:
+        (regex, parola -> gruppi). Una parola che ne contiene altre (es.
+        'cognome' contiene 'nome') vale anche per i loro gruppi, come nel
+        confronto per sottostringa.
+    """
+    parole = sorted({p.lower() for lista in gruppi.values() for p in lista}, key=len, reverse=True)
+    regex = re.compile('|'.join(re.escape(p) for p in parole), re.IGNORECASE)
+    
+    gruppi_parola = {}
+    for parola in parole:
+        gruppi_parola[parola] = frozenset(
+            gruppo for gruppo, lista in gruppi.items()
+            if any(p.lower() in parola for p in lista)
+        )
+    return regex, gruppi_parola
+
+
+def estrai_dati_foglio(file_path: Union[str, BinaryIO], anno: int, file_name: str = None) -> Dict:
+    """Estrazione completa di un file o di un file in memoria (una sola apertura del workbook)"""
+    return ExcelParser().estrai(file_path, anno, file_name)
+
 
 class ExcelParser:
     """Parser per file Excel fogli caccia con estrazione dati strutturati"""
@@ -39,21 +170,198 @@ class ExcelParser:
         'assessorato',
     ]
     
+    # Area letta dal foglio: righe 1-60 (testo RAS in colonna A), 80 colonne
+    GRID_MAX_ROW = 60
+    GRID_MAX_COL = 80
+    
+    # Header testuale RAS 2025-26: righe 1-6, celle lunghe con parole chiave
+    HEADER_MAX_ROW = 6
+    HEADER_MIN_LEN = 50
+    HEADER_KEYWORDS = ["sig.", "porto d'arma", "porto d arma", "autorizzazione"]
+    
+    # Registro template: nome -> metodo estrattore (in ordine di priorità)
+    TEMPLATE_REGISTRY = {
+        'ras_header': '_estrai_ras_header',    # Header "Si rilascia al Sig. ..." (RAS 2025-26)
+        'ras_testo': '_estrai_ras_testo',      # Modello RAS, nominativo in colonna A
+        'strutturato': '_estrai_strutturato',  # Intestazioni di colonna (Cognome, Nome, CF)
+        'sconosciuto': None,                   # Solo nome file
+    }
+    
+    # Parole chiave di tutti i template, cercate con una sola regex
+    RE_PAROLE_CHIAVE, GRUPPI_PAROLA = compila_parole_chiave({
+        'ras': RAS_KEYWORDS,
+        'header': HEADER_KEYWORDS,
+        'col_cognome': HEADER_MAPPING['cognome'],
+        'col_nome': HEADER_MAPPING['nome'],
+        'col_cf': HEADER_MAPPING['codice_fiscale'],
+    })
+    GRUPPI_COLONNE = frozenset({'col_cognome', 'col_nome', 'col_cf'})
+    
+    # Impronta layout -> riconoscimento (per processo): layout noto = niente scansione
+    _layout_noti: Dict[str, Dict] = {}
+    # Tempi di parsing per template: nome -> {'file', 'secondi', 'layout_noti'}
+    _statistiche: Dict[str, Dict] = {}
+    
     # Pattern per estrarre nome e cognome dal testo RAS
     RAS_NAME_PATTERNS = [
         # Pattern principale: "COGNOME NOME in possesso del porto"
-        r"([A-ZÀ-Ÿ''\-]+)\s+([A-ZÀ-Ÿ''\-]+(?:\s+[A-ZÀ-Ÿ''\-]+)?)\s+in\s+possesso\s+del\s+porto",
+        re.compile(r"([A-ZÀ-Ÿ''\-]+)\s+([A-ZÀ-Ÿ''\-]+(?:\s+[A-ZÀ-Ÿ''\-]+)?)\s+in\s+possesso\s+del\s+porto", re.IGNORECASE),
         # Pattern alternativo: "Il sottoscritto COGNOME NOME"
-        r"sottoscritto\s+([A-ZÀ-Ÿ''\-]+)\s+([A-ZÀ-Ÿ''\-]+)",
-        # Pattern generico: due parole maiuscole consecutive
-        r"\b([A-ZÀ-Ÿ''\-]{2,})\s+([A-ZÀ-Ÿ''\-]{2,})\b",
+        re.compile(r"sottoscritto\s+([A-ZÀ-Ÿ''\-]+)\s+([A-ZÀ-Ÿ''\-]+)", re.IGNORECASE),
     ]
     
+    # Pattern dell'header testuale
+    RE_SIG = re.compile(r"\bSig\.?\s+([A-ZÀ-Ù][A-Za-zÀ-ÿ''\-]+)\s+([A-ZÀ-Ù][A-Za-zÀ-ÿ''\-]+)", re.IGNORECASE)
+    RE_PORTO = re.compile(r"porto\s+d['\']arma\s*n[°ºo]?\s*([A-Za-z0-9\-\/]+)", re.IGNORECASE)
+    RE_DATA = re.compile(r"\b(\d{2}/\d{2}/\d{4})\b")
+    RE_AUTORIZZAZIONE = re.compile(r"autorizzazione\s+regionale\s*n[°ºo]?\s*([0-9]+)", re.IGNORECASE)
+    
+    # Pattern del nome file
+    RE_FILE_NOME = re.compile(r"([A-Za-zÀ-ÿ''\-]+)\s+([A-Za-zÀ-ÿ''\-]+)")
+    RE_FILE_STATO = re.compile(r'\((.*?)\)')
+    
     def __init__(self):
         self.errors = []
         self.warnings = []
         self.parse_source = None  # 'structured', 'ras_template', 'filename'
     
+    # ========== MOTORE DI ESTRAZIONE ==========
+    
+    def estrai(self, file_path: Union[str, BinaryIO], anno: int, file_name: str = None) -> Dict:
+        """
+        Apre il workbook una sola volta ed estrae tutti i campi.
+        `file_path` può essere un file binario in memoria: in quel caso file_name è obbligatorio.
+        Legge in streaming (lettore XML, fallback openpyxl) le prime righe e
+        prosegue fino a riga 60 solo se l'header non basta. Solleva eccezione se il file non è leggibile.
+        
+        Returns:
+            Dict con cognome, nome, porto_arma, data_rilascio (date),
+            autorizzazione_regionale, stato, numero_tessera (MAI vuoto),
+            eventuali campi da colonne (codice_fiscale, data_nascita, ...),
+            'template' (chiave di TEMPLATE_REGISTRY), 'lettore' ('xml' o
+            'openpyxl'), 'layout' (impronta),
+            'layout_noto', 'header_text', 'fonti' (campo -> 'header',
+            'testo_ras', 'colonne', 'filename', 'default', 'generato') e
+            'tempi' (secondi di 'apertura' e lettura del foglio, di 'estrazione' dei campi)
+        """
+        if not file_name:
+            file_name = file_path.split('/')[-1].split('\\')[-1]
+        
+        start = time.perf_counter()
+        griglia, lettore = leggi_righe(file_path, self.GRID_MAX_ROW, self.GRID_MAX_COL, self._leggi_area)
+        letto = time.perf_counter()
+        
+        dati = self.estrai_da_griglia(griglia, file_name, anno)
+        dati['lettore'] = lettore
+        fine = time.perf_counter()
+        dati['tempi'] = {'apertura': letto - start, 'estrazione': fine - letto}
+        self._registra_tempo(dati['template'], fine - start, dati['layout_noto'])
+        return dati
+    
+    def _leggi_area(self, righe: Iterator[List]) -> List[List]:
+        """Prime righe; prosegue fino a GRID_MAX_ROW solo se l'header non basta"""
+        griglia = list(islice(righe, self.HEADER_MAX_ROW))
+        
+        # Header RAS con "Sig. COGNOME Nome": il resto del foglio non serve
+        header_text = self._cerca_header(griglia)
+        if not (header_text and self.RE_SIG.search(header_text)):
+            griglia.extend(righe)
+        return griglia
+    
+    def estrai_da_griglia(self, griglia: List[List], file_name: str, anno: int) -> Dict:
+        """Estrazione in un solo passaggio da una griglia già letta (vedi estrai)"""
+        self.errors = []
+        self.warnings = []
+        
+        dati = {
+            'cognome': '',
+            'nome': '',
+            'porto_arma': '',
+            'data_rilascio': None,
+            'autorizzazione_regionale': '',
+            'numero_tessera': '',  # Valorizzato in GUARDIA FINALE
+            'stato': 'RILASCIATO',
+            'template': 'sconosciuto',
+            'header_text': '',
+            'fonti': {},
+        }
+        fonti = dati['fonti']
+        
+        def imposta(campo: str, valore, fonte: str):
+            dati[campo] = valore
+            fonti[campo] = fonte
+        
+        # === STEP 1: TEMPLATE (layout noto o scansione unica) ===
+        impronta = self._impronta_layout(griglia)
+        riconoscimento = self._layout_noti.get(impronta)
+        dati['layout'] = impronta
+        dati['layout_noto'] = riconoscimento is not None
+        
+        # === STEP 2: ESTRATTORE DEL TEMPLATE ===
+        contenuto = self._applica_template(riconoscimento, griglia, file_name) if riconoscimento else None
+        if not (contenuto and contenuto.get('cognome') and contenuto.get('nome')):
+            # Layout nuovo, o noto ma senza nominativo: riconoscimento completo
+            dati['layout_noto'] = False
+            riconoscimento = self._riconosci_template(griglia)
+            contenuto = self._applica_template(riconoscimento, griglia, file_name)
+            if contenuto.get('cognome') and contenuto.get('nome'):
+                self._layout_noti[impronta] = riconoscimento
+        
+        dati['template'] = riconoscimento['template']
+        dati['header_text'] = contenuto.pop('header_text', '')
+        for campo, (valore, fonte) in contenuto.items():
+            imposta(campo, valore, fonte)
+        self.parse_source = 'structured' if dati['template'] == 'strutturato' else (
+            'ras_template' if dati['template'] != 'sconosciuto' else None)
+        
+        # Cognome/nome da colonne: stessa normalizzazione delle altre fonti
+        if fonti.get('cognome') == 'colonne':
+            dati['cognome'] = str(dati['cognome']).upper()
+        if fonti.get('nome') == 'colonne':
+            dati['nome'] = str(dati['nome']).title()
+        
+        # === STEP 3: FALLBACK SU FILENAME ===
+        if not dati['cognome'] or not dati['nome']:
+            logger.warning(f"[PARSE] Cognome/nome non trovati nel contenuto, fallback su filename: {file_name}")
+            nominativo = self._parse_from_filename(file_name)
+            if nominativo:
+                imposta('cognome', nominativo['cognome'], 'filename')
+                imposta('nome', nominativo['nome'], 'filename')
+                self.parse_source = 'filename'
+        
+        stato_file = self.RE_FILE_STATO.search(file_name)
+        if stato_file:
+            imposta('stato', self._map_stato(stato_file.group(1)), 'filename')
+        else:
+            fonti['stato'] = 'default'
+        
+        # ========== GUARDIA FINALE: numero_tessera SEMPRE valorizzato ==========
+        # TASK 1: Questo è il punto critico che previene NOT NULL constraint failed
+        imposta('numero_tessera', genera_numero_tessera_stabile(
+            file_name=file_name,
+            cognome=dati['cognome'],
+            nome=dati['nome'],
+            porto_arma=dati['porto_arma'],
+            anno=anno
+        ), 'generato')
+        
+        # Verifica doppia sicurezza (non dovrebbe mai essere necessaria)
+        if not dati['numero_tessera'] or dati['numero_tessera'].strip() == '':
+            # Ultimo fallback assoluto: hash del filename
+            hash_obj = hashlib.md5(file_name.encode('utf-8'))
+            dati['numero_tessera'] = f"EMERGENCY_{hash_obj.hexdigest()[:12].upper()}"
+            logger.error(f"EMERGENCY tessera per {file_name}: {dati['numero_tessera']}")
+        
+        if not dati['cognome'] or not dati['nome']:
+            self.errors.append("Impossibile estrarre Cognome e Nome dal file")
+        
+        logger.debug(f"[PARSE] {file_name} | template={dati['template']} | "
+                     f"cognome={dati['cognome']} ({fonti.get('cognome')}) | tessera={dati['numero_tessera']}")
+        
+        return dati
+    
+    # ========== INTERFACCIA STORICA ==========
+    
     def parse_excel_file(self, file_path: str, file_name: str = None) -> Optional[Dict]:
         """
         Legge file Excel e estrae dati strutturati
@@ -61,12 +369,10 @@ class ExcelParser:
         Args:
             file_path: Percorso completo del file Excel
             file_name: Nome del file (per fallback parsing)
-            
+        
         Returns:
             Dict con dati estratti o None se errori critici
         """
-        self.errors = []
-        self.warnings = []
         self.parse_source = None
         
         if not file_name:
@@ -75,97 +381,208 @@ class ExcelParser:
         logger.info(f"[PARSE] Inizio parsing file: {file_name}")
         
         try:
-            # Apri workbook
-            wb = openpyxl.load_workbook(file_path, data_only=True)
-            sheet = wb.active
-            
-            # === STEP 1: RICONOSCI TEMPLATE ===
-            is_ras = self._is_ras_template(sheet)
-            
-            if is_ras:
-                logger.info(f"[PARSE] Template RAS riconosciuto: {file_name}")
-                dati = self._parse_ras_template(sheet, file_name)
-            else:
-                logger.info(f"[PARSE] Template strutturato: {file_name}")
-                dati = self._parse_structured_template(sheet)
-            
-            # === STEP 2: FALLBACK SU FILENAME ===
-            if not dati or not dati.get('cognome') or not dati.get('nome'):
-                logger.warning(f"[PARSE] Parsing contenuto fallito, fallback su filename: {file_name}")
-                dati_filename = self._parse_from_filename(file_name)
-                
-                if dati_filename:
-                    # Merge con dati esistenti (filename vince su campi vuoti)
-                    if not dati:
-                        dati = {}
-                    
-                    if not dati.get('cognome'):
-                        dati['cognome'] = dati_filename.get('cognome')
-                    if not dati.get('nome'):
-                        dati['nome'] = dati_filename.get('nome')
-                    if not dati.get('stato'):
-                        dati['stato'] = dati_filename.get('stato')
-                    
-                    self.parse_source = 'filename'
-                    logger.info(f"[PARSE] Dati estratti da filename: cognome={dati.get('cognome')}, nome={dati.get('nome')}")
-            
-            wb.close()
-            
-            # === STEP 3: VALIDAZIONE FINALE ===
-            if not dati or not dati.get('cognome') or not dati.get('nome'):
-                self.errors.append("Impossibile estrarre Cognome e Nome dal file")
-                logger.error(f"[PARSE] FALLITO per {file_name}: Cognome/Nome non estratti")
-                return None
-            
-            # Aggiungi metadata
-            dati['file_path'] = file_path
-            dati['file_name'] = file_name
-            dati['import_date'] = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            dati['parse_source'] = self.parse_source
-            
-            logger.info(f"[PARSE] SUCCESS: {file_name} | source={self.parse_source} | cognome={dati.get('cognome')} | nome={dati.get('nome')}")
-            
-            return dati
-            
+            estratti = self.estrai(file_path, dt.datetime.now().year, file_name)
         except Exception as e:
-            self.errors.append(f"Errore lettura file: {str(e)}")
+            self.errors = [f"Errore lettura file: {str(e)}"]
+            self.warnings = []
             logger.error(f"[PARSE] Errore parsing {file_name}: {e}")
             return None
+        
+        if self.errors:
+            logger.error(f"[PARSE] FALLITO per {file_name}: Cognome/Nome non estratti")
+            return None
+        
+        # Solo i campi trovati (come in passato), più lo stato
+        dati = {campo: estratti[campo] for campo in estratti['fonti']
+                if campo != 'numero_tessera'}
+        dati['stato'] = estratti['stato']
+        
+        # Aggiungi metadata
+        dati['file_path'] = file_path
+        dati['file_name'] = file_name
+        dati['import_date'] = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        dati['parse_source'] = self.parse_source
+        
+        logger.info(f"[PARSE] SUCCESS: {file_name} | source={self.parse_source} | cognome={dati.get('cognome')} | nome={dati.get('nome')}")
+        
+        return dati
     
-    def _is_ras_template(self, sheet) -> bool:
+    # ========== RICONOSCIMENTO E ESTRAZIONE ==========
+    
+    def _gruppi_cella(self, value) -> frozenset:
+        """Gruppi di parole chiave presenti nella cella (una sola regex)"""
+        if not value or not isinstance(value, str):
+            return frozenset()
+        gruppi = frozenset()
+        for match in self.RE_PAROLE_CHIAVE.finditer(value):
+            gruppi |= self.GRUPPI_PAROLA[match.group(0).lower()]
+        return gruppi
+    
+    def _cerca_header(self, griglia) -> str:
         """
-        Determina se il foglio Excel è un template RAS
-        Cerca keywords tipiche nelle prime 20 righe
+        Testo dell'header RAS: prima cella (righe 1-6) lunga più di 50
+        caratteri che contiene una delle parole chiave
         """
-        for row_idx in range(1, 21):
-            for cell in sheet[row_idx]:
-                if cell.value and isinstance(cell.value, str):
-                    value_lower = cell.value.lower()
-                    for keyword in self.RAS_KEYWORDS:
-                        if keyword in value_lower:
-                            return True
-        return False
-    
-    def _parse_ras_template(self, sheet, file_name: str) -> Optional[Dict]:
+        for row, valori in enumerate(griglia[:self.HEADER_MAX_ROW], start=1):
+            for col, value in enumerate(valori, start=1):
+                if (value and isinstance(value, str) and len(value) > self.HEADER_MIN_LEN
+                        and 'header' in self._gruppi_cella(value)):
+                    logger.debug(f"Header trovato alla riga {row}, col {col}: {value[:100]}")
+                    return value.strip()
+        return ""
+    
+    def _riconosci_template(self, griglia) -> Dict:
+        """
+        Scansione unica delle prime 20 righe: header RAS, parole chiave RAS
+        e riga di intestazione colonne in un solo passaggio.
+        
+        Returns:
+            Dict con 'template', 'header_cella' (riga, colonna 0-based) e
+            'header_row' (1-based) quando presenti
+        """
+        header_cella = None
+        header_row = None
+        ras = False
+        
+        for r, row in enumerate(griglia[:20]):
+            gruppi_riga = set()
+            for c, value in enumerate(row):
+                gruppi = self._gruppi_cella(value)
+                if not gruppi:
+                    continue
+                if (header_cella is None and 'header' in gruppi and r < self.HEADER_MAX_ROW
+                        and len(value) > self.HEADER_MIN_LEN):
+                    header_cella = (r, c)
+                ras = ras or 'ras' in gruppi
+                gruppi_riga |= gruppi
+            
+            # Almeno 2 intestazioni chiave (cognome, nome, codice fiscale)
+            if header_row is None and len(gruppi_riga & self.GRUPPI_COLONNE) >= 2:
+                header_row = r + 1
+        
+        if header_cella is not None:
+            template = 'ras_header'
+        elif ras:
+            template = 'ras_testo'
+        elif header_row:
+            template = 'strutturato'
+        else:
+            template = 'sconosciuto'
+        
+        return {'template': template, 'header_cella': header_cella, 'header_row': header_row}
+    
+    def _impronta_layout(self, griglia) -> str:
+        """Hash delle coordinate delle celle valorizzate nelle prime righe"""
+        coordinate = ';'.join(
+            f"{r},{c}"
+            for r, row in enumerate(griglia[:self.HEADER_MAX_ROW])
+            for c, value in enumerate(row)
+            if value is not None and value != ''
+        )
+        return hashlib.md5(coordinate.encode('utf-8')).hexdigest()[:12]
+    
+    def _applica_template(self, riconoscimento: Dict, griglia, file_name: str) -> Dict:
+        """Esegue l'estrattore registrato: campo -> (valore, fonte), più 'header_text'"""
+        metodo = self.TEMPLATE_REGISTRY.get(riconoscimento['template'])
+        if not metodo:
+            return {}
+        return getattr(self, metodo)(riconoscimento, griglia, file_name)
+    
+    def _estrai_ras_header(self, riconoscimento: Dict, griglia, file_name: str) -> Dict:
+        """Campi dall'header testuale; nominativo in colonna A se manca il 'Sig.'"""
+        r, c = riconoscimento['header_cella']
+        value = griglia[r][c] if r < len(griglia) else None
+        if not isinstance(value, str):
+            return {}
+        header_text = value.strip()
+        contenuto = {'header_text': header_text}
+        
+        match = self.RE_SIG.search(header_text)
+        if match:
+            contenuto['cognome'] = (match.group(1).upper(), 'header')
+            contenuto['nome'] = (match.group(2).title(), 'header')
+        
+        match = self.RE_PORTO.search(header_text)
+        if match:
+            contenuto['porto_arma'] = (match.group(1).strip(), 'header')
+        
+        match = self.RE_DATA.search(header_text)
+        if match:
+            try:
+                contenuto['data_rilascio'] = (dt.datetime.strptime(match.group(1), '%d/%m/%Y').date(), 'header')
+            except ValueError:
+                pass
+        
+        match = self.RE_AUTORIZZAZIONE.search(header_text)
+        if match:
+            contenuto['autorizzazione_regionale'] = (match.group(1), 'header')
+        
+        if 'cognome' not in contenuto:
+            contenuto.update(self._estrai_ras_testo(riconoscimento, griglia, file_name))
+        return contenuto
+    
+    def _estrai_ras_testo(self, riconoscimento: Dict, griglia, file_name: str) -> Dict:
+        """Nominativo dal testo RAS in colonna A"""
+        nominativo = self._parse_ras_template(griglia, file_name)
+        if not nominativo:
+            return {}
+        return {
+            'cognome': (nominativo['cognome'], 'testo_ras'),
+            'nome': (nominativo['nome'], 'testo_ras'),
+        }
+    
+    def _estrai_strutturato(self, riconoscimento: Dict, griglia, file_name: str) -> Dict:
+        """Prima riga dati sotto le intestazioni di colonna"""
+        header_row = riconoscimento['header_row']
+        column_map = self._map_columns(griglia, header_row)
+        return {
+            campo: (valore, 'colonne')
+            for campo, valore in self._extract_data(griglia, header_row + 1, column_map).items()
+            if valore not in (None, '')
+        }
+    
+    def _registra_tempo(self, template: str, secondi: float, layout_noto: bool):
+        voce = self._statistiche.setdefault(template, {'file': 0, 'secondi': 0.0, 'layout_noti': 0})
+        voce['file'] += 1
+        voce['secondi'] += secondi
+        voce['layout_noti'] += int(layout_noto)
+    
+    @classmethod
+    def statistiche_template(cls) -> Dict[str, Dict]:
+        """Tempi di parsing per template nel processo corrente (file, ms medi, layout noti)"""
+        return {
+            template: {
+                'file': voce['file'],
+                'ms_medi': voce['secondi'] * 1000 / voce['file'],
+                'layout_noti': voce['layout_noti'],
+            }
+            for template, voce in cls._statistiche.items()
+        }
+    
+    @classmethod
+    def azzera_statistiche_template(cls):
+        cls._statistiche.clear()
+        cls._layout_noti.clear()
+    
+    def _parse_ras_template(self, griglia, file_name: str) -> Optional[Dict]:
         """
-        Estrae dati da template RAS (testo libero)
+        Estrae cognome/nome da template RAS (testo libero)
         Cerca in celle A1-A60 il pattern "COGNOME NOME in possesso del porto"
         """
-        self.parse_source = 'ras_template'
         dati = {}
         
         # Cerca nelle celle A1-A60 (colonna A, prime 60 righe)
-        for row_idx in range(1, 61):
-            cell = sheet[f'A{row_idx}']
+        for row_idx, row in enumerate(griglia[:60], start=1):
+            value = row[0]
             
-            if not cell.value:
+            if not value:
                 continue
             
-            text = str(cell.value)
+            text = str(value)
             
             # Prova ogni pattern
             for pattern in self.RAS_NAME_PATTERNS:
-                match = re.search(pattern, text, re.IGNORECASE)
+                match = pattern.search(text)
                 
                 if match:
                     cognome = match.group(1).strip().upper()
@@ -175,7 +592,7 @@ class ExcelParser:
                     if len(cognome) >= 2 and len(nome) >= 2:
                         dati['cognome'] = cognome
                         dati['nome'] = nome
-                        logger.info(f"[PARSE] RAS match at A{row_idx}: cognome={cognome}, nome={nome}")
+                        logger.debug(f"[PARSE] RAS match at A{row_idx}: cognome={cognome}, nome={nome}")
                         break
             
             if dati.get('cognome'):
@@ -188,29 +605,9 @@ class ExcelParser:
         
         return dati if dati else None
     
-    def _parse_structured_template(self, sheet) -> Optional[Dict]:
-        """Parsing originale per template strutturati con colonne"""
-        self.parse_source = 'structured'
-        
-        # Trova riga intestazioni
-        header_row = self._find_header_row(sheet)
-        
-        if not header_row:
-            self.warnings.append("Intestazioni colonne non trovate")
-            return None
-        
-        # Mappa colonne
-        column_map = self._map_columns(sheet, header_row)
-        
-        # Estrai dati (prima riga dati dopo intestazioni)
-        data_row = header_row + 1
-        dati = self._extract_data(sheet, data_row, column_map)
-        
-        return dati
-    
     def _parse_from_filename(self, file_name: str) -> Optional[Dict]:
         """
-        Estrae Cognome, Nome e Stato dal nome file
+        Estrae Cognome e Nome dal nome file
         
         Supporta formati:
         - Cognome Nome(Stato).xlsx
@@ -218,60 +615,23 @@ class ExcelParser:
         - Cognome_Nome_Stato.xlsx
         - Cognome Nome.xlsx
         """
-        dati = {}
-        
-        # Rimuovi estensione
-        name_no_ext = re.sub(r'\.(xlsx|xls)$', '', file_name, flags=re.IGNORECASE)
-        
-        # Pattern 1: "Cognome Nome(Stato)" o "Cognome Nome (Stato)"
-        pattern1 = r"^(.+?)\s*\(([^)]+)\)$"
-        match = re.match(pattern1, name_no_ext)
+        # Rimuovi estensione e stato tra parentesi
+        nome_pulito = file_name.replace('_', ' ').split('(')[0].split('.')[0].strip()
+        match = self.RE_FILE_NOME.match(nome_pulito)
         
         if match:
-            nome_completo = match.group(1).strip()
-            stato_raw = match.group(2).strip()
-            
-            # Separa cognome e nome
-            parti = nome_completo.split()
-            if len(parti) >= 2:
-                dati['cognome'] = parti[0].upper()
-                dati['nome'] = ' '.join(parti[1:]).title()
-            
-            # Mappa stato
-            dati['stato'] = self._map_stato(stato_raw)
-            
-            logger.info(f"[PARSE] Filename pattern1: cognome={dati.get('cognome')}, nome={dati.get('nome')}, stato={dati.get('stato')}")
-            return dati
-        
-        # Pattern 2: "Cognome_Nome_Stato"
-        pattern2 = r"^([A-Za-zÀ-ÿ''\-]+)_([A-Za-zÀ-ÿ''\-]+)_(.+)$"
-        match = re.match(pattern2, name_no_ext)
-        
-        if match:
-            dati['cognome'] = match.group(1).strip().upper()
-            dati['nome'] = match.group(2).strip().title()
-            dati['stato'] = self._map_stato(match.group(3))
-            
-            logger.info(f"[PARSE] Filename pattern2: cognome={dati.get('cognome')}, nome={dati.get('nome')}")
-            return dati
-        
-        # Pattern 3: "Cognome Nome" (senza stato)
-        pattern3 = r"^([A-Za-zÀ-ÿ''\-]+)\s+([A-Za-zÀ-ÿ''\-]+(?:\s+[A-Za-zÀ-ÿ''\-]+)?)$"
-        match = re.match(pattern3, name_no_ext)
-        
-        if match:
-            dati['cognome'] = match.group(1).strip().upper()
-            dati['nome'] = match.group(2).strip().title()
-            dati['stato'] = 'RILASCIATO'  # Default
-            
-            logger.info(f"[PARSE] Filename pattern3: cognome={dati.get('cognome')}, nome={dati.get('nome')}")
+            dati = {
+                'cognome': match.group(1).upper(),
+                'nome': match.group(2).title(),
+            }
+            logger.debug(f"[PARSE] Filename: cognome={dati['cognome']}, nome={dati['nome']}")
             return dati
         
         logger.warning(f"[PARSE] Nessun pattern filename matchato: {file_name}")
         return None
     
     def _map_stato(self, stato_raw: str) -> str:
-        """Mappa stato da stringa a valore standardizzato"""
+        """Mappa stato da stringa a valore standardizzato (StatoFoglio)"""
         if not stato_raw:
             return 'RILASCIATO'
         
@@ -280,46 +640,26 @@ class ExcelParser:
         if 'CONSEGNATO' in stato_upper:
             return 'CONSEGNATO'
         elif 'STAMPATO' in stato_upper or 'STAMPATA' in stato_upper:
-            return 'STAMPATO'
+            return 'RILASCIATO'
         elif 'RINNOVARE' in stato_upper:
-            return 'DA_RINNOVARE'
+            return 'DISPONIBILE'
         else:
             return 'RILASCIATO'
     
-    def _find_header_row(self, sheet) -> Optional[int]:
-        """
-        Trova la riga con le intestazioni delle colonne
-        Cerca nelle prime 20 righe
-        """
-        for row_idx in range(1, 21):
-            row_values = [str(cell.value).lower().strip() 
-                         if cell.value else '' 
-                         for cell in sheet[row_idx]]
-            
-            # Cerca almeno 2 intestazioni chiave
-            found = 0
-            for key in ['cognome', 'nome', 'codice_fiscale']:
-                for possible_header in self.HEADER_MAPPING[key]:
-                    if any(possible_header in val for val in row_values):
-                        found += 1
-                        break
-            
-            if found >= 2:
-                return row_idx
-        
-        return None
-    
-    def _map_columns(self, sheet, header_row: int) -> Dict[str, int]:
+    def _map_columns(self, griglia, header_row: int) -> Dict[str, int]:
         """Mappa le intestazioni alle colonne"""
         column_map = {}
         
         headers = []
-        for col_idx, cell in enumerate(sheet[header_row], start=1):
-            header_val = str(cell.value).lower().strip() if cell.value else ''
+        for col_idx, value in enumerate(griglia[header_row - 1], start=1):
+            header_val = str(value).lower().strip() if value else ''
             headers.append((col_idx, header_val))
         
         for field, possible_headers in self.HEADER_MAPPING.items():
             for col_idx, header in headers:
+                # Una colonna per campo ('nome' è contenuto in 'cognome')
+                if col_idx in column_map.values():
+                    continue
                 for possible in possible_headers:
                     if possible in header:
                         column_map[field] = col_idx
@@ -329,13 +669,15 @@ class ExcelParser:
         
         return column_map
     
-    def _extract_data(self, sheet, row: int, column_map: Dict[str, int]) -> Dict:
+    def _extract_data(self, griglia, row: int, column_map: Dict[str, int]) -> Dict:
         """Estrae dati dalla riga specificata"""
         dati = {}
         
+        if row > len(griglia):
+            return dati
+        
         for field, col_idx in column_map.items():
-            cell = sheet.cell(row=row, column=col_idx)
-            value = cell.value
+            value = griglia[row - 1][col_idx - 1]
             
             if field == 'data_nascita':
                 value = self._parse_date(value)
@@ -352,7 +694,7 @@ class ExcelParser:
         if value is None:
             return None
         
-        if isinstance(value, datetime):
+        if isinstance(value, (dt.datetime, dt.date)):
             return value.strftime('%Y-%m-%d')
         
         if isinstance(value, str):
@@ -360,14 +702,14 @@ class ExcelParser:
                 '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d',
                 '%d/%m/%y', '%d-%m-%y',
             ]
-
+            
             for fmt in formats:
                 try:
                     dt_obj = dt.datetime.strptime(value.strip(), fmt)
                     return dt_obj.strftime('%Y-%m-%d')
                 except ValueError:
                     continue
-
+        
         if isinstance(value, (int, float)):
             try:
                 dt_obj = dt.datetime(1899, 12, 30) + dt.timedelta(days=int(value))
@@ -0,0 +1,108 @@
+"""
+Griglia di modifica dei fogli caccia
+Costruisce la finestra di righe del data_editor di Gestione Fogli con
+operazioni vettoriali pandas (niente iterrows né formattazione delle date
+cella per cella). La griglia è indicizzata per id del foglio: le modifiche
+del data_editor, che sono posizionali, vengono ricondotte al foglio tramite
+l'indice della finestra mostrata e non tramite la posizione nell'elenco.
+
+Indipendente da Streamlit (vedi benchmark_griglia_fogli.py).
+"""
+
+import hashlib
+from typing import Dict, List, Union
+
+import pandas as pd
+
+COLONNE_GRIGLIA = ['Cognome Nome', 'N. Foglio', 'Restituito in data', 'Stampato', 'Consegnato',
+                   'Contatto telefonico']
+
+
+def _testo(df: pd.DataFrame, colonna: str) -> pd.Series:
+    """Colonna come stringhe ('' per valori mancanti o colonna assente)"""
+    if colonna not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[colonna].fillna('').astype(str)
+
+
+def date_italiane(valori: pd.Series) -> pd.Series:
+    """
+    Versione vettoriale di fmt_date_it: date ISO (anche con '/' o con orario)
+    in gg/mm/aaaa. I valori non riconosciuti restano come sono, 'N/A' diventa ''.
+    """
+    testo = valori.fillna('').astype(str).str.strip()
+    date = pd.to_datetime(testo.str[:10].str.replace('/', '-', regex=False),
+                          format='%Y-%m-%d', errors='coerce')
+    return date.dt.strftime('%d/%m/%Y').where(date.notna(), testo.where(testo != 'N/A', ''))
+
+
+def griglia_fogli(fogli: Union[List[Dict], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Righe del data_editor per la finestra di fogli (righe di query_fogli),
+    con indice = id del foglio e colonne COLONNE_GRIGLIA.
+    """
+    df = fogli if isinstance(fogli, pd.DataFrame) else pd.DataFrame(fogli)
+    if df.empty:
+        return pd.DataFrame(columns=COLONNE_GRIGLIA, index=pd.Index([], name='id'))
+    df = df.set_index('id')
+
+    # Cognome Nome, altrimenti il nominativo di rilascio
+    cognome_nome = (_testo(df, 'cognome') + ' ' + _testo(df, 'nome')).str.strip()
+    cognome_nome = cognome_nome.where(cognome_nome != '', _testo(df, 'rilasciato_a'))
+
+    # Contatto telefonico: preferisci cellulare, poi telefono
+    cellulare = _testo(df, 'cellulare')
+    contatto = cellulare.where(cellulare != '', _testo(df, 'telefono'))
+
+    stampato = df['stampato'].fillna(0).astype(bool) if 'stampato' in df.columns else False
+
+    return pd.DataFrame({
+        'Cognome Nome': cognome_nome,
+        'N. Foglio': df['numero_foglio'].fillna('N/A').astype(str),
+        'Restituito in data': date_italiane(_testo(df, 'data_restituzione')),
+        'Stampato': stampato,
+        'Consegnato': date_italiane(_testo(df, 'data_consegna')),
+        'Contatto telefonico': contatto,
+    }, index=df.index)
+
+
+def firma_finestra(griglia: pd.DataFrame) -> str:
+    """
+    Firma degli id mostrati: usata nella chiave del data_editor, così le
+    modifiche in sospeso di una finestra non vengono mai applicate alle righe
+    di un'altra (altra pagina, altri filtri).
+    """
+    ids = ','.join(str(foglio_id) for foglio_id in griglia.index)
+    return hashlib.md5(ids.encode()).hexdigest()[:12]
+
+
+def modifiche_griglia(griglia: pd.DataFrame, edited_rows: Dict) -> Dict[int, Dict]:
+    """
+    Modifiche effettive del data_editor, per id del foglio.
+
+    Args:
+        griglia: Finestra mostrata (valori originali), da griglia_fogli
+        edited_rows: st.session_state[chiave]['edited_rows'] (posizione -> {colonna: valore})
+
+    Returns:
+        {foglio_id: {colonna: nuovo valore}} solo per i valori diversi dall'originale
+        (Stampato come bool, le altre colonne come testo senza spazi ai bordi)
+    """
+    modifiche = {}
+    for posizione, cambi in edited_rows.items():
+        posizione = int(posizione)
+        if not 0 <= posizione < len(griglia):
+            continue
+        foglio_id = griglia.index[posizione]
+        originale = griglia.iloc[posizione]
+
+        nuovi = {}
+        for colonna, valore in cambi.items():
+            if colonna not in COLONNE_GRIGLIA:
+                continue
+            valore = bool(valore) if colonna == 'Stampato' else str(valore if valore is not None else '').strip()
+            if valore != originale[colonna]:
+                nuovi[colonna] = valore
+        if nuovi:
+            modifiche[foglio_id] = nuovi
+    return modifiche
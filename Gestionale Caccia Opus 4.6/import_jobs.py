@@ -0,0 +1,162 @@
+"""
+Job di import ripristinabili
+Ogni import da cartella è un job nel journal (tabelle import_jobs e
+import_job_items) con lo stato di ogni file:
+
+    in_attesa -> analizzato -> importato | esistente | scartato | ambiguo | errore
+                            -> escluso (scartato dall'operatore in anteprima)
+
+Il parsing salva i risultati a blocchi di Config.IMPORT_CHECKPOINT_FILE file,
+la scrittura registra l'esito di ogni file nella stessa transazione del file.
+Un job interrotto (sessione ricaricata, errore) riprende dall'ultimo
+checkpoint: i file già analizzati non vengono riletti, quelli già scritti
+non vengono riscritti.
+
+Indipendente da Streamlit: la pagina di import passa solo le callback di avanzamento.
+"""
+
+import json
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+from constants import Config
+from import_parse import parse_files_cache, serializza_risultato, deserializza_risultato, riepilogo_template
+from import_session import ImportSession
+
+logger = logging.getLogger(__name__)
+
+# Job che si possono riprendere dalla pagina di import
+STATI_RIPRENDIBILI = ('in_corso', 'interrotto', 'fallito')
+
+
+def crea_job(db, anno: int, cartella: str, piano: Dict, stato: str = 'in_corso',
+             workers: int = Config.IMPORT_PARSE_WORKERS,
+             chunk_size: int = Config.MAX_BATCH_SIZE, origine: str = 'manuale') -> int:
+    """
+    Registra un job a partire dal piano di ImportSession.pianifica_file:
+    gli item sono i file da analizzare; le rinomine sono salvate nel job
+    e applicate alla prima scrittura.
+    """
+    rinominati = json.dumps(piano['rinominati'], default=str) if piano['rinominati'] else None
+    job_id = db.crea_import_job(anno, cartella, piano['da_analizzare'], stato=stato,
+                                workers=workers, chunk_size=chunk_size, rinominati=rinominati,
+                                origine=origine)
+    logger.info(f"Job import {job_id} creato: {len(piano['da_analizzare'])} file, anno {anno}")
+    return job_id
+
+
+def analizza_job(db, job_id: int, workers: int = Config.IMPORT_PARSE_WORKERS,
+                 progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+    """
+    Parsing dei file del job ancora 'in_attesa', con checkpoint ogni
+    Config.IMPORT_CHECKPOINT_FILE file. I file già in cache (stesso
+    contenuto, vedi parse_files_cache) non vengono riaperti.
+
+    Returns:
+        Risultati dei file analizzati e non ancora scritti, in ordine di job
+    """
+    job = db.get_import_job(job_id)
+    da_leggere = db.get_import_job_items(job_id, stati=['in_attesa'])
+    totale = len(da_leggere)
+    blocco = Config.IMPORT_CHECKPOINT_FILE
+    start = time.perf_counter()
+
+    for inizio in range(0, totale, blocco):
+        items = da_leggere[inizio:inizio + blocco]
+
+        def _progress(completati, _totale, fatti=inizio):
+            if progress:
+                progress(fatti + completati, totale)
+
+        risultati = parse_files_cache(db, items, job['anno'], workers=workers, progress=_progress)
+        for risultato, item in zip(risultati, items):
+            # size, mtime, content_hash per il manifest
+            risultato.update({campo: item[campo] for campo in ('file_name', 'size', 'mtime', 'content_hash')})
+        db.salva_risultati_job(job_id, [(r['file_path'], serializza_risultato(r)) for r in risultati])
+
+    if totale:
+        durata = time.perf_counter() - start
+        db.aggiorna_import_job(job_id, durata_parsing=(job['durata_parsing'] or 0) + durata)
+        logger.info(f"Job import {job_id}: {totale} file analizzati in {durata:.2f}s")
+
+    return risultati_job(db, job_id)
+
+
+def risultati_job(db, job_id: int) -> List[Dict]:
+    """Risultati del parsing salvati nel journal e non ancora scritti"""
+    return [deserializza_risultato(item['risultato'])
+            for item in db.get_import_job_items(job_id, stati=['analizzato'])]
+
+
+def scrivi_job(db, job_id: int, chunk_size: int = Config.MAX_BATCH_SIZE,
+               progress: Optional[Callable[[int, int, str], None]] = None) -> Dict:
+    """
+    Scrive i file analizzati del job (ImportSession.importa_risultati) e
+    aggiorna stato e statistiche del job.
+
+    Returns:
+        Riepilogo di importa_risultati più 'rinominati' (rinomine applicate)
+    """
+    job = db.get_import_job(job_id)
+    db.aggiorna_import_job(job_id, stato='in_corso', chunk_size=chunk_size)
+    sessione = ImportSession(db, job['anno'])
+
+    rinominati = 0
+    if job['rinominati']:
+        rinominati = sessione.applica_rinomine([tuple(coppia) for coppia in json.loads(job['rinominati'])])
+        db.aggiorna_import_job(job_id, rinominati=None)
+
+    riepilogo = sessione.importa_risultati(risultati_job(db, job_id), chunk_size=chunk_size,
+                                           progress=progress, job_id=job_id)
+    riepilogo['rinominati'] = rinominati
+
+    # Chunk falliti: i loro file restano 'analizzati' e il job si può riprendere
+    rimasti = db.get_import_job_items(job_id, stati=['in_attesa', 'analizzato'])
+    db.aggiorna_import_job(
+        job_id,
+        stato='interrotto' if rimasti else 'completato',
+        durata_scrittura=(job['durata_scrittura'] or 0) + riepilogo['durata'],
+        righe=(job['righe'] or 0) + riepilogo['righe'],
+        messaggio=f"{len(rimasti)} file da riprendere" if rimasti else None,
+    )
+    logger.info(f"Job import {job_id}: {riepilogo['importati']} importati, "
+                f"{riepilogo['errori']} errori, {len(rimasti)} da riprendere")
+    return riepilogo
+
+
+def esegui_job(db, job_id: int, workers: int = Config.IMPORT_PARSE_WORKERS,
+               chunk_size: int = Config.MAX_BATCH_SIZE,
+               progress_parsing: Optional[Callable[[int, int], None]] = None,
+               progress_scrittura: Optional[Callable[[int, int, str], None]] = None,
+               fase: Optional[Callable[[str], None]] = None) -> Dict:
+    """
+    Esegue (o riprende) un job: parsing dei file mancanti, poi scrittura.
+    `fase` (opzionale) è chiamata all'inizio di ogni stage ('parsing', 'scrittura').
+    """
+    try:
+        db.aggiorna_import_job(job_id, stato='in_corso', workers=workers)
+        if fase:
+            fase('parsing')
+        analizza_job(db, job_id, workers=workers, progress=progress_parsing)
+        if fase:
+            fase('scrittura')
+        return scrivi_job(db, job_id, chunk_size=chunk_size, progress=progress_scrittura)
+    except Exception as e:
+        logger.error(f"Job import {job_id} fallito: {e}")
+        db.aggiorna_import_job(job_id, stato='fallito', messaggio=str(e)[:500])
+        raise
+
+
+def statistiche_job(job: Dict) -> Dict:
+    """Throughput di un job di get_import_jobs: file/s di parsing e righe/s di scrittura"""
+    return {
+        'file_s': job['analizzati'] / job['durata_parsing'] if job['durata_parsing'] else 0.0,
+        'righe_s': job['righe'] / job['durata_scrittura'] if job['durata_scrittura'] else 0.0,
+    }
+
+
+def riepilogo_template_job(db, job_id: int) -> Dict[str, Dict]:
+    """Tempi di parsing per template di tutti i file analizzati del job (anche ripresi)"""
+    return riepilogo_template([deserializza_risultato(item['risultato'])
+                               for item in db.get_import_job_items(job_id) if item['risultato']])
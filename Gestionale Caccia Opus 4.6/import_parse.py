@@ -0,0 +1,314 @@
+"""
+Stage di parsing dell'import massivo fogli caccia
+Estrazione dati dai file Excel (motore unico excel_parser.ExcelParser),
+indipendente da Streamlit e dal database, così da poter essere eseguita
+in processi separati (ProcessPoolExecutor).
+La scrittura su database resta a un solo writer nella pagina di import.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import datetime as dt
+import zipfile
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from constants import Config
+from excel_parser import estrai_dati_foglio, VERSIONE_PARSER
+
+logger = logging.getLogger(__name__)
+
+
+def calcola_hash_file(file_path: str, blocco: int = 1024 * 1024) -> str:
+    """Hash SHA-256 del contenuto del file (lettura a blocchi)"""
+    with open(file_path, 'rb') as f:
+        return calcola_hash_contenuto(f, blocco)
+
+
+def calcola_hash_contenuto(contenuto: BinaryIO, blocco: int = 1024 * 1024) -> str:
+    """Hash SHA-256 di un file binario aperto (es. BytesIO di un upload), riportato all'inizio"""
+    h = hashlib.sha256()
+    contenuto.seek(0)
+    for parte in iter(lambda: contenuto.read(blocco), b''):
+        h.update(parte)
+    contenuto.seek(0)
+    return h.hexdigest()
+
+
+def parse_file(file_path: str, anno: int, contenuto: Optional[BinaryIO] = None) -> Dict:
+    """
+    Parsing completo di un file (header + dati estratti).
+    Ritorna un dict picklable, mai un'eccezione: eventuali errori sono in 'errore'.
+    
+    Con `contenuto` (file binario in memoria) legge da lì e usa file_path solo
+    come identificativo del file (es. 'upload:archivio.zip/Rossi Mario.xlsx').
+    """
+    file_name = os.path.basename(file_path)
+    start = time.perf_counter()
+    risultato = {
+        'file_name': file_name,
+        'file_path': file_path,
+        'header_text': '',
+        'dati': None,
+        'errore': None,
+        'durata': 0.0,
+        'tempi': {},
+        'da_cache': False,
+    }
+    
+    try:
+        # Estrattore unico: una sola apertura del workbook per tutti i campi
+        dati = estrai_dati_foglio(contenuto if contenuto is not None else file_path, anno, file_name)
+        risultato['tempi'] = dati.pop('tempi')  # Telemetria: apertura ed estrazione
+        risultato['header_text'] = dati['header_text']
+        risultato['dati'] = dati
+    except Exception as e:
+        risultato['errore'] = str(e)
+        logger.error(f"Errore parsing {file_name}: {e}")
+    
+    risultato['durata'] = time.perf_counter() - start
+    return risultato
+
+
+def _parse_file_args(args) -> Dict:
+    # Wrapper a livello di modulo (picklable) per executor.map
+    return parse_file(*args)
+
+
+def parse_files(file_paths: List[str], anno: int, workers: int = Config.IMPORT_PARSE_WORKERS,
+                progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+    """
+    Esegue il parsing di più file, in parallelo su `workers` processi.
+    I risultati sono restituiti nello stesso ordine di file_paths.
+    
+    Args:
+        file_paths: Percorsi dei file Excel
+        anno: Anno fogli
+        workers: Numero di processi (<= 1: parsing seriale nel processo corrente)
+        progress: Callback opzionale progress(completati, totale)
+    """
+    totale = len(file_paths)
+    risultati = []
+    
+    if workers <= 1 or totale <= 1:
+        for path in file_paths:
+            risultati.append(parse_file(path, anno))
+            if progress:
+                progress(len(risultati), totale)
+        return risultati
+    
+    # chunksize > 1 riduce l'overhead di IPC per i file piccoli
+    chunksize = max(1, min(16, totale // (workers * 4)))
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for risultato in executor.map(_parse_file_args,
+                                      ((path, anno) for path in file_paths),
+                                      chunksize=chunksize):
+            risultati.append(risultato)
+            if progress:
+                progress(len(risultati), totale)
+    
+    return risultati
+
+
+# ========== UPLOAD IN MEMORIA ==========
+
+PREFISSO_UPLOAD = 'upload:'
+
+
+def file_excel_supportato(nome: str) -> bool:
+    """File .xlsx da importare (esclusi file di lock '~$', nascosti e metadati macOS)"""
+    base = os.path.basename(nome)
+    return (base.lower().endswith('.xlsx') and not base.startswith(('~$', '.'))
+            and not nome.startswith('__MACOSX/'))
+
+
+def conta_file_caricati(caricati: List[BinaryIO]) -> int:
+    """Numero di file Excel fra i caricati (membri .xlsx degli ZIP inclusi)"""
+    totale = 0
+    for caricato in caricati:
+        if caricato.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(caricato) as zf:
+                totale += sum(1 for info in zf.infolist()
+                              if not info.is_dir() and file_excel_supportato(info.filename))
+            caricato.seek(0)
+        elif file_excel_supportato(caricato.name):
+            totale += 1
+    return totale
+
+
+def iter_file_caricati(caricati: List[BinaryIO]) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[str]]]:
+    """
+    File Excel caricati dal browser, uno alla volta: (identificativo, contenuto, errore).
+    I file .xlsx sono già in memoria (BytesIO); degli ZIP si decomprime un membro
+    alla volta, così la memoria resta limitata al membro corrente. Nessun file
+    temporaneo su disco. Membri oltre Config.MAX_FILE_SIZE_MB sono segnalati come errore.
+    """
+    limite = Config.MAX_FILE_SIZE_MB * 1024 * 1024
+    for caricato in caricati:
+        if not caricato.name.lower().endswith('.zip'):
+            if file_excel_supportato(caricato.name):
+                caricato.seek(0)
+                yield f"{PREFISSO_UPLOAD}{caricato.name}", caricato, None
+            continue
+        
+        with zipfile.ZipFile(caricato) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not file_excel_supportato(info.filename):
+                    continue
+                identificativo = f"{PREFISSO_UPLOAD}{caricato.name}/{info.filename}"
+                if info.file_size > limite:
+                    yield identificativo, None, f"File oltre {Config.MAX_FILE_SIZE_MB} MB"
+                    continue
+                # Il .xlsx è a sua volta uno zip: serve un buffer seekable
+                yield identificativo, BytesIO(zf.read(info)), None
+
+
+def parse_file_caricati(caricati: List[BinaryIO], anno: int,
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        db=None) -> List[Dict]:
+    """
+    Parsing seriale dei file caricati (vedi iter_file_caricati), senza passare
+    dal disco. Stessi risultati di parse_file, con file_path = identificativo upload.
+    Con `db` consulta prima la cache dei risultati (chiave: hash del contenuto).
+    """
+    totale = conta_file_caricati(caricati)
+    risultati = []
+    da_salvare = []
+    for identificativo, contenuto, errore in iter_file_caricati(caricati):
+        file_name = os.path.basename(identificativo)
+        if errore:
+            risultato = {'file_name': file_name, 'file_path': identificativo, 'header_text': '',
+                         'dati': None, 'errore': errore, 'durata': 0.0, 'tempi': {}, 'da_cache': False}
+        elif db is None:
+            risultato = parse_file(identificativo, anno, contenuto)
+        else:
+            chiave = (calcola_hash_contenuto(contenuto), anno, file_name)
+            in_cache = db.get_parse_cache([chiave], VERSIONE_PARSER)
+            if chiave in in_cache:
+                risultato = _risultato_da_cache(in_cache[chiave], identificativo)
+            else:
+                risultato = parse_file(identificativo, anno, contenuto)
+                if not risultato['errore']:
+                    da_salvare.append((*chiave, serializza_risultato(risultato)))
+        risultati.append(risultato)
+        if progress:
+            progress(len(risultati), totale)
+    
+    if da_salvare:
+        db.salva_parse_cache(da_salvare, VERSIONE_PARSER)
+    return risultati
+
+
+def serializza_risultato(risultato: Dict) -> str:
+    """Risultato di parse_file in JSON (date in ISO) per il journal dei job"""
+    return json.dumps(risultato, default=lambda valore: valore.isoformat()
+                      if isinstance(valore, (dt.date, dt.datetime)) else str(valore))
+
+
+def deserializza_risultato(testo: str) -> Dict:
+    """Inverso di serializza_risultato: ripristina le date dei campi data_*"""
+    risultato = json.loads(testo)
+    dati = risultato.get('dati') or {}
+    for campo, valore in dati.items():
+        if campo.startswith('data_') and isinstance(valore, str):
+            try:
+                dati[campo] = dt.date.fromisoformat(valore[:10])
+            except ValueError:
+                pass
+    return risultato
+
+
+# ========== CACHE DEI RISULTATI ==========
+
+def _risultato_da_cache(testo: str, file_path: str) -> Dict:
+    """Risultato salvato in cache, riferito al file corrente"""
+    risultato = deserializza_risultato(testo)
+    risultato.update(file_path=file_path, durata=0.0, tempi={}, da_cache=True)
+    return risultato
+
+
+def parse_files_cache(db, voci: List[Dict], anno: int, workers: int = Config.IMPORT_PARSE_WORKERS,
+                      progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+    """
+    Come parse_files, ma consulta la cache dei risultati (tabella parse_cache)
+    prima di aprire i workbook: solo i file non in cache sono analizzati, e i
+    loro risultati (senza errori) sono salvati in cache.
+    
+    La chiave è (content_hash, versione del parser, anno, nome file): anno e
+    nome file entrano nell'estrazione (stato, fallback sul nome, tessera).
+    Cambiando excel_parser.VERSIONE_PARSER la cache precedente è ignorata ed eliminata.
+    
+    Args:
+        voci: Dict con file_path, file_name e content_hash (es. item di un job)
+    
+    Returns:
+        Risultati nello stesso ordine di voci, con 'da_cache' True/False
+    """
+    totale = len(voci)
+    chiavi = [(voce['content_hash'], anno, voce['file_name']) for voce in voci]
+    in_cache = db.get_parse_cache([c for c in chiavi if c[0]], VERSIONE_PARSER)
+    
+    risultati: List[Optional[Dict]] = [None] * totale
+    mancanti = []
+    for i, (voce, chiave) in enumerate(zip(voci, chiavi)):
+        if chiave in in_cache:
+            risultati[i] = _risultato_da_cache(in_cache[chiave], voce['file_path'])
+        else:
+            mancanti.append(i)
+    
+    trovati = totale - len(mancanti)
+    if progress and trovati:
+        progress(trovati, totale)
+    
+    def _progress(completati, _totale):
+        if progress:
+            progress(trovati + completati, totale)
+    
+    analizzati = parse_files([voci[i]['file_path'] for i in mancanti], anno,
+                             workers=workers, progress=_progress)
+    da_salvare = []
+    for i, risultato in zip(mancanti, analizzati):
+        risultati[i] = risultato
+        if not risultato['errore'] and chiavi[i][0]:
+            da_salvare.append((*chiavi[i], serializza_risultato(risultato)))
+    
+    if da_salvare:
+        db.salva_parse_cache(da_salvare, VERSIONE_PARSER)
+    if totale:
+        logger.info(f"Cache parsing: {trovati} risultati riusati, {len(mancanti)} file analizzati")
+    return risultati
+
+
+def riepilogo_template(risultati: List[Dict]) -> Dict[str, Dict]:
+    """
+    Tempi di parsing per template, aggregati dai risultati di parse_files
+    (validi anche con più processi, dove le statistiche di ExcelParser
+    restano nei singoli worker).
+    
+    Returns:
+        Dict template -> {'file', 'ms_medi', 'layout_noti'}
+    """
+    totali = {}
+    for risultato in risultati:
+        if risultato.get('da_cache'):
+            continue  # Non analizzato in questa esecuzione
+        dati = risultato['dati']
+        template = dati['template'] if dati else 'errore'
+        voce = totali.setdefault(template, {'file': 0, 'secondi': 0.0, 'layout_noti': 0})
+        voce['file'] += 1
+        voce['secondi'] += risultato['durata']
+        voce['layout_noti'] += int(bool(dati and dati.get('layout_noto')))
+    
+    return {
+        template: {
+            'file': voce['file'],
+            'ms_medi': voce['secondi'] * 1000 / voce['file'],
+            'layout_noti': voce['layout_noti'],
+        }
+        for template, voce in totali.items()
+    }
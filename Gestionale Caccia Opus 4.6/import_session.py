@@ -0,0 +1,561 @@
+"""
+Sessione di import massivo fogli caccia
+Carica una sola volta cacciatori e fogli esistenti in indici hash
+(indice di abbinamento cognome/nome, numero_tessera, numero_foglio) e li
+aggiorna man mano che l'import crea nuovi record: lavoro costante per ogni file.
+
+Stage di scrittura: un solo writer, una transazione ogni N file e un
+SAVEPOINT per file (un file errato annulla solo se stesso).
+
+Import incrementale: il manifest (tabella import_manifest) registra per ogni
+file size, mtime, hash del contenuto ed esito; alla nuova scansione i file
+invariati non vengono aperti e quelli rinominati sono riconosciuti dall'hash.
+"""
+
+import os
+import json
+import hashlib
+import datetime as dt
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Set
+
+from constants import Config
+from import_parse import PREFISSO_UPLOAD, calcola_hash_file
+from matching_cacciatori import IndiceCacciatori
+from telemetria_import import nuovo_run, registra_file
+
+logger = logging.getLogger(__name__)
+
+
+class ImportSession:
+    """Indici in memoria per l'import di un anno"""
+
+    # Solo le tessere da porto d'arma identificano la persona: quelle AUTO_
+    # derivano dall'hash del nome file e possono coincidere per persone diverse
+    PREFISSO_TESSERA_REALE = 'PA_'
+
+    def __init__(self, db, anno: int):
+        self.db = db
+        self.anno = anno
+
+        self._indice = IndiceCacciatori()
+        self._per_tessera: Dict[str, Dict] = {}
+        self._numeri_foglio: Set[str] = set()
+        self._annullabili: Optional[List[Callable]] = None  # Undo indici del file in corso
+        self._simulazione = False  # Anteprima: nessuna scrittura su database
+        self._durata_abbinamento = 0.0  # Telemetria: abbinamento dell'ultimo file
+
+        self._carica_indici()
+
+    def _carica_indici(self):
+        self._indice = IndiceCacciatori()
+        self._per_tessera.clear()
+        self._numeri_foglio.clear()
+
+        db = self.db
+        for cacciatore in db.get_tutti_cacciatori(solo_attivi=True):
+            self._indicizza_cacciatore(cacciatore)
+
+        for foglio in db.get_fogli_anno(self.anno):
+            self._numeri_foglio.add(foglio.get('numero_foglio'))
+
+    def _indicizza_cacciatore(self, cacciatore: Dict):
+        self._indice.aggiungi(cacciatore)
+
+        tessera = cacciatore.get('numero_tessera')
+        nuova_tessera = tessera and tessera not in self._per_tessera
+        if nuova_tessera:
+            self._per_tessera[tessera] = cacciatore
+
+        if self._annullabili is not None:
+            def annulla():
+                self._indice.rimuovi(cacciatore)
+                if nuova_tessera:
+                    del self._per_tessera[tessera]
+            self._annullabili.append(annulla)
+
+    # ========== CACCIATORI ==========
+
+    def abbina_cacciatore(self, cognome: str, nome: str, numero_tessera: str = None,
+                          data_nascita=None) -> Dict:
+        """
+        Abbina il cacciatore del file a uno già presente (vedi IndiceCacciatori.cerca).
+        Se il nome non basta decide il numero_tessera, ma solo se è un porto d'arma
+        (PA_): risolve gli ambigui ed evita UNIQUE constraint failed quando la
+        tessera esiste già. Una tessera AUTO_ già assegnata a un altro cacciatore
+        non unisce mai due persone: l'esito è 'ambiguo' e lo decide l'operatore.
+        
+        Returns:
+            Dict con 'esito' ('match', 'ambiguo', 'nuovo'), 'cacciatore',
+            'punteggio' e 'candidati' (coppie punteggio, cacciatore)
+        """
+        esito = self._indice.cerca(cognome, nome, data_nascita=data_nascita)
+        per_tessera = self._per_tessera.get(numero_tessera) if numero_tessera else None
+        if not per_tessera:
+            return esito
+
+        if not numero_tessera.startswith(self.PREFISSO_TESSERA_REALE):
+            if esito['esito'] == 'nuovo':
+                # Collisione di tessera AUTO_: crearlo violerebbe UNIQUE, abbinarlo unirebbe due persone
+                logger.warning(f"Tessera {numero_tessera} di {cognome} {nome} già assegnata a "
+                               f"{per_tessera['cognome']} {per_tessera['nome']} (ID={per_tessera['id']})")
+                return {'esito': 'ambiguo', 'cacciatore': None,
+                        'punteggio': 0.0, 'candidati': [(0.0, per_tessera)]}
+            return esito
+
+        if esito['esito'] == 'ambiguo':
+            for punteggio, candidato in esito['candidati']:
+                if candidato is per_tessera:
+                    return {'esito': 'match', 'cacciatore': candidato,
+                            'punteggio': punteggio, 'candidati': esito['candidati']}
+        elif esito['esito'] == 'nuovo':
+            return {'esito': 'match', 'cacciatore': per_tessera,
+                    'punteggio': 0.0, 'candidati': []}
+        return esito
+
+    def cerca_cacciatore(self, cognome: str, nome: str, numero_tessera: str = None,
+                         data_nascita=None) -> Optional[Dict]:
+        """Cacciatore abbinato senza ambiguità, altrimenti None"""
+        return self.abbina_cacciatore(cognome, nome, numero_tessera, data_nascita)['cacciatore']
+
+    def crea_cacciatore(self, dati: Dict) -> Dict:
+        """Inserisce il cacciatore nel database e lo aggiunge agli indici"""
+        cacciatore_id = None if self._simulazione else self.db.aggiungi_cacciatore(dati)
+
+        cacciatore = dict(dati)
+        cacciatore['id'] = cacciatore_id
+        self._indicizza_cacciatore(cacciatore)
+        return cacciatore
+
+    # ========== FOGLI ==========
+
+    def foglio_esiste(self, numero_foglio: str) -> bool:
+        return numero_foglio in self._numeri_foglio
+
+    def crea_foglio(self, dati: Dict) -> int:
+        """Inserisce il foglio nel database e ne registra il numero"""
+        foglio_id = None if self._simulazione else self.db.aggiungi_foglio_caccia(dati)
+        numero_foglio = dati.get('numero_foglio')
+        self._numeri_foglio.add(numero_foglio)
+        if self._annullabili is not None:
+            self._annullabili.append(lambda: self._numeri_foglio.discard(numero_foglio))
+        return foglio_id
+
+    # ========== MANIFEST (IMPORT INCREMENTALE) ==========
+
+    def _voce_valida(self, voce: Dict) -> bool:
+        """La voce di manifest descrive ancora lo stato del database?"""
+        if voce['esito'] == 'scartato':
+            return True
+        if voce['esito'] in ('importato', 'esistente'):
+            # Foglio cancellato nel frattempo: il file va rielaborato
+            return voce.get('numero_foglio') in self._numeri_foglio
+        return False  # Errori e ambigui: riprova
+
+    def pianifica_file(self, file_paths: List[str]) -> Dict:
+        """
+        Confronta i file della cartella con il manifest.
+        
+        Returns:
+            Dict con:
+            - 'invariati': percorsi con size/mtime invariati (non vengono aperti)
+            - 'rinominati': coppie (voce manifest, info file) con stesso hash
+            - 'da_analizzare': info dei file nuovi o modificati, da passare al parsing
+            Le info file contengono file_path, file_name, size, mtime, content_hash.
+        """
+        manifest = self.db.get_import_manifest(self.anno)
+        per_hash: Dict[str, Dict] = {}
+        for voce in manifest.values():
+            if self._voce_valida(voce):
+                per_hash.setdefault(voce['content_hash'], voce)
+
+        piano = {'invariati': [], 'rinominati': [], 'da_analizzare': []}
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            voce = manifest.get(file_path)
+            if (voce and voce['size'] == stat.st_size and voce['mtime'] == stat.st_mtime
+                    and self._voce_valida(voce)):
+                piano['invariati'].append(file_path)
+                continue
+
+            info = {
+                'file_path': file_path,
+                'file_name': os.path.basename(file_path),
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'content_hash': calcola_hash_file(file_path),
+            }
+
+            originale = per_hash.get(info['content_hash'])
+            if originale and (originale['file_path'] == file_path
+                              or not os.path.exists(originale['file_path'])):
+                # Stesso contenuto: solo toccato (mtime) oppure rinominato/spostato
+                piano['rinominati'].append((originale, info))
+                del per_hash[info['content_hash']]
+            else:
+                piano['da_analizzare'].append(info)
+
+        logger.info(f"Manifest: {len(piano['invariati'])} invariati, {len(piano['rinominati'])} "
+                    f"rinominati, {len(piano['da_analizzare'])} da analizzare")
+        return piano
+
+    def applica_rinomine(self, rinominati: List[tuple]) -> int:
+        """Sposta le voci di manifest dei file rinominati, senza rielaborarli"""
+        with self.db.transaction():
+            for voce, info in rinominati:
+                nuova = dict(voce)
+                nuova.update(info)
+                self.db.sposta_import_manifest(voce['file_path'], nuova)
+        return len(rinominati)
+
+    def _registra_manifest(self, risultato: Dict, esito: Dict):
+        # Solo per i risultati pianificati con pianifica_file (hash noto)
+        if not risultato.get('content_hash'):
+            return
+        self.db.registra_import_manifest({
+            'file_path': risultato['file_path'],
+            'file_name': risultato['file_name'],
+            'anno': self.anno,
+            'size': risultato['size'],
+            'mtime': risultato['mtime'],
+            'content_hash': risultato['content_hash'],
+            'esito': esito['esito'],
+            'messaggio': esito.get('messaggio'),
+            'dati': json.dumps(risultato.get('dati'), default=str) if risultato.get('dati') else None,
+            'numero_foglio': esito.get('numero_foglio'),
+            'foglio_id': esito.get('foglio_id'),
+        })
+
+    def _registra_job(self, job_id: Optional[int], risultato: Dict, esito: Dict):
+        # Checkpoint del job: il file risulta elaborato solo se il chunk va in commit
+        if job_id is None:
+            return
+        self.db.registra_esito_job_item(job_id, risultato['file_path'], esito['esito'],
+                                        esito.get('messaggio'))
+
+    # ========== ANTEPRIMA (DRY-RUN) ==========
+
+    AZIONI_ANTEPRIMA = {
+        'importato': 'nuovo_foglio',
+        'esistente': 'duplicato',
+        'ambiguo': 'ambiguo',
+        'scartato': 'scartato',
+    }
+
+    def anteprima(self, risultati: List[Dict]) -> List[Dict]:
+        """
+        Simula l'import dei risultati senza scrivere sul database.
+        Stessa logica di importa_risultato: cacciatori e fogli pianificati sono
+        visibili ai file successivi (come nell'import vero), poi gli indici
+        tornano allo stato del database.
+        
+        Returns:
+            Una riga per risultato, nello stesso ordine, con file_name, azione
+            ('nuovo_foglio', 'duplicato', 'ambiguo', 'scartato', 'errore'),
+            cacciatore ('nuovo', 'esistente'), cacciatore_id, cognome, nome,
+            numero_foglio, stato e messaggio
+        """
+        righe = []
+        self._simulazione = True
+        self._annullabili = []
+        try:
+            for risultato in risultati:
+                dati = risultato.get('dati') or {}
+                riga = {
+                    'file_name': risultato['file_name'],
+                    'azione': 'errore',
+                    'cacciatore': None,
+                    'cacciatore_id': None,
+                    'cognome': dati.get('cognome'),
+                    'nome': dati.get('nome'),
+                    'numero_foglio': None,
+                    'stato': dati.get('stato'),
+                    'messaggio': '',
+                }
+                try:
+                    esito = self.importa_risultato(risultato)
+                except Exception as e:
+                    riga['messaggio'] = str(e)[:150]
+                    righe.append(riga)
+                    continue
+
+                riga['azione'] = self.AZIONI_ANTEPRIMA[esito['esito']]
+                riga['messaggio'] = esito['messaggio']
+                riga['numero_foglio'] = esito.get('numero_foglio')
+                if esito['esito'] in ('importato', 'esistente'):
+                    riga['cacciatore'] = 'nuovo' if esito['cacciatore_creato'] else 'esistente'
+                    riga['cacciatore_id'] = esito['cacciatore_id']
+                righe.append(riga)
+        finally:
+            for annulla in reversed(self._annullabili):
+                annulla()
+            self._annullabili = None
+            self._simulazione = False
+
+        logger.info(f"Anteprima: {len(righe)} file analizzati senza scritture")
+        return righe
+
+    # ========== SCRITTURA A CHUNK ==========
+
+    @contextmanager
+    def chunk(self):
+        """Transazione che raggruppa più file: un solo commit per chunk"""
+        try:
+            with self.db.transaction():
+                yield
+        except BaseException:
+            # Commit del chunk fallito: gli indici non riflettono più il database
+            self._carica_indici()
+            raise
+
+    @contextmanager
+    def file_savepoint(self):
+        """SAVEPOINT per un singolo file: se fallisce annulla database e indici"""
+        self._annullabili = []
+        try:
+            with self.db.transaction():
+                yield
+        except BaseException:
+            for annulla in reversed(self._annullabili):
+                annulla()
+            raise
+        finally:
+            self._annullabili = None
+
+    def importa_risultato(self, risultato: Dict) -> Dict:
+        """
+        Scrive su database un risultato dello stage di parsing (import_parse.parse_file).
+        Da chiamare dentro file_savepoint(); solleva eccezione in caso di errore.
+        
+        Returns:
+            Dict con 'esito' ('importato', 'esistente', 'scartato', 'ambiguo'),
+            'cacciatore_creato' e 'messaggio' (più numero_foglio e cacciatore_id
+            per importato/esistente)
+        """
+        file_name = risultato['file_name']
+        file_path = risultato['file_path']
+        anno = self.anno
+
+        # Dati già estratti nello stage di parsing (con GUARDIA numero_tessera)
+        if risultato['errore']:
+            raise ValueError(f"Parsing fallito: {risultato['errore']}")
+
+        header_text = risultato['header_text']
+        logger.debug(f"Header estratto: {header_text[:200] if header_text else 'VUOTO'}")
+
+        dati_estratti = risultato['dati']
+
+        cognome = dati_estratti['cognome']
+        nome = dati_estratti['nome']
+        numero_tessera = dati_estratti['numero_tessera']  # GARANTITO non vuoto
+        porto_arma = dati_estratti['porto_arma']
+        stato = dati_estratti['stato']
+
+        # TASK 4: Log tecnico valore finale numero_tessera
+        logger.debug(f"Dati estratti: cognome={cognome}, nome={nome}, tessera={numero_tessera}, porto={porto_arma}")
+
+        if not cognome or not nome:
+            logger.error(f"SKIP: Impossibile estrarre cognome/nome da {file_name}")
+            return {'esito': 'scartato', 'cacciatore_creato': False,
+                    'messaggio': "Cognome/nome mancanti"}
+
+        # Doppia verifica numero_tessera (sicurezza ridondante)
+        if not numero_tessera or numero_tessera.strip() == '':
+            logger.critical(f"CRITICAL: tessera vuota dopo guardia! File: {file_name}")
+            raise ValueError(f"numero_tessera vuoto nonostante guardia: {file_name}")
+
+        # Cerca o crea cacciatore
+        cacciatore_creato = False
+        inizio_abbinamento = time.perf_counter()
+        abbinamento = self.abbina_cacciatore(cognome, nome, numero_tessera=numero_tessera)
+        self._durata_abbinamento = time.perf_counter() - inizio_abbinamento
+        cacciatore = abbinamento['cacciatore']
+
+        if abbinamento['esito'] == 'ambiguo':
+            # Né collegato al primo candidato né creato un duplicato: lo decide l'operatore
+            candidati = [f"{c['cognome']} {c['nome']} (ID={c['id']}, {p:.2f})"
+                         for p, c in abbinamento['candidati']]
+            logger.warning(f"AMBIGUO: {cognome} {nome} in {file_name} -> {candidati}")
+            return {'esito': 'ambiguo', 'cacciatore_creato': False,
+                    'messaggio': f"{cognome} {nome}: cacciatore ambiguo fra " + "; ".join(candidati)}
+
+        if not cacciatore:
+            # Crea nuovo cacciatore
+            dati_cacciatore = {
+                'cognome': cognome,
+                'nome': nome,
+                'codice_fiscale': None,
+                'data_nascita': dati_estratti.get('data_rilascio'),
+                'numero_tessera': numero_tessera,  # OBBLIGATORIO
+                'attivo': 1
+            }
+
+            logger.debug(f"Creazione nuovo cacciatore: {cognome} {nome}, tessera={numero_tessera}")
+            cacciatore = self.crea_cacciatore(dati_cacciatore)
+            cacciatore_creato = True
+        else:
+            logger.debug(f"Cacciatore esistente trovato: ID={cacciatore['id']}")
+
+        # Genera numero foglio univoco
+        if dati_estratti.get('autorizzazione_regionale'):
+            numero_foglio = f"{anno}_{dati_estratti['autorizzazione_regionale']}"
+        else:
+            hash_obj = hashlib.md5(file_name.encode())
+            numero_seq = int(hash_obj.hexdigest()[:8], 16) % 900000 + 100000
+            numero_foglio = f"{anno}{numero_seq}"
+
+        # Verifica esistenza
+        if self.foglio_esiste(numero_foglio):
+            logger.debug(f"Foglio già esistente: {numero_foglio}")
+            return {'esito': 'esistente', 'cacciatore_creato': cacciatore_creato,
+                    'messaggio': f"Foglio già esistente: {numero_foglio}",
+                    'numero_foglio': numero_foglio, 'cacciatore_id': cacciatore['id']}
+
+        # File caricati dal browser: nessun file su disco da collegare al foglio,
+        # il nome originale resta solo nelle note
+        caricato = file_path.startswith(PREFISSO_UPLOAD)
+        nome_originale = file_path[len(PREFISSO_UPLOAD):] if caricato else file_name
+
+        # Crea foglio
+        dati_foglio = {
+            'numero_foglio': numero_foglio,
+            'anno': anno,
+            'cacciatore_id': cacciatore['id'],
+            'tipo': 'A3',
+            'data_rilascio': dt.datetime.now().date().isoformat() if not dati_estratti.get('data_rilascio') else dati_estratti['data_rilascio'].isoformat(),
+            'rilasciato_a': f"{cacciatore['cognome']} {cacciatore['nome']}",
+            'stato': stato,
+            'note': f"Import: {nome_originale}. Porto: {porto_arma or 'N/A'}",
+            'file_path': None if caricato else file_path
+        }
+
+        logger.debug(f"Inserimento foglio: {numero_foglio}")
+        foglio_id = self.crea_foglio(dati_foglio)
+
+        logger.debug(f"SUCCESS: Foglio ID={foglio_id} creato")
+        return {'esito': 'importato', 'cacciatore_creato': cacciatore_creato,
+                'messaggio': f"Foglio ID={foglio_id}", 'foglio_id': foglio_id,
+                'numero_foglio': numero_foglio, 'cacciatore_id': cacciatore['id']}
+
+    def _telemetria(self, risultato: Dict, esito: Dict, inizio_file: float) -> tuple:
+        """Record di telemetria del file: abbinamento e resto della scrittura (savepoint, manifest, job)"""
+        totale = time.perf_counter() - inizio_file
+        errore = esito['messaggio'] if esito['esito'] not in ('importato', 'esistente') else None
+        durate = {'abbinamento': self._durata_abbinamento,
+                  'scrittura': totale - self._durata_abbinamento}
+        return risultato, esito['esito'], errore, durate
+
+    def importa_risultati(self, risultati: List[Dict], chunk_size: int = Config.MAX_BATCH_SIZE,
+                          progress: Optional[Callable[[int, int, str], None]] = None,
+                          job_id: Optional[int] = None, run_id: Optional[str] = None) -> Dict:
+        """
+        Scrive i risultati del parsing a chunk di `chunk_size` file per transazione.
+        Per ogni file un record di telemetria (telemetria_import) dopo il commit del chunk.
+        
+        Args:
+            risultati: Risultati di import_parse.parse_files
+            chunk_size: File per transazione
+            progress: Callback opzionale progress(completati, totale, file_name)
+            job_id: Job di import (import_jobs) di cui registrare l'esito di ogni file,
+                nella stessa transazione del file
+            run_id: Esecuzione a cui riferire la telemetria (default: dal job_id)
+        
+        Returns:
+            Dict riepilogo: importati, gia_esistenti, errori, ambigui, cacciatori_creati,
+            errori_dettaglio, ambigui_dettaglio, righe (righe scritte), durata (secondi),
+            cache_hit / cache_miss (risultati presi dalla cache di parsing / estratti dal file),
+            run_id (telemetria_import.riepilogo_run)
+        """
+        cache_hit = sum(1 for risultato in risultati if risultato.get('da_cache'))
+        riepilogo = {
+            'importati': 0,
+            'gia_esistenti': 0,
+            'errori': 0,
+            'ambigui': 0,
+            'cacciatori_creati': 0,
+            'errori_dettaglio': [],
+            'ambigui_dettaglio': [],
+            'righe': 0,
+            'durata': 0.0,
+            'cache_hit': cache_hit,
+            'cache_miss': len(risultati) - cache_hit,
+            'run_id': run_id or nuovo_run(job_id),
+        }
+        chunk_size = max(1, int(chunk_size))
+        totale = len(risultati)
+        start = time.perf_counter()
+
+        for inizio in range(0, totale, chunk_size):
+            blocco = risultati[inizio:inizio + chunk_size]
+            parziale = {'importati': 0, 'gia_esistenti': 0, 'errori': 0, 'ambigui': 0,
+                        'cacciatori_creati': 0}
+            errori_blocco = []
+            ambigui_blocco = []
+            telemetria_blocco = []  # (risultato, esito, errore, durate): registrati dopo il commit
+
+            try:
+                with self.chunk():
+                    for offset, risultato in enumerate(blocco):
+                        file_name = risultato['file_name']
+                        idx = inizio + offset
+                        if progress:
+                            progress(idx + 1, totale, file_name)
+                        logger.debug(f"--- Processing file {idx + 1}/{totale}: {file_name} ---")
+                        self._durata_abbinamento = 0.0
+                        inizio_file = time.perf_counter()
+
+                        try:
+                            with self.file_savepoint():
+                                esito = self.importa_risultato(risultato)
+                        except Exception as e:
+                            # TASK 4: Log errore tecnico (rollback del solo file)
+                            logger.error(f"ERRORE DEFINITIVO per {file_name}: {e}")
+                            parziale['errori'] += 1
+                            errori_blocco.append(f"{file_name}: {str(e)[:150]}")
+                            esito = {'esito': 'errore', 'messaggio': str(e)[:500]}
+                            self._registra_manifest(risultato, esito)
+                            self._registra_job(job_id, risultato, esito)
+                            telemetria_blocco.append(self._telemetria(risultato, esito, inizio_file))
+                            continue
+
+                        self._registra_manifest(risultato, esito)
+                        self._registra_job(job_id, risultato, esito)
+                        telemetria_blocco.append(self._telemetria(risultato, esito, inizio_file))
+
+                        if esito['cacciatore_creato']:
+                            parziale['cacciatori_creati'] += 1
+                        if esito['esito'] == 'importato':
+                            parziale['importati'] += 1
+                        elif esito['esito'] == 'esistente':
+                            parziale['gia_esistenti'] += 1
+                        elif esito['esito'] == 'ambiguo':
+                            parziale['ambigui'] += 1
+                            ambigui_blocco.append(f"{file_name}: {esito['messaggio']}")
+                        else:
+                            parziale['errori'] += 1
+                            errori_blocco.append(f"{file_name}: {esito['messaggio']}")
+            except Exception as e:
+                # Commit del chunk fallito: nessun file del blocco è stato scritto
+                logger.error(f"Commit chunk {inizio + 1}-{inizio + len(blocco)} fallito: {e}")
+                riepilogo['errori'] += len(blocco)
+                riepilogo['errori_dettaglio'].extend(
+                    f"{r['file_name']}: chunk annullato ({str(e)[:100]})" for r in blocco
+                )
+                durate_blocco = {id(r): durate for r, _, _, durate in telemetria_blocco}
+                for r in blocco:
+                    registra_file(riepilogo['run_id'], r, 'errore', f"Chunk annullato: {str(e)[:100]}",
+                                  durate_blocco.get(id(r)))
+                continue
+
+            for record in telemetria_blocco:
+                registra_file(riepilogo['run_id'], *record)
+            for chiave, valore in parziale.items():
+                riepilogo[chiave] += valore
+            riepilogo['errori_dettaglio'].extend(errori_blocco)
+            riepilogo['ambigui_dettaglio'].extend(ambigui_blocco)
+
+        riepilogo['durata'] = time.perf_counter() - start
+        riepilogo['righe'] = riepilogo['importati'] + riepilogo['cacciatori_creati']
+        return riepilogo
@@ -0,0 +1,171 @@
+"""
+Worker di import in background
+Un thread per processo esegue i job di import (import_jobs) uno alla volta
+(un solo writer), fuori dal ciclo di rerun di Streamlit: interazioni e
+cambi di pagina non interrompono l'import e la UI resta libera.
+
+L'avanzamento è tenuto in memoria (aggiornarlo costa un assegnamento sotto
+lock) e la pagina lo legge a intervalli di Config.IMPORT_POLL_SECONDS:
+file/s, ETA e durata di ogni stage. Lo stato persistente resta nel journal
+dei job, quindi un riavvio del processo lascia job riprendibili.
+"""
+
+import time
+import queue
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from constants import Config
+from database import GestionaleCacciaDB
+from import_jobs import analizza_job, esegui_job
+from import_session import ImportSession
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerImport:
+    """Coda di job di import eseguiti da un thread dedicato"""
+
+    def __init__(self, db):
+        self.db = db
+        self._coda = queue.Queue()
+        self._lock = threading.Lock()
+        self._stati: Dict[int, Dict] = {}
+
+        self._thread = threading.Thread(target=self._run, name="import-worker", daemon=True)
+        self._thread.start()
+
+    # ========== API PER LA UI ==========
+
+    def avvia(self, job_id: int, operazione: str = 'importa',
+              workers: int = Config.IMPORT_PARSE_WORKERS,
+              chunk_size: int = Config.MAX_BATCH_SIZE) -> int:
+        """
+        Accoda un job. `operazione`:
+        - 'importa': parsing dei file mancanti e scrittura (anche ripresa)
+        - 'anteprima': solo parsing e piano delle azioni (ImportSession.anteprima)
+        """
+        with self._lock:
+            self._stati[job_id] = {
+                'job_id': job_id,
+                'operazione': operazione,
+                'fase': 'in_coda',
+                'completati': 0,
+                'totale': 0,
+                'file_corrente': None,
+                'fasi': {},              # fase -> [inizio, fine]
+                'inizio_fase': None,
+                'errore': None,
+                'risultato': None,
+            }
+        self._coda.put((job_id, operazione, workers, chunk_size))
+        logger.info(f"Job import {job_id} accodato ({operazione})")
+        return job_id
+
+    def stato(self, job_id: int) -> Optional[Dict]:
+        """Istantanea dell'avanzamento con file/s, ETA (secondi) e durate per stage"""
+        with self._lock:
+            stato = self._stati.get(job_id)
+            if stato is None:
+                return None
+            stato = dict(stato, fasi={fase: list(t) for fase, t in stato['fasi'].items()})
+
+        adesso = time.perf_counter()
+        stato['durate'] = {fase: (fine or adesso) - inizio for fase, (inizio, fine) in stato['fasi'].items()}
+        trascorso = adesso - stato['inizio_fase'] if stato['inizio_fase'] else 0.0
+        stato['file_s'] = stato['completati'] / trascorso if trascorso and stato['completati'] else 0.0
+        rimanenti = stato['totale'] - stato['completati']
+        stato['eta'] = rimanenti / stato['file_s'] if stato['file_s'] else None
+        stato['attivo'] = stato['fase'] not in ('completato', 'errore')
+        return stato
+
+    def attivi(self) -> List[Dict]:
+        """Job in coda o in esecuzione"""
+        with self._lock:
+            job_ids = list(self._stati)
+        return [s for s in (self.stato(job_id) for job_id in job_ids) if s and s['attivo']]
+
+    def in_esecuzione(self, job_id: int) -> bool:
+        stato = self.stato(job_id)
+        return bool(stato and stato['attivo'])
+
+    def dimentica(self, job_id: int):
+        """Rimuove lo stato in memoria di un job concluso (già mostrato all'utente)"""
+        with self._lock:
+            stato = self._stati.get(job_id)
+            if stato and stato['fase'] in ('completato', 'errore'):
+                del self._stati[job_id]
+
+    # ========== THREAD ==========
+
+    def _aggiorna(self, job_id: int, **campi):
+        with self._lock:
+            self._stati[job_id].update(campi)
+
+    def _fase(self, job_id: int, fase: str):
+        adesso = time.perf_counter()
+        with self._lock:
+            stato = self._stati[job_id]
+            precedente = stato['fase']
+            if precedente in stato['fasi']:
+                stato['fasi'][precedente][1] = adesso
+            if fase not in ('completato', 'errore'):
+                stato['fasi'][fase] = [adesso, None]
+            stato.update(fase=fase, completati=0, totale=0, file_corrente=None, inizio_fase=adesso)
+
+    def _progress(self, job_id: int):
+        def progress(completati, totale, file_name=None):
+            self._aggiorna(job_id, completati=completati, totale=totale, file_corrente=file_name)
+        return progress
+
+    def _run(self):
+        while True:
+            job_id, operazione, workers, chunk_size = self._coda.get()
+            try:
+                if operazione == 'anteprima':
+                    risultato = self._anteprima(job_id, workers)
+                else:
+                    risultato = esegui_job(self.db, job_id, workers=workers, chunk_size=chunk_size,
+                                           progress_parsing=self._progress(job_id),
+                                           progress_scrittura=self._progress(job_id),
+                                           fase=lambda fase: self._fase(job_id, fase))
+                self._aggiorna(job_id, risultato=risultato)
+                self._fase(job_id, 'completato')
+            except Exception as e:
+                logger.error(f"Job import {job_id} ({operazione}) fallito: {e}")
+                self._aggiorna(job_id, errore=str(e))
+                self._fase(job_id, 'errore')
+            finally:
+                self._coda.task_done()
+
+    def _anteprima(self, job_id: int, workers: int) -> Dict:
+        """Parsing con checkpoint e piano delle azioni, senza scritture"""
+        try:
+            self._fase(job_id, 'parsing')
+            risultati = analizza_job(self.db, job_id, workers=workers, progress=self._progress(job_id))
+            self._fase(job_id, 'abbinamento')
+            job = self.db.get_import_job(job_id)
+            azioni = ImportSession(self.db, job['anno']).anteprima(risultati)
+        except Exception as e:
+            # Un'anteprima fallita non va ripresa come import
+            self.db.aggiorna_import_job(job_id, stato='annullato', messaggio=str(e)[:500])
+            raise
+        return {'risultati': risultati, 'azioni': azioni}
+
+
+_worker: Optional[WorkerImport] = None
+_worker_lock = threading.Lock()
+
+
+def get_worker(db_path: str) -> WorkerImport:
+    """
+    Worker unico del processo (condiviso da tutte le sessioni Streamlit),
+    con una propria istanza del database: non dipende dalla sessione che
+    ha avviato il job.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = WorkerImport(GestionaleCacciaDB(db_path))
+        return _worker
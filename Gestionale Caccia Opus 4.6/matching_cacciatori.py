@@ -0,0 +1,265 @@
+"""
+Indice di abbinamento cacciatori per l'import
+Costruito una sola volta per sessione di import: per ogni cacciatore attivo
+registra chiavi normalizzate (senza accenti/apostrofi), chiavi fonetiche del
+cognome e trigrammi di carattere. La ricerca dei candidati è quindi una
+manciata di lookup su dizionari; un punteggio di somiglianza con soglia
+decide fra 'match', 'ambiguo' e 'nuovo'.
+
+Gli ambigui (più candidati con punteggio vicino) sono restituiti come tali,
+mai risolti scegliendo il primo trovato.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from constants import Config
+
+RE_NON_LETTERE = re.compile(r"[^A-Z ]+")
+RE_SPAZI = re.compile(r"\s+")
+RE_PAROLA_PUNTATA = re.compile(r"([^\s.]+)\.")
+VOCALI = frozenset('AEIOU')
+
+# Sostituzioni fonetiche per cognomi italiani (applicate in ordine)
+SOSTITUZIONI_FONETICHE = [
+    (re.compile(r"([A-Z])\1+"), r"\1"),     # Doppie: ROSSI = ROSI
+    (re.compile(r"CH"), "K"),
+    (re.compile(r"GH"), "G"),
+    (re.compile(r"H"), ""),                  # H muta
+    (re.compile(r"[JY]"), "I"),
+    (re.compile(r"W"), "V"),
+    (re.compile(r"X"), "KS"),
+    (re.compile(r"Q"), "K"),
+    (re.compile(r"C(?![EI])"), "K"),         # C dura
+    (re.compile(r"SC(?=[EI])"), "S"),
+    (re.compile(r"GN"), "N"),
+    (re.compile(r"GL(?=I)"), "L"),
+    (re.compile(r"Z"), "S"),
+    (re.compile(r"([A-Z])\1+"), r"\1"),     # Doppie create dalle sostituzioni
+]
+
+
+def normalizza(testo: Optional[str]) -> str:
+    """'D'Angelò  Maria' -> 'DANGELO MARIA' (maiuscolo, senza accenti né apostrofi)"""
+    if not testo:
+        return ''
+    testo = unicodedata.normalize('NFKD', str(testo))
+    testo = ''.join(ch for ch in testo if not unicodedata.combining(ch)).upper()
+    testo = testo.replace("'", '').replace('’', '').replace('`', '')
+    testo = RE_NON_LETTERE.sub(' ', testo)
+    return RE_SPAZI.sub(' ', testo).strip()
+
+
+def chiave_cognome(testo: Optional[str]) -> str:
+    """Cognome normalizzato senza spazi: 'De Luca' = 'DELUCA', 'D'Angelo' = 'DANGELO'"""
+    return normalizza(testo).replace(' ', '')
+
+
+def chiave_fonetica(cognome: str) -> str:
+    """Chiave fonetica di un cognome già passato da chiave_cognome"""
+    chiave = cognome
+    for pattern, sostituto in SOSTITUZIONI_FONETICHE:
+        chiave = pattern.sub(sostituto, chiave)
+    return chiave
+
+
+def trigrammi(testo_normalizzato: str) -> Set[str]:
+    """Trigrammi di carattere con bordi (' ROSSI ' -> ' RO', 'ROS', ...)"""
+    testo = f" {testo_normalizzato} "
+    return {testo[i:i + 3] for i in range(len(testo) - 2)}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def parole_puntate(testo: Optional[str]) -> frozenset:
+    """Parole scritte col punto finale ('G.', 'Giov.'), normalizzate: il punto si perde in normalizza"""
+    if not testo:
+        return frozenset()
+    return frozenset(normalizza(parola) for parola in RE_PAROLA_PUNTATA.findall(str(testo)))
+
+
+def troncamento(breve: str, lungo: str, puntate: frozenset = frozenset()) -> bool:
+    """
+    La parola breve è la parola lunga o un suo troncamento evidente: iniziale
+    ('G'), parola scritta col punto ('GIOV.') o prefisso che finisce per
+    consonante e lascia fuori almeno due lettere ('GIUS', 'FRANC').
+    Un nome completo che è l'inizio di un altro nome non lo è: CARLO/CARLOTTA,
+    MARIA/MARIANO, DANIEL/DANIELA sono persone diverse.
+    """
+    if breve == lungo:
+        return True
+    if not lungo.startswith(breve):
+        return False
+    return (len(breve) == 1 or breve in puntate
+            or (breve[-1] not in VOCALI and len(lungo) - len(breve) >= 2))
+
+
+def nome_abbreviato(breve: str, lungo: str, puntate: frozenset = frozenset()) -> bool:
+    """
+    'G.' / 'GIUS' / 'MARIA' abbreviazione di 'GIUSEPPE' / 'MARIA GRAZIA'?
+    Ogni parola del nome breve deve essere un troncamento (vedi troncamento)
+    della parola corrispondente; puntate sono le parole del nome breve scritte
+    col punto. Niente sottostringhe interne: 'ANNA' non è abbreviazione di 'GIOVANNA'.
+    """
+    parole_breve = breve.split()
+    parole_lungo = lungo.split()
+    if not parole_breve or len(parole_breve) > len(parole_lungo):
+        return False
+    return all(troncamento(b, l, puntate) for b, l in zip(parole_breve, parole_lungo))
+
+
+class IndiceCacciatori:
+    """Indice di blocking per l'abbinamento cognome/nome dei cacciatori"""
+
+    # Pesi del punteggio e punteggi per abbreviazioni/omofonie
+    PESO_COGNOME = 0.6
+    PESO_NOME = 0.4
+    PUNTEGGIO_ABBREVIAZIONE = 0.9
+    PUNTEGGIO_FONETICO = 0.85
+    # Trigrammi: candidati solo se la somiglianza del cognome è almeno questa
+    SOGLIA_TRIGRAMMI = 0.5
+    # Distanza dalla soglia di un nome diverso con cognome identico
+    MARGINE_NOME_DIVERSO = 0.1
+
+    def __init__(self, soglia: float = Config.MATCH_SOGLIA,
+                 margine_ambiguo: float = Config.MATCH_MARGINE_AMBIGUO):
+        self.soglia = soglia
+        self.margine_ambiguo = margine_ambiguo
+        # Tetto del punteggio nome quando i nomi non coincidono né sono abbreviazioni:
+        # anche con cognome identico il totale resta sotto soglia
+        self.tetto_nome_diverso = max(0.0, (soglia - self.PESO_COGNOME) / self.PESO_NOME
+                                      - self.MARGINE_NOME_DIVERSO)
+
+        self._voci: Dict[int, Dict] = {}                 # id(cacciatore) -> chiavi e cacciatore
+        self._per_cognome: Dict[str, List[Dict]] = {}
+        self._per_fonetica: Dict[str, List[Dict]] = {}
+        self._per_trigramma: Dict[str, List[Dict]] = {}
+
+    def __len__(self):
+        return len(self._voci)
+
+    def aggiungi(self, cacciatore: Dict):
+        cognome = chiave_cognome(cacciatore.get('cognome'))
+        nome = normalizza(cacciatore.get('nome'))
+        voce = {
+            'cognome': cognome,
+            'nome': nome,
+            'fonetica': chiave_fonetica(cognome),
+            'trigrammi': trigrammi(cognome),
+            'trigrammi_nome': trigrammi(nome),
+            'puntate_nome': parole_puntate(cacciatore.get('nome')),
+            'cacciatore': cacciatore,
+        }
+        self._voci[id(cacciatore)] = voce
+
+        self._per_cognome.setdefault(cognome, []).append(cacciatore)
+        self._per_fonetica.setdefault(voce['fonetica'], []).append(cacciatore)
+        for trigramma in voce['trigrammi']:
+            self._per_trigramma.setdefault(trigramma, []).append(cacciatore)
+
+    def rimuovi(self, cacciatore: Dict):
+        voce = self._voci.pop(id(cacciatore), None)
+        if voce is None:
+            return
+        self._per_cognome[voce['cognome']].remove(cacciatore)
+        self._per_fonetica[voce['fonetica']].remove(cacciatore)
+        for trigramma in voce['trigrammi']:
+            self._per_trigramma[trigramma].remove(cacciatore)
+
+    def _candidati(self, cognome: str, fonetica: str, tri_cognome: Set[str]) -> List[Dict]:
+        """Unione dei blocchi: cognome normalizzato, chiave fonetica, trigrammi"""
+        candidati = {id(c): c for c in self._per_cognome.get(cognome, [])}
+        for c in self._per_fonetica.get(fonetica, []):
+            candidati.setdefault(id(c), c)
+
+        condivisi = Counter()
+        for trigramma in tri_cognome:
+            for c in self._per_trigramma.get(trigramma, ()):
+                condivisi[id(c)] += 1
+        for chiave, comuni in condivisi.items():
+            if chiave in candidati:
+                continue
+            voce = self._voci[chiave]
+            if 2 * comuni / (len(tri_cognome) + len(voce['trigrammi'])) >= self.SOGLIA_TRIGRAMMI:
+                candidati[chiave] = voce['cacciatore']
+        return list(candidati.values())
+
+    def punteggio(self, cognome: str, nome: str, fonetica: str, tri_cognome: Set[str],
+                  tri_nome: Set[str], voce: Dict, puntate: frozenset = frozenset()) -> float:
+        """
+        Somiglianza 0..1 fra (cognome, nome) normalizzati e una voce dell'indice
+        (puntate: parole del nome scritte col punto, vedi parole_puntate)
+        """
+        if cognome == voce['cognome']:
+            s_cognome = 1.0
+        else:
+            s_cognome = _dice(tri_cognome, voce['trigrammi'])
+            if fonetica == voce['fonetica']:
+                s_cognome = max(s_cognome, self.PUNTEGGIO_FONETICO)
+
+        if nome == voce['nome']:
+            s_nome = 1.0
+        elif (nome_abbreviato(nome, voce['nome'], puntate)
+              or nome_abbreviato(voce['nome'], nome, voce['puntate_nome'])):
+            s_nome = max(_dice(tri_nome, voce['trigrammi_nome']), self.PUNTEGGIO_ABBREVIAZIONE)
+        else:
+            # Nomi simili ma diversi (GIOVANNI/GIOVANNA, GIUSEPPE/GIUSEPPINA) sono
+            # persone diverse: i trigrammi in comune non bastano per l'abbinamento
+            s_nome = min(_dice(tri_nome, voce['trigrammi_nome']), self.tetto_nome_diverso)
+
+        return self.PESO_COGNOME * s_cognome + self.PESO_NOME * s_nome
+
+    def cerca(self, cognome: str, nome: str, data_nascita=None) -> Dict:
+        """
+        Abbina cognome/nome ai cacciatori indicizzati.
+
+        Returns:
+            Dict con:
+            - 'esito': 'match', 'ambiguo' o 'nuovo'
+            - 'cacciatore': il cacciatore abbinato (solo per 'match')
+            - 'punteggio': punteggio del migliore candidato
+            - 'candidati': lista (punteggio, cacciatore) sopra soglia, in ordine decrescente
+        """
+        cognome_n = chiave_cognome(cognome)
+        nome_n = normalizza(nome)
+        if not cognome_n or not nome_n:
+            return {'esito': 'nuovo', 'cacciatore': None, 'punteggio': 0.0, 'candidati': []}
+
+        fonetica = chiave_fonetica(cognome_n)
+        tri_cognome = trigrammi(cognome_n)
+        tri_nome = trigrammi(nome_n)
+        puntate = parole_puntate(nome)
+
+        punteggi = []
+        for c in self._candidati(cognome_n, fonetica, tri_cognome):
+            # Data di nascita diversa: sicuramente un'altra persona
+            if data_nascita and c.get('data_nascita') and str(c['data_nascita']) != str(data_nascita):
+                continue
+            p = self.punteggio(cognome_n, nome_n, fonetica, tri_cognome, tri_nome, self._voci[id(c)],
+                               puntate)
+            if p >= self.soglia:
+                punteggi.append((p, c))
+        punteggi.sort(key=lambda coppia: coppia[0], reverse=True)
+
+        if not punteggi:
+            return {'esito': 'nuovo', 'cacciatore': None, 'punteggio': 0.0, 'candidati': []}
+
+        migliore, cacciatore = punteggi[0]
+        vicini = [coppia for coppia in punteggi if migliore - coppia[0] <= self.margine_ambiguo]
+
+        if len(vicini) > 1 and data_nascita:
+            # Omonimi: decide la data di nascita, se uno solo la riporta uguale
+            stessa_data = [coppia for coppia in vicini if str(coppia[1].get('data_nascita')) == str(data_nascita)]
+            if len(stessa_data) == 1:
+                vicini = stessa_data
+                migliore, cacciatore = stessa_data[0]
+
+        if len(vicini) > 1:
+            return {'esito': 'ambiguo', 'cacciatore': None, 'punteggio': migliore, 'candidati': vicini}
+        return {'esito': 'match', 'cacciatore': cacciatore, 'punteggio': migliore, 'candidati': punteggi}
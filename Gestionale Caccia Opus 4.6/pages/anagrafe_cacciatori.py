@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import datetime as dt
 
+from constants import Config
+
 def show():
     """Mostra la pagina anagrafe cacciatori"""
     st.markdown('<div class="main-header">👥 Anagrafe Cacciatori</div>', unsafe_allow_html=True)
@@ -32,8 +34,15 @@ def show_elenco_cacciatori():
         if st.button("🔄 Aggiorna", use_container_width=True):
             st.rerun()
     
-    # Recupera cacciatori
-    cacciatori = st.session_state.db.get_tutti_cacciatori(solo_attivi=not mostra_disattivati)
+    # Recupera una pagina di cacciatori: pila dei cursori delle pagine visitate
+    # (paginazione keyset), ricomincia dalla prima se cambia il filtro
+    cursori = st.session_state.setdefault(f"pagine_cacciatori_{mostra_disattivati}", [None])
+    pagina = st.session_state.db.get_cacciatori_pagina(solo_attivi=not mostra_disattivati, cursore=cursori[-1])
+    if not pagina['righe'] and len(cursori) > 1:
+        # Pagina svuotata (es. cacciatori disattivati): torna alla prima
+        cursori[:] = [None]
+        pagina = st.session_state.db.get_cacciatori_pagina(solo_attivi=not mostra_disattivati)
+    cacciatori = pagina['righe']
     
     if cacciatori:
         # Crea DataFrame per visualizzazione
@@ -53,7 +62,22 @@ def show_elenco_cacciatori():
             height=400
         )
         
-        st.metric("Totale cacciatori", len(cacciatori))
+        # Navigazione tra le pagine
+        col_prec, col_pagina, col_succ = st.columns([1, 2, 1])
+        with col_prec:
+            if st.button("◀ Precedenti", disabled=len(cursori) == 1, use_container_width=True,
+                         key="cacciatori_prec"):
+                cursori.pop()
+                st.rerun()
+        with col_pagina:
+            st.caption(f"Pagina {len(cursori)} ({Config.CACCIATORI_PER_PAGINA} cacciatori per pagina)")
+        with col_succ:
+            if st.button("Successivi ▶", disabled=pagina['cursore'] is None, use_container_width=True,
+                         key="cacciatori_succ"):
+                cursori.append(pagina['cursore'])
+                st.rerun()
+        
+        st.metric("Totale cacciatori", st.session_state.db.conta_cacciatori(solo_attivi=not mostra_disattivati))
         
         # Azioni sui cacciatori
         st.markdown("---")
@@ -356,7 +380,10 @@ def show_ricerca_cacciatori():
         risultati = st.session_state.db.cerca_cacciatori(termine_ricerca)
         
         if risultati:
-            st.success(f"✅ Trovati {len(risultati)} risultati")
+            if len(risultati) >= Config.RICERCA_MAX_RISULTATI:
+                st.success(f"✅ Primi {len(risultati)} risultati per pertinenza: affinare la ricerca per vederne altri")
+            else:
+                st.success(f"✅ Trovati {len(risultati)} risultati")
             
             # Mostra risultati
             for cacciatore in risultati:
@@ -1,9 +1,10 @@
-```python
 import streamlit as st
 import pandas as pd
 import datetime as dt
 import os
 
+from constants import Config
+
 def show():
     """Mostra la pagina documenti"""
     st.markdown('<div class="main-header">📁 Documenti e Modulistica</div>', unsafe_allow_html=True)
@@ -307,34 +308,21 @@ def show_archivio_documenti():
         anni_disponibili = ['Tutti'] + list(range(anno_corrente - 5, anno_corrente + 1))
         filtro_anno = st.selectbox("Anno", options=anni_disponibili)
     
-    # Query documenti
-    conn = st.session_state.db.get_connection()
-    cursor = conn.cursor()
-    
-    query = """
-        SELECT d.*, c.cognome, c.nome
-        FROM documenti d
-        LEFT JOIN cacciatori c ON d.cacciatore_id = c.id
-        WHERE 1=1
-    """
-    params = []
-    
-    if filtro_tipo != 'Tutti':
-        query += " AND d.tipo_documento = ?"
-        params.append(filtro_tipo)
-    
-    if filtro_anno != 'Tutti':
-        query += " AND d.anno = ?"
-        params.append(filtro_anno)
-    
-    query += " ORDER BY d.data_inserimento DESC"
-    
-    cursor.execute(query, params)
-    documenti = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    # Una pagina di documenti: pila dei cursori delle pagine visitate
+    # (paginazione keyset), ricomincia dalla prima se cambiano i filtri
+    cursori = st.session_state.setdefault(f"pagine_documenti_{filtro_tipo}_{filtro_anno}", [None])
+    filtri = dict(tipo_documento=filtro_tipo if filtro_tipo != 'Tutti' else None,
+                  anno=filtro_anno if filtro_anno != 'Tutti' else None)
+    pagina = st.session_state.db.get_documenti_pagina(**filtri, cursore=cursori[-1])
+    if not pagina['righe'] and len(cursori) > 1:
+        # Pagina svuotata nel frattempo: torna alla prima
+        cursori[:] = [None]
+        pagina = st.session_state.db.get_documenti_pagina(**filtri)
+    documenti = pagina['righe']
     
     if documenti:
-        st.success(f"📁 Trovati {len(documenti)} documenti")
+        primo = (len(cursori) - 1) * Config.DOCUMENTI_PER_PAGINA + 1
+        st.success(f"📁 Documenti {primo}-{primo + len(documenti) - 1} (pagina {len(cursori)})")
         
         # Mostra documenti
         for doc in documenti:
@@ -389,6 +377,19 @@ def show_archivio_documenti():
                 with col_b:
                     if st.button(f"🗑️ Elimina", key=f"delete_doc_{doc['id']}"):
                         st.warning("Funzione di eliminazione in sviluppo")
+        
+        # Navigazione tra le pagine
+        col_prec, col_succ = st.columns(2)
+        with col_prec:
+            if st.button("◀ Precedenti", disabled=len(cursori) == 1, use_container_width=True,
+                         key="documenti_prec"):
+                cursori.pop()
+                st.rerun()
+        with col_succ:
+            if st.button("Successivi ▶", disabled=pagina['cursore'] is None, use_container_width=True,
+                         key="documenti_succ"):
+                cursori.append(pagina['cursore'])
+                st.rerun()
     
     else:
         st.warning("Nessun documento presente nell'archivio")
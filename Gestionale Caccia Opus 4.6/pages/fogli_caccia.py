@@ -3,6 +3,11 @@ import pandas as pd
 import datetime as dt
 import os
 import sys
+import math
+
+from constants import Config
+from griglia_fogli import griglia_fogli, firma_finestra, modifiche_griglia
+from import_parse import PREFISSO_UPLOAD
 
 def fmt_date_it(value) -> str:
     """
@@ -58,11 +63,19 @@ def show():
 
 def _reset_filtri():
     """Callback per resettare tutti i filtri (eseguito prima del re-render)"""
-    keys_to_reset = ['ricerca_fogli', 'filtro_solo_con_file', 'filtro_data_da', 'filtro_data_a']
+    keys_to_reset = ['ricerca_fogli', 'filtro_solo_con_file', 'filtro_data_da', 'filtro_data_a', 'pagina_fogli']
     for key in keys_to_reset:
         if key in st.session_state:
             del st.session_state[key]
 
+def _pagina_fogli(filtri: dict) -> int:
+    """Pagina corrente dell'elenco fogli: torna alla prima quando cambiano i filtri"""
+    firma = repr(sorted(filtri.items()))
+    if st.session_state.get('filtri_fogli') != firma:
+        st.session_state.filtri_fogli = firma
+        st.session_state.pagina_fogli = 1
+    return st.session_state.get('pagina_fogli', 1)
+
 def show_gestione_fogli():
     """Gestione completa dei fogli caccia"""
     st.subheader("Gestione Fogli Caccia A3")
@@ -153,16 +166,28 @@ def show_gestione_fogli():
             st.button("🔄 Reset", help="Resetta tutti i filtri", use_container_width=True,
                        on_click=_reset_filtri)
     
-    # Recupera fogli
+    # Recupera solo la pagina visibile: filtri, ricerca e ordinamento in SQL
     stato_filtro = stati_map.get(filtro_stato_display)
-    fogli = st.session_state.db.get_fogli_anno(anno_selezionato, stato_filtro)
+    filtri = dict(anno=anno_selezionato, stato=stato_filtro, testo=ricerca, con_file=solo_con_file,
+                  data_da=data_da, data_a=data_a)
+    pagina = _pagina_fogli(filtri)
+    risultato = st.session_state.db.query_fogli(**filtri, limit=Config.FOGLI_PER_PAGINA,
+                                                offset=(pagina - 1) * Config.FOGLI_PER_PAGINA)
+    totale_filtrati = risultato['totale']
+    pagine = max(1, math.ceil(totale_filtrati / Config.FOGLI_PER_PAGINA))
+    if pagina > pagine:
+        # Meno fogli di prima (es. dopo una cancellazione): ultima pagina disponibile
+        pagina = st.session_state.pagina_fogli = pagine
+        risultato = st.session_state.db.query_fogli(**filtri, limit=Config.FOGLI_PER_PAGINA,
+                                                    offset=(pagina - 1) * Config.FOGLI_PER_PAGINA)
+    fogli = risultato['fogli']
     
     # Statistiche
     stats = st.session_state.db.get_statistiche_fogli(anno_selezionato)
     
     if stats and stats.get('totale', 0) > 0:
-        # Calcola consegnati (checkbox) da campo consegnato
-        consegnati_checkbox = sum(1 for f in fogli if f.get('consegnato', 0) == 1)
+        # Consegnati (checkbox) da campo consegnato
+        consegnati_checkbox = stats.get('consegnati_flag') or 0
         
         col1, col2, col3, col4, col5 = st.columns(5)
         
@@ -219,117 +244,42 @@ def show_gestione_fogli():
     st.markdown("---")
 
     # Elenco fogli
+    filtri_attivi = []
+    if solo_con_file:
+        filtri_attivi.append("con file")
+    if data_da:
+        filtri_attivi.append(f"da {data_da.strftime('%d/%m/%Y')}")
+    if data_a:
+        filtri_attivi.append(f"a {data_a.strftime('%d/%m/%Y')}")
+    
+    if not fogli and (ricerca or filtri_attivi):
+        if ricerca:
+            st.warning(f"⚠️ Nessun foglio trovato per la ricerca: '{ricerca}'")
+        else:
+            st.warning("⚠️ Nessun foglio trovato con i filtri selezionati")
+        return
+    
     if fogli:
         df_fogli = pd.DataFrame(fogli)
         
-        # Applica filtro ricerca
         if ricerca:
-            ricerca_lower = ricerca.lower().strip()
-            
-            # Crea maschera di filtro
-            mask = pd.Series([False] * len(df_fogli))
-            
-            # Cerca in numero_foglio
-            if 'numero_foglio' in df_fogli.columns:
-                mask |= df_fogli['numero_foglio'].astype(str).str.lower().str.contains(ricerca_lower, na=False)
-            
-            # Cerca in cognome
-            if 'cognome' in df_fogli.columns:
-                mask |= df_fogli['cognome'].astype(str).str.lower().str.contains(ricerca_lower, na=False)
-            
-            # Cerca in nome
-            if 'nome' in df_fogli.columns:
-                mask |= df_fogli['nome'].astype(str).str.lower().str.contains(ricerca_lower, na=False)
-            
-            # Cerca in rilasciato_a
-            if 'rilasciato_a' in df_fogli.columns:
-                mask |= df_fogli['rilasciato_a'].astype(str).str.lower().str.contains(ricerca_lower, na=False)
-            
-            # Applica filtro
-            df_fogli = df_fogli[mask]
-            
-            if len(df_fogli) == 0:
-                st.warning(f"⚠️ Nessun foglio trovato per la ricerca: '{ricerca}'")
-                return
-            else:
-                st.success(f"📄 Trovati {len(df_fogli)} fogli per '{ricerca}' nell'anno {anno_selezionato}")
+            st.success(f"📄 Trovati {totale_filtrati} fogli per '{ricerca}' nell'anno {anno_selezionato}")
         else:
-            st.success(f"📄 Trovati {len(df_fogli)} fogli per l'anno {anno_selezionato}")
-        
-        # Applica filtri avanzati
-        fogli_totali = len(df_fogli)
-        
-        # Filtro: solo con file
-        if solo_con_file and 'file_path' in df_fogli.columns:
-            df_fogli = df_fogli[df_fogli['file_path'].notna() & (df_fogli['file_path'] != '')]
-            if len(df_fogli) == 0:
-                st.warning("⚠️ Nessun foglio con file Excel trovato")
-                return
-        
-        # Filtro: data rilascio da
-        if data_da and 'data_rilascio' in df_fogli.columns:
-            df_fogli = df_fogli[pd.to_datetime(df_fogli['data_rilascio'], errors='coerce') >= pd.to_datetime(data_da)]
-        
-        # Filtro: data rilascio a
-        if data_a and 'data_rilascio' in df_fogli.columns:
-            df_fogli = df_fogli[pd.to_datetime(df_fogli['data_rilascio'], errors='coerce') <= pd.to_datetime(data_a)]
+            st.success(f"📄 Trovati {totale_filtrati} fogli per l'anno {anno_selezionato}")
         
         # Messaggio filtri applicati
-        if solo_con_file or data_da or data_a:
-            filtri_attivi = []
-            if solo_con_file:
-                filtri_attivi.append("con file")
-            if data_da:
-                filtri_attivi.append(f"da {data_da.strftime('%d/%m/%Y')}")
-            if data_a:
-                filtri_attivi.append(f"a {data_a.strftime('%d/%m/%Y')}")
-            
-            st.info(f"🔧 Filtri applicati: {', '.join(filtri_attivi)} → {len(df_fogli)}/{fogli_totali} fogli")
-        
-        if len(df_fogli) == 0:
-            st.warning("⚠️ Nessun foglio trovato con i filtri selezionati")
-            return
-        
-        # ========== ORDINAMENTO ALFABETICO A→Z ==========
-        # Usa cognome e nome dal database
-        if 'cognome' in df_fogli.columns and 'nome' in df_fogli.columns:
-            # Riempi valori mancanti con stringa vuota per evitare errori
-            df_fogli['cognome'] = df_fogli['cognome'].fillna('')
-            df_fogli['nome'] = df_fogli['nome'].fillna('')
-            
-            # Ordina per cognome (primario) e nome (secondario) A→Z
-            df_fogli = df_fogli.sort_values(
-                by=['cognome', 'nome'], 
-                ascending=[True, True], 
-                kind='mergesort'  # Stabile
-            ).reset_index(drop=True)
-        elif 'rilasciato_a' in df_fogli.columns:
-            # Fallback: se cognome/nome non ci sono, usa rilasciato_a
-            # Parse: "Cognome Nome" split sull'ultimo spazio
-            def parse_rilasciato_a(val):
-                if pd.isna(val) or not val:
-                    return ('', '')
-                parts = str(val).strip().split()
-                if len(parts) >= 2:
-                    # Ultimo = nome, tutto il resto = cognome
-                    return (' '.join(parts[:-1]), parts[-1])
-                elif len(parts) == 1:
-                    return (parts[0], '')
-                else:
-                    return ('', '')
-            
-            df_fogli['_cognome_sort'] = df_fogli['rilasciato_a'].apply(lambda x: parse_rilasciato_a(x)[0])
-            df_fogli['_nome_sort'] = df_fogli['rilasciato_a'].apply(lambda x: parse_rilasciato_a(x)[1])
-            
-            df_fogli = df_fogli.sort_values(
-                by=['_cognome_sort', '_nome_sort'], 
-                ascending=[True, True], 
-                kind='mergesort'
-            ).reset_index(drop=True)
-            
-            # Rimuovi colonne temporanee
-            df_fogli = df_fogli.drop(columns=['_cognome_sort', '_nome_sort'])
-        
+        if filtri_attivi:
+            st.info(f"🔧 Filtri applicati: {', '.join(filtri_attivi)} → {totale_filtrati} fogli")
+        
+        # Paginazione (ordinamento alfabetico A→Z per cognome e nome, eseguito in SQL)
+        if pagine > 1:
+            st.number_input(
+                f"Pagina (di {pagine}, {Config.FOGLI_PER_PAGINA} fogli per pagina)",
+                min_value=1,
+                max_value=pagine,
+                step=1,
+                key="pagina_fogli"
+            )
         
         # Prepara colonne per visualizzazione
         cols_base = ['numero_foglio', 'stato']
@@ -402,51 +352,10 @@ def show_gestione_fogli():
         # Visualizza tabella stile Excel con editing interattivo
         st.markdown("### 📋 Elenco Fogli")
         
-        # Prepara DataFrame per editing
-        df_edit = df_fogli.copy()
-        
-        # Crea DataFrame con colonne editabili
-        edit_data = []
-        id_map = {}  # Mappa indice -> id foglio
-        cacciatore_map = {}  # Mappa indice -> cacciatore_id
-        
-        for idx, row in df_edit.iterrows():
-            # Formatta date per visualizzazione
-            data_restituzione_fmt = fmt_date_it(row.get('data_restituzione', '')) or ''
-
-            # Costruisci Cognome Nome
-            cognome = str(row.get('cognome', '') or '')
-            nome = str(row.get('nome', '') or '')
-            cognome_nome = f"{cognome} {nome}".strip()
-            if not cognome_nome:
-                cognome_nome = str(row.get('rilasciato_a', '') or '')
-
-            # Contatto telefonico: preferisci cellulare, poi telefono
-            cellulare = str(row.get('cellulare', '') or '')
-            telefono = str(row.get('telefono', '') or '')
-            contatto_tel = cellulare if cellulare else telefono
-
-            edit_data.append({
-                'Cognome Nome': cognome_nome,
-                'N. Foglio': str(row.get('numero_foglio', 'N/A')),
-                'Restituito in data': data_restituzione_fmt,
-                'Stampato': bool(row.get('stampato', 0)),
-                'Consegnato': fmt_date_it(row.get('data_consegna', '')) or '',
-                'Contatto telefonico': contatto_tel
-            })
-
-            # Salva mapping indice -> id
-            id_map[len(edit_data) - 1] = row.get('id')
-            cacciatore_map[len(edit_data) - 1] = row.get('cacciatore_id')
-        
-        df_display = pd.DataFrame(edit_data)
-
-        # Salva valori originali PRIMA di data_editor
-        # (data_editor potrebbe modificare df_display in-place in alcune versioni di Streamlit)
-        original_stampato = df_display['Stampato'].tolist()
-        original_consegnato = df_display['Consegnato'].tolist()
-        original_restituzione = df_display['Restituito in data'].tolist()
-        original_contatto = df_display['Contatto telefonico'].tolist()
+        # Griglia della sola finestra visibile, indicizzata per id foglio
+        df_display = griglia_fogli(df_fogli)
+        cacciatore_map = df_fogli.set_index('id')['cacciatore_id'].to_dict()  # id foglio -> cacciatore_id
+        editor_key = f"fogli_data_editor_{firma_finestra(df_display)}"
 
         # Usa data_editor per editing interattivo
         edited_df = st.data_editor(
@@ -486,100 +395,92 @@ def show_gestione_fogli():
                     help="Numero di telefono del cacciatore"
                 )
             },
-            key="fogli_data_editor"
+            key=editor_key
         )
         
         # Rileva modifiche tramite session state e salva automaticamente
-        if "fogli_data_editor" in st.session_state:
-            editor_changes = st.session_state["fogli_data_editor"]
-            edited_rows = editor_changes.get("edited_rows", {})
+        if editor_key in st.session_state:
+            editor_changes = st.session_state[editor_key]
+            # Posizioni del data_editor ricondotte all'id del foglio della finestra mostrata
+            modifiche = modifiche_griglia(df_display, editor_changes.get("edited_rows", {}))
 
-            if edited_rows:
-                changes_saved = False
+            if modifiche:
+                salvati = []  # Messaggi mostrati solo dopo il commit della transazione
 
-                for row_idx_str, row_changes in edited_rows.items():
-                    row_idx = int(row_idx_str)
-                    foglio_id = id_map.get(row_idx)
-                    if foglio_id is None:
-                        continue
-
-                    numero_foglio = df_display.iloc[row_idx]['N. Foglio']
+                try:
+                    # Unica transazione per tutte le celle modificate: un solo commit,
+                    # ogni set_* fallito annulla solo il proprio savepoint
+                    with st.session_state.db.transaction():
+                        for foglio_id, row_changes in modifiche.items():
+                            numero_foglio = df_display.at[foglio_id, 'N. Foglio']
 
-                    if "Stampato" in row_changes:
-                        old_val = original_stampato[row_idx]
-                        new_val = bool(row_changes["Stampato"])
-                        if old_val != new_val:
-                            try:
-                                st.session_state.db.set_stampato(foglio_id, new_val)
-                                st.toast(f"Stampato aggiornato per {numero_foglio}", icon="✅")
-                                changes_saved = True
-                            except Exception as e:
-                                st.error(f"Errore salvataggio Stampato: {e}")
+                            if "Stampato" in row_changes:
+                                try:
+                                    st.session_state.db.set_stampato(foglio_id, row_changes["Stampato"])
+                                    salvati.append(f"Stampato aggiornato per {numero_foglio}")
+                                except Exception as e:
+                                    st.error(f"Errore salvataggio Stampato: {e}")
 
-                    if "Consegnato" in row_changes:
-                        old_val = original_consegnato[row_idx]
-                        new_val = str(row_changes["Consegnato"]).strip()
-                        if old_val != new_val:
-                            try:
-                                # Converti da formato italiano gg/mm/aaaa a ISO yyyy-mm-dd
-                                data_iso = None
-                                if new_val:
-                                    try:
-                                        data_iso = dt.datetime.strptime(new_val, '%d/%m/%Y').strftime('%Y-%m-%d')
-                                    except ValueError:
-                                        # Prova anche formato ISO diretto
+                            if "Consegnato" in row_changes:
+                                new_val = row_changes["Consegnato"]
+                                try:
+                                    # Converti da formato italiano gg/mm/aaaa a ISO yyyy-mm-dd
+                                    data_iso = None
+                                    if new_val:
                                         try:
-                                            dt.datetime.strptime(new_val, '%Y-%m-%d')
-                                            data_iso = new_val
+                                            data_iso = dt.datetime.strptime(new_val, '%d/%m/%Y').strftime('%Y-%m-%d')
                                         except ValueError:
-                                            st.error(f"Formato data non valido per {numero_foglio}. Usare gg/mm/aaaa")
-                                            data_iso = None
-                                st.session_state.db.set_data_consegna(foglio_id, data_iso)
-                                st.toast(f"Data consegna aggiornata per {numero_foglio}", icon="✅")
-                                changes_saved = True
-                            except Exception as e:
-                                st.error(f"Errore salvataggio Consegnato: {e}")
+                                            # Prova anche formato ISO diretto
+                                            try:
+                                                dt.datetime.strptime(new_val, '%Y-%m-%d')
+                                                data_iso = new_val
+                                            except ValueError:
+                                                st.error(f"Formato data non valido per {numero_foglio}. Usare gg/mm/aaaa")
+                                                data_iso = None
+                                    st.session_state.db.set_data_consegna(foglio_id, data_iso)
+                                    salvati.append(f"Data consegna aggiornata per {numero_foglio}")
+                                except Exception as e:
+                                    st.error(f"Errore salvataggio Consegnato: {e}")
 
-                    if "Restituito in data" in row_changes:
-                        old_val = original_restituzione[row_idx]
-                        new_val = str(row_changes["Restituito in data"]).strip()
-                        if old_val != new_val:
-                            try:
-                                # Converti da formato italiano gg/mm/aaaa a ISO yyyy-mm-dd
-                                data_iso = None
-                                if new_val:
-                                    try:
-                                        data_iso = dt.datetime.strptime(new_val, '%d/%m/%Y').strftime('%Y-%m-%d')
-                                    except ValueError:
-                                        # Prova anche formato ISO diretto
+                            if "Restituito in data" in row_changes:
+                                new_val = row_changes["Restituito in data"]
+                                try:
+                                    # Converti da formato italiano gg/mm/aaaa a ISO yyyy-mm-dd
+                                    data_iso = None
+                                    if new_val:
                                         try:
-                                            dt.datetime.strptime(new_val, '%Y-%m-%d')
-                                            data_iso = new_val
+                                            data_iso = dt.datetime.strptime(new_val, '%d/%m/%Y').strftime('%Y-%m-%d')
                                         except ValueError:
-                                            st.error(f"Formato data non valido per {numero_foglio}. Usare gg/mm/aaaa")
-                                            data_iso = None
-                                st.session_state.db.set_data_restituzione(foglio_id, data_iso)
-                                st.toast(f"Data restituzione aggiornata per {numero_foglio}", icon="✅")
-                                changes_saved = True
-                            except Exception as e:
-                                st.error(f"Errore salvataggio data restituzione: {e}")
-
-                    if "Contatto telefonico" in row_changes:
-                        old_val = original_contatto[row_idx]
-                        new_val = str(row_changes["Contatto telefonico"]).strip()
-                        if old_val != new_val:
-                            cacciatore_id = cacciatore_map.get(row_idx)
-                            if cacciatore_id:
-                                try:
-                                    st.session_state.db.update_contatto_telefonico(cacciatore_id, new_val)
-                                    st.toast(f"Contatto telefonico aggiornato per {numero_foglio}", icon="✅")
-                                    changes_saved = True
+                                            # Prova anche formato ISO diretto
+                                            try:
+                                                dt.datetime.strptime(new_val, '%Y-%m-%d')
+                                                data_iso = new_val
+                                            except ValueError:
+                                                st.error(f"Formato data non valido per {numero_foglio}. Usare gg/mm/aaaa")
+                                                data_iso = None
+                                    st.session_state.db.set_data_restituzione(foglio_id, data_iso)
+                                    salvati.append(f"Data restituzione aggiornata per {numero_foglio}")
                                 except Exception as e:
-                                    st.error(f"Errore salvataggio contatto telefonico: {e}")
-                            else:
-                                st.warning(f"Nessun cacciatore associato al foglio {numero_foglio}")
+                                    st.error(f"Errore salvataggio data restituzione: {e}")
 
-                if changes_saved:
+                            if "Contatto telefonico" in row_changes:
+                                new_val = row_changes["Contatto telefonico"]
+                                cacciatore_id = cacciatore_map.get(foglio_id)
+                                if cacciatore_id and not pd.isna(cacciatore_id):
+                                    try:
+                                        st.session_state.db.update_contatto_telefonico(int(cacciatore_id), new_val)
+                                        salvati.append(f"Contatto telefonico aggiornato per {numero_foglio}")
+                                    except Exception as e:
+                                        st.error(f"Errore salvataggio contatto telefonico: {e}")
+                                else:
+                                    st.warning(f"Nessun cacciatore associato al foglio {numero_foglio}")
+                except Exception as e:
+                    salvati = []
+                    st.error(f"Errore salvataggio modifiche: {e}")
+
+                for messaggio in salvati:
+                    st.toast(messaggio, icon="✅")
+                if salvati:
                     st.rerun()
         
         # Sezione Azioni aggiuntive (modifica date e apertura file)
@@ -589,24 +490,25 @@ def show_gestione_fogli():
         col_select, col_info = st.columns([2, 1])
         
         with col_select:
-            # Selectbox per scegliere il foglio
-            foglio_options = [
-                (row.get('id'), f"{row.get('numero_foglio', 'N/A')} - {row.get('rilasciato_a', 'N/A')}")
-                for idx, row in df_fogli.iterrows()
-            ]
+            # Selectbox per scegliere il foglio (id -> etichetta)
+            foglio_options = dict(zip(
+                df_fogli['id'],
+                df_fogli['numero_foglio'].fillna('N/A').astype(str) + ' - '
+                + df_fogli['rilasciato_a'].fillna('N/A').astype(str)
+            ))
             
             if foglio_options:
                 selected_foglio_id = st.selectbox(
                     "Seleziona Foglio per modificare date o aprire file",
-                    options=[opt[0] for opt in foglio_options],
-                    format_func=lambda x: next(opt[1] for opt in foglio_options if opt[0] == x),
+                    options=list(foglio_options),
+                    format_func=foglio_options.get,
                     key="select_foglio_elenco"
                 )
             else:
                 selected_foglio_id = None
         
         with col_info:
-            st.info(f"📊 Totale fogli: {len(df_fogli)}")
+            st.info(f"📊 Totale fogli: {totale_filtrati}")
         
         # Se c'è un foglio selezionato, mostra form per date e file
         if selected_foglio_id:
@@ -680,9 +582,10 @@ def show_gestione_fogli():
                         st.error(f"Errore: {e}")
             
             with edit_col3:
-                # Info file e bottone Apri Excel
+                # Info file e bottone Apri Excel (i file caricati dal browser non sono su disco)
                 file_path = selected_row.get('file_path', None)
-                if file_path and isinstance(file_path, str) and file_path.strip():
+                if (file_path and isinstance(file_path, str) and file_path.strip()
+                        and not file_path.startswith(PREFISSO_UPLOAD)):
                     st.caption(f"📄 {os.path.basename(file_path)}")
                     
                     if st.button("📂 Apri Excel", key=f"apri_excel_{selected_foglio_id}", use_container_width=True):
@@ -735,7 +638,7 @@ def show_gestione_fogli():
                 quantita = st.number_input(
                     "Quantità",
                     min_value=1,
-                    max_value=100,
+                    max_value=10000,
                     value=20,
                     step=1
                 )
@@ -746,32 +649,12 @@ def show_gestione_fogli():
             
             if submitted:
                 try:
-                    fogli_creati = 0
-                    fogli_saltati = 0
-                    for i in range(quantita):
-                        numero_foglio = str(numero_iniziale + i)
-                        
-                        dati = {
-                            'numero_foglio': numero_foglio,
-                            'anno': anno_nuovo,
-                            'cacciatore_id': None,
-                            'tipo': 'A3',
-                            'data_consegna': None,
-                            'consegnato_da': None,
-                            'data_rilascio': None,
-                            'rilasciato_a': None,
-                            'data_restituzione': None,
-                            'restituito_da': None,
-                            'stato': 'DISPONIBILE',
-                            'note': None,
-                            'file_path': None
-                        }
-                        
-                        try:
-                            st.session_state.db.aggiungi_foglio_caccia(dati)
-                            fogli_creati += 1
-                        except:
-                            fogli_saltati += 1  # Foglio già esistente
+                    # Inserimento dell'intero intervallo in un'unica transazione
+                    risultato = st.session_state.db.crea_fogli_range(
+                        anno_nuovo, int(numero_iniziale), int(quantita), tipo='A3'
+                    )
+                    fogli_creati = risultato['creati']
+                    fogli_saltati = risultato['saltati']  # Fogli già esistenti
                     
                     if fogli_creati > 0:
                         st.success(f"✅ Creati {fogli_creati} nuovi fogli!")
@@ -810,7 +693,7 @@ def show_gestione_fogli():
                 quantita = st.number_input(
                     "Quantità",
                     min_value=1,
-                    max_value=100,
+                    max_value=10000,
                     value=20,
                     step=1
                 )
@@ -821,25 +704,11 @@ def show_gestione_fogli():
             
             if submitted:
                 try:
-                    fogli_creati = 0
-                    fogli_saltati = 0
-                    
-                    for i in range(quantita):
-                        numero_foglio = str(numero_iniziale + i)
-                        
-                        dati = {
-                            'numero_foglio': numero_foglio,
-                            'anno': anno_selezionato,
-                            'cacciatore_id': None,
-                            'tipo': 'A3',
-                            'stato': 'DISPONIBILE'
-                        }
-                        
-                        try:
-                            st.session_state.db.aggiungi_foglio_caccia(dati)
-                            fogli_creati += 1
-                        except:
-                            fogli_saltati += 1
+                    risultato = st.session_state.db.crea_fogli_range(
+                        anno_selezionato, int(numero_iniziale), int(quantita), tipo='A3'
+                    )
+                    fogli_creati = risultato['creati']
+                    fogli_saltati = risultato['saltati']
                     
                     if fogli_creati > 0:
                         st.success(f"✅ Creati {fogli_creati} fogli!")
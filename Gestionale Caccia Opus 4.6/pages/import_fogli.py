@@ -1,26 +1,23 @@
 import streamlit as st
 import pandas as pd
-import openpyxl
 import os
-import re
-import datetime as dt
 import sys
 import logging
 import time
-import hashlib
-from openpyxl import load_workbook
+import zipfile
 
-# Setup logging su file
-logging.basicConfig(
-    filename='import_debug.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Dettaglio per file nella telemetria JSONL (telemetria_import), non nel log testuale
 logger = logging.getLogger(__name__)
 
 # Import del parser Excel
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from excel_parser import ExcelParser
+from import_session import ImportSession
+from import_parse import riepilogo_template, parse_file_caricati
+from import_jobs import crea_job, statistiche_job, riepilogo_template_job, STATI_RIPRENDIBILI
+from import_worker import get_worker as get_worker_import
+from sorveglianza_cartella import avvia_sorveglianza, ferma_sorveglianza, get_sorveglianza
+from telemetria_import import riepilogo_run
+from constants import Config
 
 # Contatore globale per numero_tessera autogenerato (per run)
 _tessera_counter = 0
@@ -43,7 +40,7 @@ def show():
     # Tabs
     tab1, tab2, tab3 = st.tabs([
         "📂 Import da Cartella",
-        "📄 Import Singolo File", 
+        "📤 Import da Upload", 
         "📋 Fogli Importati"
     ])
     
@@ -56,369 +53,184 @@ def show():
     with tab3:
         show_fogli_importati()
 
-def genera_numero_tessera_stabile(file_name: str, cognome: str, nome: str, porto_arma: str, anno: int) -> str:
+def pianifica_cartella(cartella: str, anno: int, workers: int = Config.IMPORT_PARSE_WORKERS,
+                       stato_job: str = 'in_corso'):
     """
-    TASK 1: Genera numero_tessera STABILE e UNIVOCO
-    
-    Usa hash del filename come base per garantire stabilità tra run diversi
-    Fallback multipli per garantire che NON sia mai vuoto
-    
-    Args:
-        file_name: Nome file per hash stabile
-        cognome: Cognome cacciatore
-        nome: Nome cacciatore  
-        porto_arma: Numero porto d'arma (se disponibile)
-        anno: Anno fogli
+    Stage 0 (manifest) dell'import massivo e creazione del job (import_jobs).
+    Parsing e scrittura sono eseguiti dal worker in background (import_worker).
     
     Returns:
-        str: Numero tessera GARANTITO non vuoto
+        Dict analisi (job_id, cartella, anno, workers, file_trovati, invariati,
+        rinominati) oppure None se la cartella non contiene file Excel
     """
-    # PRIORITA' 1: Se abbiamo porto d'arma, usa quello
-    if porto_arma and porto_arma.strip():
-        tessera = f"PA_{porto_arma.strip()}"
-        logger.info(f"Tessera da porto_arma: {tessera}")
-        return tessera
-    
-    # PRIORITA' 2: Hash stabile del filename (stesso file = stessa tessera)
-    hash_obj = hashlib.md5(file_name.encode('utf-8'))
-    hash_hex = hash_obj.hexdigest()
-    numero_hash = int(hash_hex[:8], 16) % 90000 + 10000
-    tessera = f"AUTO_{anno}_{numero_hash}"
-    logger.info(f"Tessera da hash file '{file_name}': {tessera}")
-    return tessera
-    
-    # NOTA: Non serve fallback perché hash è sempre disponibile
-
-def extract_header_text_from_excel(file_path: str) -> str:
-    """
-    Estrae il testo dell'header dalle prime righe del foglio Excel
-    Cerca nelle righe 1-6, colonne 1-80
-    
-    Returns:
-        str: Testo header trovato, o stringa vuota se non trovato
-    """
-    try:
-        wb = load_workbook(file_path, read_only=True, data_only=True)
-        ws = wb.active
-        
-        # Scorri righe 1-6 e colonne 1-80
-        for row in range(1, 7):
-            for col in range(1, 81):
-                try:
-                    cell_value = ws.cell(row=row, column=col).value
-                    if cell_value and isinstance(cell_value, str) and len(cell_value) > 50:
-                        # Verifica se contiene pattern rilevanti
-                        text_lower = cell_value.lower()
-                        if any(kw in text_lower for kw in ["sig.", "porto d'arma", "porto d arma", "autorizzazione"]):
-                            wb.close()
-                            logger.info(f"Header trovato alla riga {row}, col {col}: {cell_value[:100]}")
-                            return cell_value.strip()
-                except Exception:
-                    continue
-        
-        wb.close()
-    except Exception as e:
-        logger.warning(f"Errore lettura header Excel {file_path}: {e}")
+    logger.info(f"Cartella: {cartella}, Anno: {anno}")
     
-    return ""
-
-def extract_data_from_header_text(header_text: str, file_name: str, anno: int) -> dict:
-    """
-    Estrae dati strutturati dall'header testuale usando regex robuste
+    # Trova tutti i file Excel
+    files = [f for f in os.listdir(cartella) if f.endswith('.xlsx') or f.endswith('.xls')]
     
-    GUARDIA FINALE: numero_tessera è SEMPRE valorizzato
+    if not files:
+        st.warning("⚠️ Nessun file Excel trovato nella cartella")
+        logger.warning("Nessun file trovato")
+        return None
     
-    Args:
-        header_text: Testo header estratto dal file Excel
-        file_name: Nome file (fallback per cognome/nome)
-        anno: Anno fogli
+    logger.info(f"File trovati: {len(files)}")
     
-    Returns:
-        dict: Dizionario con dati estratti (numero_tessera GARANTITO non None/vuoto)
-    """
-    dati = {
-        'cognome': '',
-        'nome': '',
-        'porto_arma': '',
-        'data_rilascio': None,
-        'autorizzazione_regionale': '',
-        'numero_tessera': '',  # Verrà valorizzato in GUARDIA FINALE
-        'stato': 'RILASCIATO'
+    # ========== STAGE 0: MANIFEST (import incrementale) ==========
+    # File invariati saltati senza aprirli, rinominati riconosciuti dall'hash
+    sessione = ImportSession(st.session_state.db, anno)
+    piano = sessione.pianifica_file([os.path.join(cartella, f) for f in files])
+    job_id = crea_job(st.session_state.db, anno, cartella, piano, stato=stato_job, workers=workers)
+    
+    return {
+        'job_id': job_id,
+        'cartella': cartella,
+        'anno': anno,
+        'workers': workers,
+        'file_trovati': len(files),
+        'invariati': len(piano['invariati']),
+        'rinominati': len(piano['rinominati']),
     }
-    
-    # 1. Estrai Cognome e Nome
-    if header_text:
-        match_nome = re.search(r"\bSig\.?\s+([A-ZÀ-Ù][A-Za-zÀ-ÿ''\-]+)\s+([A-ZÀ-Ù][A-Za-zÀ-ÿ''\-]+)", header_text, re.IGNORECASE)
-        if match_nome:
-            dati['cognome'] = match_nome.group(1).upper()
-            dati['nome'] = match_nome.group(2).title()
-    
-    # Fallback da filename se non trovato in header
-    if not dati['cognome'] or not dati['nome']:
-        # Rimuovi estensione e stato tra parentesi
-        nome_pulito = file_name.replace('_', ' ').split('(')[0].split('.')[0].strip()
-        match_file = re.match(r"([A-Za-zÀ-ÿ''\-]+)\s+([A-Za-zÀ-ÿ''\-]+)", nome_pulito)
-        if match_file:
-            dati['cognome'] = match_file.group(1).upper()
-            dati['nome'] = match_file.group(2).title()
-    
-    # 2. Estrai porto d'arma
-    if header_text:
-        match_porto = re.search(r"porto\s+d['\']arma\s*n[°ºo]?\s*([A-Za-z0-9\-\/]+)", header_text, re.IGNORECASE)
-        if match_porto:
-            dati['porto_arma'] = match_porto.group(1).strip()
-    
-    # 3. Estrai data
-    if header_text:
-        match_data = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", header_text)
-        if match_data:
-            try:
-                dati['data_rilascio'] = dt.datetime.strptime(match_data.group(1), '%d/%m/%Y').date()
-            except:
-                pass
-    
-    # 4. Estrai autorizzazione regionale
-    if header_text:
-        match_autorizzazione = re.search(r"autorizzazione\s+regionale\s*n[°ºo]?\s*([0-9]+)", header_text, re.IGNORECASE)
-        if match_autorizzazione:
-            dati['autorizzazione_regionale'] = match_autorizzazione.group(1)
-    
-    # 5. Estrai stato da filename
-    match_stato = re.search(r'\((.*?)\)', file_name)
-    if match_stato:
-        stato_raw = match_stato.group(1).upper()
-        if 'CONSEGNATO' in stato_raw:
-            dati['stato'] = 'CONSEGNATO'
-        elif 'STAMPATO' in stato_raw or 'STAMPATA' in stato_raw:
-            dati['stato'] = 'RILASCIATO'
-        elif 'RINNOVARE' in stato_raw:
-            dati['stato'] = 'DISPONIBILE'
-    
-    # ========== GUARDIA FINALE: numero_tessera SEMPRE valorizzato ==========
-    # TASK 1: Questo è il punto critico che previene NOT NULL constraint failed
-    
-    dati['numero_tessera'] = genera_numero_tessera_stabile(
-        file_name=file_name,
-        cognome=dati['cognome'],
-        nome=dati['nome'],
-        porto_arma=dati['porto_arma'],
-        anno=anno
-    )
-    
-    # Verifica doppia sicurezza (non dovrebbe mai essere necessaria)
-    if not dati['numero_tessera'] or dati['numero_tessera'].strip() == '':
-        # Ultimo fallback assoluto: hash del filename
-        hash_obj = hashlib.md5(file_name.encode('utf-8'))
-        dati['numero_tessera'] = f"EMERGENCY_{hash_obj.hexdigest()[:12].upper()}"
-        logger.error(f"EMERGENCY tessera per {file_name}: {dati['numero_tessera']}")
-    
-    logger.info(f"File {file_name}: Tessera finale = {dati['numero_tessera']}")
-    
-    return dati
 
-def cerca_cacciatore_fuzzy(cognome: str, nome: str, cacciatori_esistenti: list, data_nascita=None) -> dict:
-    """Cerca un cacciatore con matching fuzzy su cognome+nome"""
-    if not cognome or not nome:
-        return None
-    
-    cognome_upper = cognome.upper().strip()
-    nome_title = nome.title().strip()
-    
-    # Match esatto
-    for c in cacciatori_esistenti:
-        if c.get('cognome', '').upper() == cognome_upper and c.get('nome', '').title() == nome_title:
-            if data_nascita and c.get('data_nascita'):
-                if str(c.get('data_nascita')) == str(data_nascita):
-                    return c
-            else:
-                return c
-    
-    # Match fuzzy (cognome esatto, nome abbreviato)
-    for c in cacciatori_esistenti:
-        cognome_db = c.get('cognome', '').upper()
-        nome_db = c.get('nome', '').title()
-        
-        if cognome_db == cognome_upper:
-            if nome_title in nome_db or nome_db in nome_title:
-                return c
-    
-    return None
+def get_worker():
+    """Worker di import del processo, sul database della sessione"""
+    return get_worker_import(st.session_state.db.db_path)
+
+def avvia_job(analisi: dict, operazione: str, chunk_size: int = Config.MAX_BATCH_SIZE):
+    """Accoda il job al worker e lo segue in questa sessione"""
+    get_worker().avvia(analisi['job_id'], operazione, workers=analisi['workers'], chunk_size=chunk_size)
+    st.session_state['job_import_attivo'] = dict(analisi, operazione=operazione, chunk_size=chunk_size)
+    st.session_state.pop('ultimo_import', None)
 
-def scansiona_e_importa_fogli(cartella: str, anno: int):
+def scansiona_e_importa_fogli(cartella: str, anno: int, workers: int = Config.IMPORT_PARSE_WORKERS,
+                              chunk_size: int = Config.MAX_BATCH_SIZE):
     """
     TASK 3: Import massivo atomico con logging tecnico
     
-    Ogni file è un'operazione atomica (successo completo o rollback)
-    Logging su file per debug tecnico
+    Due stage: parsing dei file in parallelo (workers processi), poi
+    scrittura su database da un solo writer, chunk_size file per transazione.
+    Ogni file è un'operazione atomica (SAVEPOINT: successo completo o rollback)
+    Entrambi gli stage girano nel worker in background: la pagina ne segue
+    l'avanzamento (vedi mostra_job_attivo). Logging su file per debug tecnico
     """
-    
     logger.info(f"========== INIZIO IMPORT MASSIVO ==========")
-    logger.info(f"Cartella: {cartella}, Anno: {anno}")
     
-    st.info("🔍 Scansione cartella e parsing file Excel in corso...")
-    
-    # Trova tutti i file Excel
-    files = [f for f in os.listdir(cartella) if f.endswith('.xlsx') or f.endswith('.xls')]
+    analisi = pianifica_cartella(cartella, anno, workers)
+    if analisi is None:
+        return
     
-    if not files:
-        st.warning("⚠️ Nessun file Excel trovato nella cartella")
-        logger.warning("Nessun file trovato")
+    avvia_job(analisi, 'importa', chunk_size)
+
+def formatta_durata(secondi) -> str:
+    if secondi is None:
+        return "—"
+    minuti, secondi = divmod(int(secondi), 60)
+    return f"{minuti}m {secondi:02d}s" if minuti else f"{secondi}s"
+
+ETICHETTE_FASI = {
+    'in_coda': "In coda",
+    'parsing': "Parsing",
+    'abbinamento': "Abbinamento cacciatori",
+    'scrittura': "Scrittura",
+}
+
+def mostra_job_attivo():
+    """
+    Avanzamento del job seguito da questa sessione, aggiornato ogni
+    Config.IMPORT_POLL_SECONDS finché il worker non termina.
+    """
+    attivo = st.session_state.get('job_import_attivo')
+    if not attivo:
         return
     
-    st.success(f"✅ Trovati {len(files)} file Excel")
-    logger.info(f"File trovati: {len(files)}")
+    worker = get_worker()
+    stato = worker.stato(attivo['job_id'])
+    if stato is None:
+        # Processo riavviato: il job resta nel journal e si può riprendere
+        st.session_state.pop('job_import_attivo', None)
+        return
     
-    # Progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    if stato['attivo']:
+        st.markdown("---")
+        st.markdown(f"### ⏳ Job #{attivo['job_id']} · {ETICHETTE_FASI.get(stato['fase'], stato['fase'])}")
+        if attivo['invariati'] or attivo['rinominati']:
+            st.caption(f"♻️ {attivo['invariati']} file invariati e {attivo['rinominati']} "
+                       f"rinominati già importati")
+        
+        totale = stato['totale']
+        st.progress(stato['completati'] / totale if totale else 0.0)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("File", f"{stato['completati']}/{totale}")
+        with col2:
+            st.metric("File/s", f"{stato['file_s']:.1f}")
+        with col3:
+            st.metric("ETA fase", formatta_durata(stato['eta']))
+        with col4:
+            st.metric("Trascorso", formatta_durata(sum(stato['durate'].values())))
+        
+        if stato['durate']:
+            st.caption(" · ".join(f"{ETICHETTE_FASI.get(fase, fase)}: {durata:.1f}s"
+                                  for fase, durata in stato['durate'].items()))
+        if stato['file_corrente']:
+            st.caption(f"📄 {stato['file_corrente']}")
+        st.caption("Puoi continuare a lavorare nelle altre pagine: l'import prosegue in background.")
+        
+        time.sleep(Config.IMPORT_POLL_SECONDS)
+        st.rerun()
     
-    # Contatori
-    importati = 0
-    errori = 0
-    gia_esistenti = 0
-    cacciatori_creati = 0
-    cacciatori_aggiornati = 0
+    # Job concluso: risultato consegnato una sola volta a questa sessione
+    worker.dimentica(attivo['job_id'])
+    del st.session_state['job_import_attivo']
     
-    username = "admin"
+    if stato['fase'] == 'errore':
+        st.error(f"❌ Job #{attivo['job_id']} fallito: {stato['errore']}")
+        return
     
-    # Lista errori dettagliati
-    errori_dettaglio = []
+    durate = stato['durate']
+    if attivo['operazione'] == 'anteprima':
+        st.session_state['anteprima_import'] = dict(
+            attivo, durata_parsing=durate.get('parsing', 0.0), **stato['risultato']
+        )
+    else:
+        st.session_state['ultimo_import'] = dict(
+            attivo, riepilogo=stato['risultato'], durata_parsing=durate.get('parsing', 0.0)
+        )
+    st.rerun()
+
+def mostra_riepilogo_import(ultimo: dict = None):
+    """
+    Riepilogo di un import concluso: di default l'ultimo import da cartella
+    della sessione. Per gli upload (senza job) `ultimo` porta i risultati.
+    """
+    ultimo = ultimo or st.session_state.get('ultimo_import')
+    if not ultimo:
+        return
     
-    # TASK 3: Processa ogni file in modo atomico
-    for idx, file_name in enumerate(files):
-        file_path = os.path.join(cartella, file_name)
-        
-        # Aggiorna progress
-        progress_bar.progress((idx + 1) / len(files))
-        status_text.text(f"Elaborazione {idx + 1}/{len(files)}: {file_name}")
-        
-        logger.info(f"--- Processing file {idx+1}/{len(files)}: {file_name} ---")
-        
-        # TASK 3: Operazione atomica per file
-        success = False
-        for tentativo in range(3):  # Max 3 tentativi
-            try:
-                # Estrai header
-                header_text = extract_header_text_from_excel(file_path)
-                logger.debug(f"Header estratto: {header_text[:200] if header_text else 'VUOTO'}")
-                
-                # Estrai dati (con GUARDIA numero_tessera)
-                dati_estratti = extract_data_from_header_text(header_text, file_name, anno)
-                
-                cognome = dati_estratti['cognome']
-                nome = dati_estratti['nome']
-                numero_tessera = dati_estratti['numero_tessera']  # GARANTITO non vuoto
-                porto_arma = dati_estratti['porto_arma']
-                stato = dati_estratti['stato']
-                
-                # TASK 4: Log tecnico valore finale numero_tessera
-                logger.info(f"Dati estratti: cognome={cognome}, nome={nome}, tessera={numero_tessera}, porto={porto_arma}")
-                
-                if not cognome or not nome:
-                    logger.error(f"SKIP: Impossibile estrarre cognome/nome da {file_name}")
-                    errori += 1
-                    errori_dettaglio.append(f"{file_name}: Cognome/nome mancanti")
-                    break
-                
-                # Doppia verifica numero_tessera (sicurezza ridondante)
-                if not numero_tessera or numero_tessera.strip() == '':
-                    logger.critical(f"CRITICAL: tessera vuota dopo guardia! File: {file_name}")
-                    raise ValueError(f"numero_tessera vuoto nonostante guardia: {file_name}")
-                
-                # Cerca o crea cacciatore
-                cacciatori_esistenti = st.session_state.db.get_tutti_cacciatori(solo_attivi=True)
-                cacciatore = cerca_cacciatore_fuzzy(cognome, nome, cacciatori_esistenti)
-                
-                if not cacciatore:
-                    # Crea nuovo cacciatore
-                    dati_cacciatore = {
-                        'cognome': cognome,
-                        'nome': nome,
-                        'codice_fiscale': None,
-                        'data_nascita': dati_estratti.get('data_rilascio'),
-                        'numero_tessera': numero_tessera,  # OBBLIGATORIO
-                        'attivo': 1
-                    }
-                    
-                    logger.info(f"Creazione nuovo cacciatore: {cognome} {nome}, tessera={numero_tessera}")
-                    cacciatore_id = st.session_state.db.aggiungi_cacciatore(dati_cacciatore)
-                    cacciatore = st.session_state.db.get_cacciatore(cacciatore_id)
-                    cacciatori_creati += 1
-                else:
-                    logger.info(f"Cacciatore esistente trovato: ID={cacciatore['id']}")
-                
-                # Genera numero foglio univoco
-                if dati_estratti.get('autorizzazione_regionale'):
-                    numero_foglio = f"{anno}_{dati_estratti['autorizzazione_regionale']}"
-                else:
-                    hash_obj = hashlib.md5(file_name.encode())
-                    numero_seq = int(hash_obj.hexdigest()[:8], 16) % 900000 + 100000
-                    numero_foglio = f"{anno}{numero_seq}"
-                
-                # Verifica esistenza
-                fogli_esistenti = st.session_state.db.get_fogli_anno(anno)
-                if any(f.get('numero_foglio') == numero_foglio for f in fogli_esistenti):
-                    logger.info(f"Foglio già esistente: {numero_foglio}")
-                    gia_esistenti += 1
-                    break
-                
-                # Crea foglio
-                dati_foglio = {
-                    'numero_foglio': numero_foglio,
-                    'anno': anno,
-                    'cacciatore_id': cacciatore['id'],
-                    'tipo': 'A3',
-                    'data_rilascio': dt.datetime.now().date().isoformat() if not dati_estratti.get('data_rilascio') else dati_estratti['data_rilascio'].isoformat(),
-                    'rilasciato_a': f"{cacciatore['cognome']} {cacciatore['nome']}",
-                    'stato': stato,
-                    'note': f"Import: {file_name}. Porto: {porto_arma or 'N/A'}",
-                    'file_path': file_path
-                }
-                
-                logger.info(f"Inserimento foglio: {numero_foglio}")
-                foglio_id = st.session_state.db.aggiungi_foglio_caccia(dati_foglio)
-                
-                logger.info(f"SUCCESS: Foglio ID={foglio_id} creato")
-                importati += 1
-                success = True
-                
-                # Throttle
-                if importati % 10 == 0:
-                    time.sleep(0.05)
-                
-                break  # Esci dal retry loop
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                
-                # TASK 4: Log errore tecnico
-                logger.error(f"Tentativo {tentativo+1}/3 fallito per {file_name}: {e}")
-                
-                # TASK 2: Gestione database locked
-                if "locked" in error_msg and tentativo < 2:
-                    logger.warning(f"Database locked, attesa {0.5 * (tentativo + 1)}s...")
-                    time.sleep(0.5 * (tentativo + 1))
-                    continue
-                else:
-                    # Errore definitivo
-                    errori += 1
-                    errori_dettaglio.append(f"{file_name}: {str(e)[:150]}")
-                    logger.error(f"ERRORE DEFINITIVO per {file_name}: {e}")
-                    break
+    riepilogo = ultimo['riepilogo']
+    chunk_size = ultimo['chunk_size']
+    importati = riepilogo['importati']
+    errori = riepilogo['errori']
+    gia_esistenti = riepilogo['gia_esistenti']
+    ambigui = riepilogo['ambigui']
+    cacciatori_creati = riepilogo['cacciatori_creati']
+    cacciatori_aggiornati = 0
+    errori_dettaglio = riepilogo['errori_dettaglio']
+    durata_parsing = ultimo['durata_parsing']
+    durata_scrittura = riepilogo['durata']
+    righe_al_secondo = riepilogo['righe'] / durata_scrittura if durata_scrittura else 0
+    job = st.session_state.db.get_import_job(ultimo['job_id']) if ultimo['job_id'] else None
     
     logger.info(f"========== FINE IMPORT MASSIVO ==========")
-    logger.info(f"Importati: {importati}, Errori: {errori}, Già esistenti: {gia_esistenti}")
-    
-    # Risultati finali
-    progress_bar.progress(1.0)
-    status_text.text("✅ Scansione completata!")
+    logger.info(f"Importati: {importati}, Errori: {errori}, Già esistenti: {gia_esistenti}, Ambigui: {ambigui}")
+    logger.info(f"Scrittura: {riepilogo['righe']} righe in {durata_scrittura:.2f}s ({righe_al_secondo:.0f} righe/s, chunk {chunk_size})")
     
     st.markdown("---")
-    st.markdown("### 📊 Riepilogo Import")
+    st.markdown("### 📊 Riepilogo Import" + (f" (job #{ultimo['job_id']})" if job else ""))
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("📁 File Trovati", len(files))
+        st.metric("📁 File Trovati", ultimo['file_trovati'])
     with col2:
         st.metric("✅ Importati", importati, delta=importati if importati > 0 else None)
     with col3:
@@ -426,11 +238,35 @@ def scansiona_e_importa_fogli(cartella: str, anno: int):
     with col4:
         st.metric("❌ Errori", errori, delta=-errori if errori > 0 else None)
     
-    col5, col6 = st.columns(2)
+    col5, col6, col7, col8 = st.columns(4)
     with col5:
         st.metric("👤 Cacciatori Creati", cacciatori_creati)
     with col6:
         st.metric("🔄 Cacciatori Aggiornati", cacciatori_aggiornati)
+    with col7:
+        st.metric("♻️ Invariati", ultimo['invariati'])
+    with col8:
+        st.metric("📝 Rinominati", riepilogo['rinominati'])
+    
+    analizzati = job['analizzati'] if job else len(ultimo.get('risultati', []))
+    st.caption(f"⏱️ Parsing: {durata_parsing:.1f}s con {ultimo['workers']} processi "
+               f"({analizzati / durata_parsing if durata_parsing else 0:.1f} file/s) · "
+               f"Scrittura: {durata_scrittura:.1f}s, {righe_al_secondo:.0f} righe/s "
+               f"(chunk da {chunk_size} file)")
+    st.caption(f"🗃️ Cache parsing: {riepilogo['cache_hit']} risultati riusati (hit), "
+               f"{riepilogo['cache_miss']} file analizzati (miss)")
+    
+    if job:
+        tempi_template = riepilogo_template_job(st.session_state.db, ultimo['job_id'])
+    else:
+        tempi_template = riepilogo_template(ultimo.get('risultati', []))
+    if tempi_template:
+        with st.expander("⏱️ Tempi di parsing per template"):
+            df_template = pd.DataFrame.from_dict(tempi_template, orient='index')
+            df_template.columns = ['File', 'ms medi', 'Layout noti']
+            st.dataframe(df_template.round(1), use_container_width=True)
+    
+    mostra_telemetria_run(riepilogo['run_id'])
     
     if importati > 0:
         st.success(f"✅ Import completato! {importati} fogli importati.")
@@ -443,7 +279,125 @@ def scansiona_e_importa_fogli(cartella: str, anno: int):
         with st.expander("📋 Dettaglio errori (primi 20)"):
             for errore in errori_dettaglio[:20]:
                 st.text(errore)
-        st.info("📄 Vedi import_debug.log per dettagli completi")
+        st.info(f"📄 Dettaglio per file in {Config.TELEMETRIA_FILE} (run {riepilogo['run_id']})")
+    
+    if ambigui > 0:
+        st.warning(f"🔀 {ambigui} file con cacciatore ambiguo (non importati): "
+                   f"verificare l'anagrafe e rilanciare la scansione")
+        with st.expander("📋 Dettaglio ambigui (primi 20)"):
+            for ambiguo in riepilogo['ambigui_dettaglio'][:20]:
+                st.text(ambiguo)
+
+def mostra_telemetria_run(run_id: str):
+    """Durate per stage dell'esecuzione, aggregate dai record di telemetria"""
+    telemetria = riepilogo_run(run_id)
+    if not telemetria['stage']:
+        return
+    
+    with st.expander(f"📈 Telemetria per stage ({telemetria['file']} file, {telemetria['da_cache']} da cache)"):
+        df_stage = pd.DataFrame([
+            {
+                'Stage': stage.capitalize(),
+                'File': voce['file'],
+                'ms medi': voce['medio_ms'],
+                'ms p95': voce['p95_ms'],
+                'ms max': voce['max_ms'],
+                'Totale (s)': voce['totale_ms'] / 1000,
+            }
+            for stage, voce in telemetria['stage'].items()
+        ])
+        st.dataframe(df_stage.round(2), use_container_width=True, hide_index=True)
+        st.caption("Esiti: " + ", ".join(f"{esito} {n}" for esito, n in sorted(telemetria['esiti'].items())))
+
+# ========== ANTEPRIMA (DRY-RUN) ==========
+
+ETICHETTE_AZIONI = {
+    'nuovo_foglio': "🆕 Nuovo foglio",
+    'duplicato': "⚠️ Duplicato",
+    'ambiguo': "🔀 Cacciatore ambiguo",
+    'scartato': "🚫 Scartato",
+    'errore': "❌ Errore",
+}
+
+def prepara_anteprima(cartella: str, anno: int, workers: int = Config.IMPORT_PARSE_WORKERS):
+    """
+    Parsing e abbinamento senza scritture, nel worker in background: il piano
+    delle azioni e i risultati del parsing restano in sessione e nel journal
+    del job fino alla conferma (nessun secondo parsing).
+    """
+    logger.info("========== ANTEPRIMA IMPORT MASSIVO ==========")
+    st.session_state.pop('anteprima_import', None)
+    
+    analisi = pianifica_cartella(cartella, anno, workers, stato_job='anteprima')
+    if analisi is None:
+        return
+    
+    avvia_job(analisi, 'anteprima')
+
+def mostra_anteprima_import(chunk_size: int):
+    """Tabella delle azioni pianificate, filtri e conferma in un'unica transazione"""
+    analisi = st.session_state.get('anteprima_import')
+    if not analisi:
+        return
+    
+    st.markdown("---")
+    st.markdown(f"### 👁️ Anteprima Import ({analisi['anno']})")
+    st.caption(f"Cartella: {analisi['cartella']} · {analisi['invariati']} invariati, "
+               f"{analisi['rinominati']} rinominati · parsing {analisi['durata_parsing']:.1f}s · "
+               f"nessuna modifica al database finché non confermi")
+    
+    df = pd.DataFrame(analisi['azioni'])
+    if df.empty:
+        st.info("ℹ️ Nessun file nuovo o modificato da importare")
+    else:
+        conteggi = df['azione'].value_counts()
+        colonne = st.columns(len(ETICHETTE_AZIONI))
+        for colonna, (azione, etichetta) in zip(colonne, ETICHETTE_AZIONI.items()):
+            with colonna:
+                st.metric(etichetta, int(conteggi.get(azione, 0)))
+    
+        nuovi_cacciatori = df.loc[df['cacciatore'] == 'nuovo', ['cognome', 'nome']].drop_duplicates()
+        st.caption(f"👤 Cacciatori nuovi: {len(nuovi_cacciatori)} · "
+                   f"abbinati a esistenti: {int((df['cacciatore'] == 'esistente').sum())}")
+    
+    azioni_scelte = st.multiselect(
+        "Azioni da importare",
+        options=list(ETICHETTE_AZIONI),
+        default=['nuovo_foglio'],
+        format_func=ETICHETTE_AZIONI.get,
+        key="anteprima_filtro_azioni"
+    )
+    
+    if not df.empty:
+        visibili = df[df['azione'].isin(azioni_scelte)]
+        st.dataframe(
+            visibili.assign(azione=visibili['azione'].map(ETICHETTE_AZIONI)),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        conferma = st.button("✅ Conferma Import", type="primary", use_container_width=True,
+                             disabled=df.empty or not azioni_scelte)
+    with col2:
+        annulla = st.button("🗑️ Scarta Anteprima", use_container_width=True)
+    
+    if annulla:
+        st.session_state.db.aggiorna_import_job(analisi['job_id'], stato='annullato')
+        del st.session_state['anteprima_import']
+        st.rerun()
+    
+    if conferma:
+        esclusi = [risultato['file_path'] for risultato, azione in zip(analisi['risultati'], analisi['azioni'])
+                   if azione['azione'] not in azioni_scelte]
+        selezionati = len(analisi['risultati']) - len(esclusi)
+        st.session_state.db.escludi_job_items(analisi['job_id'], esclusi)
+        logger.info(f"========== CONFERMA ANTEPRIMA: {selezionati} file ==========")
+        del st.session_state['anteprima_import']
+        # Un'unica transazione per tutto il lotto confermato (SAVEPOINT per file)
+        avvia_job(analisi, 'importa', chunk_size=max(1, selezionati))
+        st.rerun()
 
 def show_import_da_cartella():
     """Import massivo da cartella"""
@@ -463,16 +417,268 @@ def show_import_da_cartella():
         step=1
     )
     
-    if st.button("🔍 Scansiona Cartella", type="primary", use_container_width=True):
+    workers = st.number_input(
+        "Processi di parsing",
+        min_value=1,
+        max_value=max(1, os.cpu_count() or 1) * 2,
+        value=min(Config.IMPORT_PARSE_WORKERS, os.cpu_count() or 1),
+        step=1,
+        help="Numero di file Excel letti in parallelo (1 = parsing seriale)"
+    )
+    
+    chunk_size = st.number_input(
+        "File per transazione",
+        min_value=1,
+        max_value=5000,
+        value=Config.MAX_BATCH_SIZE,
+        step=10,
+        help="Numero di file scritti nel database con un unico commit"
+    )
+    
+    con_anteprima = st.checkbox(
+        "Anteprima prima di importare",
+        value=True,
+        help="Analizza i file e mostra le azioni previste senza scrivere nel database"
+    )
+    
+    in_corso = 'job_import_attivo' in st.session_state
+    if st.button("🔍 Scansiona Cartella", type="primary", use_container_width=True, disabled=in_corso):
         if not cartella_fogli or not os.path.exists(cartella_fogli):
             st.error("⚠️ Cartella non trovata!")
+        elif con_anteprima:
+            prepara_anteprima(cartella_fogli, anno_import, workers=int(workers))
+        else:
+            st.session_state.pop('anteprima_import', None)
+            scansiona_e_importa_fogli(cartella_fogli, anno_import, workers=int(workers),
+                                      chunk_size=int(chunk_size))
+    
+    mostra_riepilogo_import()
+    mostra_anteprima_import(int(chunk_size))
+    
+    mostra_sorveglianza(cartella_fogli, int(anno_import))
+    
+    mostra_job_import(int(workers), int(chunk_size))
+    
+    # Ultimo: durante un job la pagina si aggiorna periodicamente da qui
+    mostra_job_attivo()
+
+# ========== SORVEGLIANZA CARTELLA ==========
+
+ETICHETTE_STATI_FILE = {
+    'in_attesa': "⏳ In attesa",
+    'analizzato': "🔎 Analizzato",
+    'importato': "✅ Importato",
+    'esistente': "⚠️ Già esistente",
+    'scartato': "🚫 Scartato",
+    'ambiguo': "🔀 Ambiguo",
+    'errore': "❌ Errore",
+}
+
+def mostra_sorveglianza(cartella: str, anno: int):
+    """Avvio/arresto dell'import automatico della cartella e log dei file importati"""
+    st.markdown("---")
+    st.markdown("### 👁️ Sorveglianza Cartella")
+    st.caption(f"Importa automaticamente i file che vengono aggiunti alla cartella "
+               f"(controllo ogni {Config.WATCH_POLL_SECONDS:.0f}s, a lotti di {Config.WATCH_BATCH_FILE} file)")
+    
+    if not cartella or not os.path.isdir(cartella):
+        st.info("ℹ️ Inserisci il percorso di una cartella esistente per attivare la sorveglianza")
+        return
+    
+    sorveglianza = get_sorveglianza(cartella)
+    attiva = bool(sorveglianza and sorveglianza.attiva)
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        if attiva:
+            st.success(f"🟢 Attiva su anno {sorveglianza.anno} · ultima scansione "
+                       f"{sorveglianza.stats['ultima_scansione'] or '—'} · "
+                       f"{sorveglianza.in_attesa} file in scrittura")
         else:
-            scansiona_e_importa_fogli(cartella_fogli, anno_import)
+            st.info("⚪ Non attiva")
+    with col2:
+        if st.button("▶️ Avvia" if not attiva else "🔁 Riavvia", use_container_width=True, key="avvia_sorveglianza"):
+            avvia_sorveglianza(st.session_state.db.db_path, cartella, anno)
+            st.rerun()
+    with col3:
+        if st.button("⏹️ Ferma", use_container_width=True, disabled=not attiva, key="ferma_sorveglianza"):
+            ferma_sorveglianza(cartella)
+            st.rerun()
+    
+    if sorveglianza:
+        st.caption(f"Scansioni: {sorveglianza.stats['scansioni']} · file accodati: "
+                   f"{sorveglianza.stats['accodati']} · job: {sorveglianza.stats['job']}")
+        if sorveglianza.eventi:
+            with st.expander("📋 Eventi sorveglianza"):
+                for ora, messaggio in list(sorveglianza.eventi)[:50]:
+                    st.text(f"{ora}  {messaggio}")
+    
+    log = st.session_state.db.get_log_import_automatico(os.path.abspath(cartella), limit=100)
+    if log:
+        with st.expander(f"📥 File importati automaticamente (ultimi {len(log)})", expanded=attiva):
+            df_log = pd.DataFrame(log)
+            df_log['stato'] = df_log['stato'].map(lambda stato: ETICHETTE_STATI_FILE.get(stato, stato))
+            df_log = df_log.rename(columns={
+                'aggiornato_il': 'Ora', 'file_name': 'File', 'stato': 'Esito',
+                'messaggio': 'Dettaglio', 'job_id': 'Job', 'anno': 'Anno'
+            })
+            st.dataframe(df_log, use_container_width=True, hide_index=True)
+        st.button("🔄 Aggiorna", key="aggiorna_sorveglianza")
+
+# ========== JOB DI IMPORT ==========
+
+ETICHETTE_STATI_JOB = {
+    'in_corso': "⏳ In corso",
+    'interrotto': "⏸️ Interrotto",
+    'fallito': "❌ Fallito",
+    'completato': "✅ Completato",
+    'anteprima': "👁️ Anteprima",
+    'annullato': "🗑️ Annullato",
+}
+
+def mostra_job_import(workers: int, chunk_size: int):
+    """Elenco dei job di import con statistiche e ripresa dei job non completati"""
+    jobs = st.session_state.db.get_import_jobs(limit=20)
+    if not jobs:
+        return
+    
+    st.markdown("---")
+    st.markdown("### 📜 Job di Import")
+    
+    righe = []
+    for job in jobs:
+        statistiche = statistiche_job(job)
+        righe.append({
+            'Job': job['id'],
+            'Stato': ETICHETTE_STATI_JOB.get(job['stato'], job['stato']),
+            'Anno': job['anno'],
+            'Cartella': job['cartella'],
+            'Avviato': job['creato_il'],
+            'File': job['totale'],
+            'Processati': job['processati'],
+            'Importati': job['importati'],
+            'Errori': job['errori'],
+            'Ambigui': job['ambigui'],
+            'File/s parsing': round(statistiche['file_s'], 1),
+            'Righe/s scrittura': round(statistiche['righe_s'], 0),
+        })
+    st.dataframe(pd.DataFrame(righe), use_container_width=True, hide_index=True)
+    
+    # I job in esecuzione nel worker risultano 'in_corso' ma non vanno ripresi
+    worker = get_worker()
+    riprendibili = [job for job in jobs
+                    if job['stato'] in STATI_RIPRENDIBILI and not worker.in_esecuzione(job['id'])]
+    if not riprendibili:
+        return
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        job_id = st.selectbox(
+            "Job da riprendere",
+            options=[job['id'] for job in riprendibili],
+            format_func=lambda jid: next(
+                f"#{j['id']} {j['cartella']} ({j['processati']}/{j['totale']} file, "
+                f"{ETICHETTE_STATI_JOB.get(j['stato'], j['stato'])})"
+                for j in riprendibili if j['id'] == jid
+            ),
+            key="job_da_riprendere"
+        )
+    with col2:
+        st.write("")
+        riprendi = st.button("▶️ Riprendi", use_container_width=True,
+                             disabled="job_import_attivo" in st.session_state)
+    
+    if riprendi:
+        job = st.session_state.db.get_import_job(job_id)
+        logger.info(f"========== RIPRESA JOB IMPORT {job_id} ==========")
+        avvia_job({
+            'job_id': job_id,
+            'cartella': job['cartella'],
+            'anno': job['anno'],
+            'workers': workers,
+            'file_trovati': job['totale'],
+            'invariati': 0,
+            'rinominati': 0,
+        }, 'importa', chunk_size)
+        st.rerun()
+
+def importa_file_caricati(caricati: list, anno: int, chunk_size: int = Config.MAX_BATCH_SIZE):
+    """
+    Import di file caricati dal browser: estrazione direttamente dalla memoria
+    (BytesIO, membri ZIP uno alla volta), poi stessa scrittura a chunk
+    dell'import da cartella. Nessun file temporaneo su disco.
+    """
+    logger.info(f"========== INIZIO IMPORT DA UPLOAD ({len(caricati)} file caricati) ==========")
+    
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    ultimo_aggiornamento = [0.0]
+    
+    def _progress(completati, totale, file_name=None, fase="Parsing"):
+        # Aggiornamento della UI al massimo ogni Config.IMPORT_POLL_SECONDS
+        adesso = time.perf_counter()
+        if completati < totale and adesso - ultimo_aggiornamento[0] < Config.IMPORT_POLL_SECONDS:
+            return
+        ultimo_aggiornamento[0] = adesso
+        progress_bar.progress(completati / totale if totale else 1.0)
+        status_text.text(f"{fase} {completati}/{totale}" + (f": {file_name}" if file_name else ""))
+    
+    start_parsing = time.perf_counter()
+    try:
+        risultati = parse_file_caricati(caricati, anno, progress=_progress, db=st.session_state.db)
+    except zipfile.BadZipFile as e:
+        st.error(f"❌ Archivio ZIP non valido: {e}")
+        return
+    durata_parsing = time.perf_counter() - start_parsing
+    
+    if not risultati:
+        st.warning("⚠️ Nessun file Excel (.xlsx) fra i file caricati")
+        return
+    
+    sessione = ImportSession(st.session_state.db, anno)
+    riepilogo = sessione.importa_risultati(
+        risultati, chunk_size=chunk_size,
+        progress=lambda c, t, f: _progress(c, t, f, fase="Elaborazione")
+    )
+    riepilogo['rinominati'] = 0
+    progress_bar.progress(1.0)
+    status_text.text("✅ Import completato!")
+    
+    mostra_riepilogo_import({
+        'job_id': None,
+        'file_trovati': len(risultati),
+        'invariati': 0,
+        'workers': 1,
+        'chunk_size': chunk_size,
+        'durata_parsing': durata_parsing,
+        'riepilogo': riepilogo,
+        'risultati': risultati,
+    })
 
 def show_import_singolo_file():
-    """Import singolo file (placeholder)"""
-    st.subheader("Import Singolo File")
-    st.info("Usa l'import massivo per ora")
+    """Import di file caricati dal browser (.xlsx multipli o archivio .zip)"""
+    st.subheader("Import da File Caricati")
+    
+    caricati = st.file_uploader(
+        "File Excel o archivio ZIP",
+        type=['xlsx', 'zip'],
+        accept_multiple_files=True,
+        help="Seleziona uno o più file .xlsx oppure uno .zip che li contiene: "
+             "vengono letti in memoria, senza copie su disco"
+    )
+    
+    anno_upload = st.number_input(
+        "Anno Fogli",
+        min_value=2020,
+        max_value=2030,
+        value=2025,
+        step=1,
+        key="anno_upload"
+    )
+    
+    if st.button("📤 Importa File Caricati", type="primary", use_container_width=True,
+                 disabled=not caricati):
+        importa_file_caricati(caricati, int(anno_upload))
 
 def show_fogli_importati():
     """Visualizza fogli importati"""
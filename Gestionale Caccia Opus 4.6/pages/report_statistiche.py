@@ -1,8 +1,9 @@
-```python
 import streamlit as st
 import pandas as pd
 import datetime as dt
 
+from constants import Config
+
 # Import opzionale di plotly
 try:
     import plotly.express as px
@@ -479,7 +480,14 @@ def show_report_personalizzati():
             options=["CSV", "Excel (futuro)"]
         )
     
+    # Il report resta visibile tra un rerun e l'altro (es. cambio pagina del log)
+    # finché non cambiano i parametri
+    parametri = (tipo_report, anno_report, formato_export)
     if st.button("📊 Genera Report", type="primary", use_container_width=True):
+        st.session_state.report_generato = parametri
+        st.session_state.pagine_log = [None]
+    
+    if st.session_state.get('report_generato') == parametri:
         genera_report_personalizzato(tipo_report, anno_report, formato_export)
 
 def genera_report_personalizzato(tipo_report: str, anno: int, formato: str):
@@ -567,19 +575,38 @@ def genera_report_personalizzato(tipo_report: str, anno: int, formato: str):
             st.warning(f"Nessun foglio per l'anno {anno}")
     
     elif tipo_report == "Report Attività Sistema":
-        log = st.session_state.db.get_log_attivita(500)
+        # Una pagina alla volta: pila dei cursori delle pagine visitate (paginazione keyset)
+        cursori = st.session_state.setdefault('pagine_log', [None])
+        pagina = st.session_state.db.get_log_pagina(cursore=cursori[-1])
+        log = pagina['righe']
         
         if log:
             df = pd.DataFrame(log)
             
-            st.success(f"✅ Report generato con {len(log)} attività")
+            primo = (len(cursori) - 1) * Config.LOG_PER_PAGINA + 1
+            st.success(f"✅ Attività {primo}-{primo + len(log) - 1} (pagina {len(cursori)})")
             
             st.dataframe(df, use_container_width=True, hide_index=True)
             
+            # Navigazione tra le pagine
+            col_prec, col_succ = st.columns(2)
+            with col_prec:
+                if st.button("◀ Più recenti", disabled=len(cursori) == 1, use_container_width=True,
+                             key="log_prec"):
+                    cursori.pop()
+                    st.rerun()
+            with col_succ:
+                if st.button("Meno recenti ▶", disabled=pagina['cursore'] is None, use_container_width=True,
+                             key="log_succ"):
+                    cursori.append(pagina['cursore'])
+                    st.rerun()
+            
             if formato == "CSV":
-                csv = df.to_csv(index=False).encode('utf-8')
+                # L'export non dipende dalla pagina mostrata: ultime LOG_EXPORT_MAX attività
+                log_export = st.session_state.db.get_log_attivita(Config.LOG_EXPORT_MAX)
+                csv = pd.DataFrame(log_export).to_csv(index=False).encode('utf-8')
                 st.download_button(
-                    label="📥 Scarica Report CSV",
+                    label=f"📥 Scarica Report CSV (ultime {len(log_export)} attività)",
                     data=csv,
                     file_name=f"report_attivita_{dt.datetime.now().strftime('%Y%m%d')}.csv",
                     mime="text/csv"
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Verifica e ricostruzione dei contatori statistiche
+
+I contatori di statistiche_counters (dashboard e statistiche fogli) sono
+mantenuti dai trigger del database. Questo comando li confronta con un
+conteggio completo delle tabelle, mostra le differenze e riscrive i valori.
+
+Uso:
+    python ricostruisci_statistiche.py [percorso_db] [--solo-verifica]
+
+Con --solo-verifica non modifica nulla ed esce con codice 1 se trova differenze.
+"""
+
+import sys
+
+from database import GestionaleCacciaDB
+
+
+def main():
+    argomenti = [a for a in sys.argv[1:] if not a.startswith('--')]
+    solo_verifica = '--solo-verifica' in sys.argv
+    db = GestionaleCacciaDB(argomenti[0] if argomenti else None, audit_async=False)
+
+    try:
+        print("=" * 70)
+        print("CONTATORI STATISTICHE - " + ("verifica" if solo_verifica else "verifica e ricostruzione"))
+        print("=" * 70)
+
+        risultato = db.ricostruisci_statistiche(correggi=not solo_verifica)
+        differenze = risultato['differenze']
+
+        if differenze:
+            print(f"{'Contatore':<28}{'Anno':>6}{'Memorizzato':>14}{'Ricalcolato':>14}")
+            print("-" * 62)
+            for chiave, anno, memorizzato, ricalcolato in differenze:
+                print(f"{chiave:<28}{anno or '-':>6}{memorizzato:>14}{ricalcolato:>14}")
+            print()
+            if solo_verifica:
+                print(f"⚠️ {len(differenze)} contatori non corrispondono (eseguire senza --solo-verifica)")
+            else:
+                print(f"✅ {len(differenze)} contatori corretti")
+        else:
+            print(f"✅ Tutti i contatori corrispondono ({risultato['contatori']} valori)")
+    finally:
+        db.close()
+
+    return 1 if solo_verifica and differenze else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,70 @@
+"""
+SMOKE TEST - Abbinamento Cacciatori
+
+Casi di regressione per matching_cacciatori.IndiceCacciatori: nomi diversi
+con lo stesso cognome (varianti maschile/femminile) non devono mai essere
+abbinati, nemmeno se uno è l'inizio dell'altro (Carlo/Carlotta); abbreviazioni
+(iniziali, forme col punto o troncate) e cognomi scritti diversamente sì.
+
+Uso:
+    python smoke_test_matching.py
+
+Esce con codice 1 se un caso non dà l'esito atteso.
+"""
+
+from matching_cacciatori import IndiceCacciatori
+
+# (cognome e nome nell'indice, cognome e nome letti dal file, esito atteso)
+CASI = [
+    # Nome diverso: persona diversa, mai 'match'
+    (('SANNA', 'GIOVANNA'), ('Sanna', 'Giovanni'), 'nuovo'),
+    (('PIRAS', 'FRANCESCA'), ('Piras', 'Francesco'), 'nuovo'),
+    (('CONGIU', 'ROBERTA'), ('Congiu', 'Roberto'), 'nuovo'),
+    (('DEIANA', 'ANTONELLA'), ('Deiana', 'Antonello'), 'nuovo'),
+    (('MELIS', 'GIUSEPPINA'), ('Melis', 'Giuseppe'), 'nuovo'),
+    (('SERRA', 'GIOVANNA'), ('Serra', 'Anna'), 'nuovo'),
+    # Nome completo che è l'inizio di un altro nome: non è un'abbreviazione
+    (('ROSSI', 'CARLOTTA'), ('Rossi', 'Carlo'), 'nuovo'),
+    (('BIANCHI', 'MARIANO'), ('Bianchi', 'Maria'), 'nuovo'),
+    (('FADDA', 'SIMONETTA'), ('Fadda', 'Simone'), 'nuovo'),
+    (('ROSSI', 'CARLO'), ('Rossi', 'Carlotta'), 'nuovo'),
+    (('MURA', 'DANIELA'), ('Mura', 'Daniel'), 'nuovo'),
+    # Stessa persona
+    (('SANNA', 'GIOVANNI'), ('Sanna', 'Giovanni'), 'match'),
+    (('MELIS', 'GIUSEPPE'), ('Melis', 'G.'), 'match'),
+    (('MELIS', 'GIUSEPPE'), ('Melis', 'Gius'), 'match'),
+    (('SANNA', 'GIOVANNI'), ('Sanna', 'Giov.'), 'match'),
+    (('SANNA', 'GIOVANNI'), ('Sanna', 'Gio.'), 'match'),
+    (('SANNA', 'G.'), ('Sanna', 'Giovanni'), 'match'),
+    (('MURGIA', 'MARIA GRAZIA'), ('Murgia', 'Maria'), 'match'),
+    (("D'ANGELO", 'MARIO'), ('Dangelo', 'Mario'), 'match'),
+    (('DE LUCA', 'ANTONIO'), ('Deluca', 'Antonio'), 'match'),
+    (('ROSSI', 'MARIO'), ('Rosi', 'Mario'), 'match'),
+]
+
+
+def main():
+    print("=" * 70)
+    print("SMOKE TEST - Abbinamento Cacciatori")
+    print("=" * 70)
+
+    errori = 0
+    for (cognome_db, nome_db), (cognome, nome), atteso in CASI:
+        indice = IndiceCacciatori()
+        indice.aggiungi({'id': 1, 'cognome': cognome_db, 'nome': nome_db})
+        esito = indice.cerca(cognome, nome)
+        ok = esito['esito'] == atteso
+        errori += not ok
+        print(f"{'✓' if ok else '❌'} {cognome} {nome} -> {cognome_db} {nome_db}: "
+              f"{esito['esito']} ({esito['punteggio']:.2f}), atteso {atteso}")
+
+    print()
+    if errori:
+        print(f"❌ {errori} casi con esito diverso da quello atteso")
+        return 1
+    print(f"✓ Tutti i {len(CASI)} casi corretti")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
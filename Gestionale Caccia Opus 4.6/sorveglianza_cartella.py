@@ -0,0 +1,191 @@
+"""
+Sorveglianza cartella (import automatico)
+Un thread per cartella la scansiona ogni Config.WATCH_POLL_SECONDS con
+os.scandir e tiene un cursore (percorso -> size, mtime) dei file già passati
+all'import: alle scansioni successive solo i file nuovi o modificati
+vengono considerati, senza riaprire né rileggere gli altri.
+
+Debounce dei file in scrittura: un file è pronto quando size e mtime sono
+invariati tra due scansioni e non è stato modificato negli ultimi
+Config.WATCH_DEBOUNCE_SECONDS. I file pronti sono importati a lotti di
+Config.WATCH_BATCH_FILE come job (origine 'sorveglianza') eseguiti dal
+worker di import: stesso manifest, stesso journal, un solo writer.
+
+Polling invece di inotify: funziona uguale su Windows e sulle cartelle di
+rete condivise, dove le notifiche del filesystem non sono affidabili.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from constants import Config
+from import_jobs import crea_job
+from import_parse import file_excel_supportato
+from import_session import ImportSession
+from import_worker import get_worker
+
+logger = logging.getLogger(__name__)
+
+
+class SorveglianzaCartella:
+    """Scansione periodica di una cartella e import automatico dei file nuovi"""
+
+    def __init__(self, worker, cartella: str, anno: int,
+                 intervallo: float = Config.WATCH_POLL_SECONDS,
+                 debounce: float = Config.WATCH_DEBOUNCE_SECONDS,
+                 lotto: int = Config.WATCH_BATCH_FILE):
+        self.worker = worker
+        self.cartella = cartella
+        self.anno = anno
+        self.intervallo = intervallo
+        self.debounce = debounce
+        self.lotto = max(1, int(lotto))
+
+        self._cursore: Dict[str, Tuple[int, int]] = {}     # File già passati all'import
+        self._in_attesa: Dict[str, Tuple[int, int]] = {}   # File visti, non ancora stabili
+        self.eventi = deque(maxlen=200)                     # (ora, messaggio) per la UI
+        self.stats = {'scansioni': 0, 'accodati': 0, 'job': 0, 'errori': 0, 'ultima_scansione': None}
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ========== CONTROLLO ==========
+
+    def avvia(self):
+        if self.attiva:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"sorveglianza-{self.cartella}", daemon=True)
+        self._thread.start()
+        self._evento(f"Sorveglianza avviata (ogni {self.intervallo:.0f}s, anno {self.anno})")
+
+    def ferma(self):
+        if not self.attiva:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.intervallo + 5)
+        self._evento("Sorveglianza fermata")
+
+    @property
+    def attiva(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def in_attesa(self) -> int:
+        """File visti ma non ancora stabili (in scrittura)"""
+        return len(self._in_attesa)
+
+    def _evento(self, messaggio: str):
+        self.eventi.appendleft((time.strftime('%H:%M:%S'), messaggio))
+        logger.info(f"[{self.cartella}] {messaggio}")
+
+    def _run(self):
+        # Prima scansione subito, poi ogni `intervallo` secondi
+        while True:
+            try:
+                self.scansiona()
+            except Exception as e:
+                self.stats['errori'] += 1
+                self._evento(f"Errore scansione: {e}")
+            if self._stop.wait(self.intervallo):
+                return
+
+    # ========== SCANSIONE ==========
+
+    def _elenca(self) -> Dict[str, Tuple[int, int]]:
+        """File Excel della cartella con (size, mtime_ns), senza aprirli"""
+        firme = {}
+        with os.scandir(self.cartella) as voci:
+            for voce in voci:
+                if voce.is_file() and file_excel_supportato(voce.name):
+                    stat = voce.stat()
+                    firme[voce.path] = (stat.st_size, stat.st_mtime_ns)
+        return firme
+
+    def scansiona(self) -> List[str]:
+        """
+        Una scansione: individua i file nuovi/modificati e stabili e li accoda
+        all'import a lotti. Ritorna i file accodati.
+        """
+        firme = self._elenca()
+        adesso_ns = time.time_ns()
+        debounce_ns = int(self.debounce * 1e9)
+
+        pronti = []
+        for path, firma in firme.items():
+            if self._cursore.get(path) == firma:
+                continue
+            stabile = self._in_attesa.get(path) == firma and adesso_ns - firma[1] >= debounce_ns
+            if stabile:
+                pronti.append(path)
+            else:
+                self._in_attesa[path] = firma  # Ancora in scrittura o appena comparso
+
+        # File spariti: non più da seguire
+        for path in list(self._in_attesa):
+            if path not in firme:
+                del self._in_attesa[path]
+        for path in list(self._cursore):
+            if path not in firme:
+                del self._cursore[path]
+
+        for inizio in range(0, len(pronti), self.lotto):
+            lotto = pronti[inizio:inizio + self.lotto]
+            self._accoda(lotto)
+            for path in lotto:
+                self._cursore[path] = firme[path]
+                self._in_attesa.pop(path, None)
+
+        self.stats['scansioni'] += 1
+        self.stats['ultima_scansione'] = time.strftime('%H:%M:%S')
+        return pronti
+
+    def _accoda(self, lotto: List[str]):
+        """Un job di import per il lotto (il manifest scarta i file già importati)"""
+        db = self.worker.db
+        piano = ImportSession(db, self.anno).pianifica_file(lotto)
+        if not piano['da_analizzare'] and not piano['rinominati']:
+            return
+
+        job_id = crea_job(db, self.anno, self.cartella, piano, workers=1,
+                          chunk_size=len(lotto), origine='sorveglianza')
+        self.worker.avvia(job_id, 'importa', workers=1, chunk_size=len(lotto))
+        self.stats['accodati'] += len(piano['da_analizzare'])
+        self.stats['job'] += 1
+        self._evento(f"{len(piano['da_analizzare'])} file nuovi, {len(piano['rinominati'])} "
+                     f"rinominati -> job #{job_id}")
+
+
+_sorveglianze: Dict[str, SorveglianzaCartella] = {}
+_sorveglianze_lock = threading.Lock()
+
+
+def avvia_sorveglianza(db_path: str, cartella: str, anno: int) -> SorveglianzaCartella:
+    """Avvia (o riavvia con il nuovo anno) la sorveglianza della cartella, unica per processo"""
+    cartella = os.path.abspath(cartella)
+    with _sorveglianze_lock:
+        sorveglianza = _sorveglianze.get(cartella)
+        if sorveglianza and sorveglianza.anno != anno:
+            sorveglianza.ferma()
+            sorveglianza = None
+        if sorveglianza is None:
+            sorveglianza = SorveglianzaCartella(get_worker(db_path), cartella, anno)
+            _sorveglianze[cartella] = sorveglianza
+    sorveglianza.avvia()
+    return sorveglianza
+
+
+def ferma_sorveglianza(cartella: str) -> None:
+    with _sorveglianze_lock:
+        sorveglianza = _sorveglianze.get(os.path.abspath(cartella))
+    if sorveglianza:
+        sorveglianza.ferma()
+
+
+def get_sorveglianza(cartella: str) -> Optional[SorveglianzaCartella]:
+    with _sorveglianze_lock:
+        return _sorveglianze.get(os.path.abspath(cartella))
@@ -0,0 +1,151 @@
+"""
+Telemetria strutturata dell'import
+Un record JSON per file (una riga di Config.TELEMETRIA_FILE) con esito,
+errore e durata di ogni stage: apertura del workbook, estrazione dei campi,
+abbinamento del cacciatore, scrittura su database.
+
+Il record è solo accodato (QueueHandler): serializzazione e scrittura su
+file avvengono nel thread del QueueListener, fuori dal ciclo di import.
+Il file ruota per dimensione (Config.TELEMETRIA_MAX_MB, Config.TELEMETRIA_BACKUP
+file precedenti). riepilogo_run aggrega le durate per stage di un'esecuzione.
+"""
+
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import datetime as dt
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterator, List, Optional
+
+from constants import Config
+
+STAGE = ('apertura', 'estrazione', 'abbinamento', 'scrittura')
+
+_logger = logging.getLogger('telemetria_import')
+_logger.propagate = False  # Mai nei log testuali
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+class _CodaTelemetria(QueueHandler):
+    """Accoda il record così com'è: il dict è serializzato dal listener"""
+
+    def prepare(self, record):
+        return record
+
+
+class _FormatoJson(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+def _avvia() -> None:
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        handler = RotatingFileHandler(Config.TELEMETRIA_FILE, maxBytes=Config.TELEMETRIA_MAX_MB * 1024 * 1024,
+                                      backupCount=Config.TELEMETRIA_BACKUP, encoding='utf-8', delay=True)
+        handler.setFormatter(_FormatoJson())
+        coda = queue.Queue(-1)
+        _listener = QueueListener(coda, handler)
+        _listener.start()
+        _logger.addHandler(_CodaTelemetria(coda))
+        _logger.setLevel(logging.INFO)
+        atexit.register(_listener.stop)
+
+
+def nuovo_run(job_id: Optional[int] = None) -> str:
+    """Identificativo dell'esecuzione: 'job-<id>' o 'upload-<data e ora>'"""
+    if job_id is not None:
+        return f"job-{job_id}"
+    return f"upload-{dt.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+
+
+def registra_file(run: str, risultato: Dict, esito: str, errore: Optional[str] = None,
+                  durate: Optional[Dict[str, float]] = None) -> None:
+    """
+    Record di telemetria di un file (durate in secondi, salvate in ms).
+    Le durate di apertura/estrazione sono quelle del parsing (risultato['tempi']).
+    """
+    _avvia()
+    tempi = dict(risultato.get('tempi') or {})
+    tempi.update(durate or {})
+    dati = risultato.get('dati') or {}
+    _logger.info({
+        'ts': dt.datetime.now().isoformat(timespec='milliseconds'),
+        'run': run,
+        'file': risultato['file_name'],
+        'esito': esito,
+        'errore': errore,
+        'da_cache': bool(risultato.get('da_cache')),
+        'template': dati.get('template'),
+        'lettore': dati.get('lettore'),
+        'ms': {stage: round(tempi[stage] * 1000, 3) for stage in STAGE if stage in tempi},
+    })
+
+
+def attendi_scrittura() -> None:
+    """Attende che i record accodati siano scritti su file (prima di rileggerli)"""
+    with _lock:
+        if _listener is not None:
+            _listener.stop()   # Svuota la coda e ferma il thread
+            _listener.start()
+
+
+def _file_telemetria() -> List[str]:
+    """File di telemetria dal più vecchio (ultimo backup) al corrente"""
+    base = Config.TELEMETRIA_FILE
+    backup = [f"{base}.{n}" for n in range(Config.TELEMETRIA_BACKUP, 0, -1)]
+    return [path for path in backup + [base] if os.path.exists(path)]
+
+
+def leggi_run(run: str) -> Iterator[Dict]:
+    """Record di un'esecuzione (anche se distribuiti su più file ruotati)"""
+    attendi_scrittura()
+    marcatore = f'"run": {json.dumps(run)}'
+    for path in _file_telemetria():
+        with open(path, encoding='utf-8') as f:
+            for riga in f:
+                if marcatore in riga:  # Filtro veloce prima del parsing JSON
+                    record = json.loads(riga)
+                    if record.get('run') == run:
+                        yield record
+
+
+def _percentile(valori: List[float], p: float) -> float:
+    indice = min(len(valori) - 1, int(round(p * (len(valori) - 1))))
+    return valori[indice]
+
+
+def riepilogo_run(run: str) -> Dict:
+    """
+    Aggregato di un'esecuzione: file, esiti, file da cache e per ogni stage
+    file, ms totali, medi, p95 e massimi.
+    """
+    esiti = Counter()
+    da_cache = 0
+    per_stage: Dict[str, List[float]] = {stage: [] for stage in STAGE}
+    for record in leggi_run(run):
+        esiti[record['esito']] += 1
+        da_cache += int(record['da_cache'])
+        for stage, ms in record['ms'].items():
+            per_stage.setdefault(stage, []).append(ms)
+
+    stage = {}
+    for nome, valori in per_stage.items():
+        if not valori:
+            continue
+        valori.sort()
+        stage[nome] = {
+            'file': len(valori),
+            'totale_ms': sum(valori),
+            'medio_ms': sum(valori) / len(valori),
+            'p95_ms': _percentile(valori, 0.95),
+            'max_ms': valori[-1],
+        }
+    return {'file': sum(esiti.values()), 'esiti': dict(esiti), 'da_cache': da_cache, 'stage': stage}
@@ -0,0 +1,233 @@
+"""
+Lettore XLSX veloce (solo valori)
+Apre il file .xlsx come zip e legge in streaming l'XML del foglio attivo,
+fermandosi appena lette le righe richieste. Le stringhe condivise
+(xl/sharedStrings.xml) sono lette in streaming solo fino all'indice più
+alto effettivamente usato.
+
+Non costruisce stili né modello del workbook: per le poche celle che servono
+all'import è molto più veloce di openpyxl. Le date restano numeri seriali
+Excel (nessuna lettura degli stili). Per file anomali chi lo usa ripiega su
+openpyxl (vedi excel_parser).
+"""
+
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+TAG_ROW = f'{{{NS_MAIN}}}row'
+TAG_C = f'{{{NS_MAIN}}}c'
+TAG_V = f'{{{NS_MAIN}}}v'
+TAG_IS = f'{{{NS_MAIN}}}is'
+TAG_T = f'{{{NS_MAIN}}}t'
+TAG_R = f'{{{NS_MAIN}}}r'
+TAG_SI = f'{{{NS_MAIN}}}si'
+
+# Blocchi piccoli: il parser si ferma poco dopo l'ultima riga richiesta
+BLOCCO_LETTURA = 4096
+
+
+def _eventi_xml(stream, events=('end',)):
+    """Come ET.iterparse, ma alimentato a blocchi di BLOCCO_LETTURA byte"""
+    parser = ET.XMLPullParser(events=events)
+    while True:
+        data = stream.read(BLOCCO_LETTURA)
+        if not data:
+            break
+        parser.feed(data)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def _testo_si(elemento) -> str:
+    """Testo di <si>/<is>: <t> diretto o concatenazione dei run <r><t> (no fonetica)"""
+    parti = []
+    for figlio in elemento:
+        if figlio.tag == TAG_T:
+            parti.append(figlio.text or '')
+        elif figlio.tag == TAG_R:
+            for t in figlio.iter(TAG_T):
+                parti.append(t.text or '')
+    return ''.join(parti)
+
+
+def _colonna(riferimento: str) -> int:
+    """'AB12' -> 28 (1-based)"""
+    col = 0
+    for ch in riferimento:
+        if 'A' <= ch <= 'Z':
+            col = col * 26 + (ord(ch) - 64)
+        else:
+            break
+    return col
+
+
+def _numero(testo: str):
+    """Valore numerico come openpyxl: int se scritto senza decimali/esponente"""
+    try:
+        return int(testo)
+    except ValueError:
+        return float(testo)
+
+
+class _StringheCondivise:
+    """Stringhe condivise lette in streaming, solo fino all'indice richiesto"""
+
+    def __init__(self, zf: zipfile.ZipFile, path: Optional[str]):
+        self._valori: List[str] = []
+        self._stream = zf.open(path) if path else None
+        self._eventi = _eventi_xml(self._stream) if self._stream else None
+
+    def get(self, indice: int) -> str:
+        while len(self._valori) <= indice:
+            if self._eventi is None:
+                raise IndexError(f"Stringa condivisa {indice} non presente")
+            try:
+                _, elemento = next(self._eventi)
+            except StopIteration:
+                self._eventi = None
+                continue
+            if elemento.tag == TAG_SI:
+                self._valori.append(_testo_si(elemento))
+                elemento.clear()
+        return self._valori[indice]
+
+    def close(self):
+        if self._stream:
+            self._stream.close()
+
+
+class LettoreXlsx:
+    """
+    Lettura streaming del foglio attivo di un .xlsx.
+
+    Uso:
+        with LettoreXlsx(path) as lettore:
+            for riga in lettore.righe(max_row=6, max_col=80):
+                ...
+    """
+
+    def __init__(self, file_path: Union[str, BinaryIO]):
+        # Percorso oppure file binario seekable in memoria (es. BytesIO di un upload)
+        self.file_path = file_path
+        self._zf = zipfile.ZipFile(file_path)
+        self._aperti = []
+        try:
+            self._sheet_path, self._sst_path = self._risolvi_percorsi()
+        except Exception:
+            self._zf.close()
+            raise
+
+    def _risolvi_percorsi(self):
+        """Percorso dell'XML del foglio attivo (come wb.active) e delle stringhe condivise"""
+        workbook = ET.fromstring(self._zf.read('xl/workbook.xml'))
+        rels = ET.fromstring(self._zf.read('xl/_rels/workbook.xml.rels'))
+
+        target_per_id = {}
+        sst_path = None
+        for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+            target = rel.get('Target')
+            target = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+            target_per_id[rel.get('Id')] = target
+            if rel.get('Type', '').endswith('/sharedStrings'):
+                sst_path = target
+
+        fogli = [s.get(f'{{{NS_REL}}}id') for s in workbook.iter(f'{{{NS_MAIN}}}sheet')]
+        vista = workbook.find(f'{{{NS_MAIN}}}bookViews/{{{NS_MAIN}}}workbookView')
+        attivo = int(vista.get('activeTab', 0)) if vista is not None else 0
+        if attivo >= len(fogli):
+            attivo = 0
+
+        sheet_path = target_per_id[fogli[attivo]]
+        if sst_path and sst_path not in self._zf.namelist():
+            sst_path = None
+        return sheet_path, sst_path
+
+    def righe(self, max_row: int, max_col: int) -> Iterator[List]:
+        """
+        Righe 1..max_row del foglio attivo come liste lunghe max_col
+        (righe mancanti = tutte None). Si ferma alla prima riga oltre max_row.
+        """
+        stringhe = _StringheCondivise(self._zf, self._sst_path)
+        stream = self._zf.open(self._sheet_path)
+        self._aperti.extend([stringhe, stream])
+
+        prossima = 1
+        numero_riga = 0
+        riga = None
+        col_prec = 0
+        try:
+            for evento, elemento in _eventi_xml(stream, events=('start', 'end')):
+                tag = elemento.tag
+                if evento == 'start':
+                    if tag == TAG_ROW:
+                        r = elemento.get('r')
+                        numero_riga = int(r) if r else numero_riga + 1
+                        if numero_riga > max_row:
+                            break
+                        riga = [None] * max_col
+                        col_prec = 0
+                    continue
+
+                if tag == TAG_C and riga is not None:
+                    ref = elemento.get('r')
+                    col = _colonna(ref) if ref else col_prec + 1
+                    col_prec = col
+                    if col <= max_col:
+                        riga[col - 1] = self._valore_cella(elemento, stringhe)
+                    elemento.clear()
+                elif tag == TAG_ROW:
+                    # Righe vuote saltate nell'XML
+                    while prossima < numero_riga:
+                        yield [None] * max_col
+                        prossima += 1
+                    yield riga
+                    prossima = numero_riga + 1
+                    riga = None
+                    elemento.clear()
+                    if prossima > max_row:
+                        break
+        finally:
+            stream.close()
+            stringhe.close()
+
+        while prossima <= max_row:
+            yield [None] * max_col
+            prossima += 1
+
+    @staticmethod
+    def _valore_cella(elemento, stringhe: _StringheCondivise):
+        tipo = elemento.get('t', 'n')
+        if tipo == 'inlineStr':
+            inline = elemento.find(TAG_IS)
+            return _testo_si(inline) if inline is not None else None
+
+        v = elemento.find(TAG_V)
+        if v is None or v.text is None:
+            return None
+        testo = v.text
+
+        if tipo == 's':
+            return stringhe.get(int(testo))
+        if tipo in ('str', 'e'):
+            return testo
+        if tipo == 'b':
+            return testo == '1'
+        return _numero(testo)
+
+    def close(self):
+        for aperto in self._aperti:
+            aperto.close()
+        self._zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()